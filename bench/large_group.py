@@ -0,0 +1,158 @@
+"""
+Benchmark of stage change bookkeeping and memory use for very large groups.
+
+Compares the previous subscriber objects, each holding its own scalar state and updated one at a time,
+with the array-backed `SubscriberState` of each timer and its bulk stage change updates.
+The bulk inactivity check only examines members without flagged activity individually,
+so its cost mostly depends on the `--active` fraction rather than the group size.
+Only the subscriber bookkeeping of a stage change is measured, not the notifications.
+The previous stage changes also accrued the clocked time of every subscriber,
+which is now only done when the timer starts or stops.
+Memory is measured after the stage changes, once the subscriber timestamps are no longer shared.
+Run from the top level directory, e.g.
+    python3 bench/large_group.py --members 5000 --stages 50
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from Timer import Timer, TimerSubscriber, TimerStage  # noqa
+
+
+class OldSubscriber(object):
+    """
+    The previous subscriber, holding its scalar state in its own attributes.
+    """
+    __slots__ = (
+        'member', 'timer', 'interface', 'notify', 'client', 'id', 'time_joined',
+        'last_updated', 'clocked_time', 'active', 'last_seen', 'warnings'
+    )
+
+    def __init__(self, member, timer, interface, now):
+        self.member = member
+        self.timer = timer
+        self.interface = interface
+        self.notify = None
+        self.client = interface.client
+        self.id = member.id
+        self.time_joined = now
+        self.last_updated = now
+        self.clocked_time = 0
+        self.active = True
+        self.last_seen = now
+        self.warnings = 0
+
+    def touch(self, now):
+        self.clocked_time += (now - self.last_updated) if self.active else 0
+        self.last_updated = now
+
+
+def old_stage_change(timer, now, since, max_warning=1):
+    needs_warning = []
+    unsubs = []
+    for subber in timer.subscribed.values():
+        subber.touch(now)
+        if subber.warnings >= max_warning:
+            subber.warnings += 1
+            unsubs.append(subber)
+        elif subber.last_seen < since:
+            subber.warnings += 1
+            if subber.warnings >= max_warning:
+                needs_warning.append(subber)
+    return needs_warning, unsubs
+
+
+def new_stage_change(timer, now, since, max_warning=1):
+    warn_ids, unsub_ids = timer.member_state.check_inactivity(since, max_warning)
+    timer.member_state.clear_seen(now)
+    return [timer.subscribed[userid] for userid in warn_ids], [timer.subscribed[userid] for userid in unsub_ids]
+
+
+def build(args, subscriber_cls):
+    """
+    Build the groups with fresh subscribers, returning the timers.
+    Activity is randomised in `run`, so that some subscribers are warned or unsubscribed at each stage change.
+    """
+    interface = SimpleNamespace(client=None)
+    now = Timer.now()
+    timers = []
+    for i in range(args.groups):
+        guild = SimpleNamespace(id=random.getrandbits(62))
+        timer = Timer("Group {}".format(i), SimpleNamespace(id=random.getrandbits(62), guild=guild), None)
+        timer.setup([TimerStage("Study", 25), TimerStage("Break", 5)])
+        for _ in range(args.members):
+            member = SimpleNamespace(id=random.getrandbits(62), guild=guild)
+            if subscriber_cls is OldSubscriber:
+                subber = OldSubscriber(member, timer, interface, now)
+            else:
+                subber = TimerSubscriber(member, timer, interface)
+                timer.member_state.attach(subber)
+            timer.subscribed[member.id] = subber
+        timers.append(timer)
+    return timers
+
+
+def run(args, subscriber_cls, stage_change, trace=False):
+    """
+    Build the groups and run the stage changes.
+    Returns the memory in use at the end if `trace` is set, otherwise the time taken by the stage changes.
+    """
+    random.seed(args.seed)
+    if trace:
+        tracemalloc.start()
+    timers = build(args, subscriber_cls)
+
+    now = Timer.now()
+    elapsed = 0
+    for stage in range(args.stages):
+        now += 300
+        # Mark a random part of each group as active during the stage
+        for timer in timers:
+            for subber in random.sample(list(timer.subscribed.values()), int(args.members * args.active)):
+                subber.last_seen = now - 1
+                subber.warnings = 0
+        start = time.perf_counter()
+        results = [stage_change(timer, now, now - 300) for timer in timers]
+        elapsed += time.perf_counter() - start
+
+        # Replace the unsubscribed members with new members
+        for needs_warning, unsubs in results:
+            for subber in unsubs:
+                subber.last_seen = now
+                subber.warnings = 0
+
+    if trace:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return memory
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=4, help="Number of groups.")
+    parser.add_argument('--members', type=int, default=5000, help="Number of subscribers in each group.")
+    parser.add_argument('--stages', type=int, default=50, help="Number of stage changes of each group.")
+    parser.add_argument('--active', type=float, default=0.8, help="Fraction of members active in each stage.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    total = args.groups * args.members
+    print("{:<20} {:>14} {:>18}".format("Subscriber state", "bytes/member", "us/stage change"))
+    for name, subscriber_cls, stage_change in (("Per object", OldSubscriber, old_stage_change),
+                                               ("Typed arrays", TimerSubscriber, new_stage_change)):
+        memory = run(args, subscriber_cls, stage_change, trace=True)
+        elapsed = run(args, subscriber_cls, stage_change)
+        print("{:<20} {:>14.0f} {:>18.0f}".format(
+            name, memory / total, elapsed / (args.groups * args.stages) * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
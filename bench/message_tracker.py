@@ -0,0 +1,121 @@
+"""
+Throughput benchmark of message activity tracking, with a synthetic message stream.
+
+Compares the previous `message_tracker`, which looked up the subscriber map for every message,
+with the guild and channel prefilters and the per-timer activity arrays.
+The previous tracker passed the guild object instead of its id, so never matched a subscriber,
+and is also measured with that fixed.
+Most messages are in guilds without timers, as in a large deployment.
+The load of each tracker is reported as the fraction of the event loop it would use at the given message rate.
+The registered tracker includes the handler timing added by `utils.metrics` for messages passing the prefilter,
+and is also measured without it, to show the cost of the timing.
+Run from the top level directory, e.g.
+    python3 bench/message_tracker.py --rate 5000 --seconds 60
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from Timer.trackers import message_tracker  # noqa
+from reaction_dispatch import build, old_bump_user  # noqa
+from restore_bench import FakeGuild  # noqa
+
+
+async def old_message_tracker(client, message):
+    old_bump_user(client.interface, message.guild or 0, message.channel.id, message.author.id)
+
+
+async def fixed_message_tracker(client, message):
+    old_bump_user(client.interface, message.guild.id if message.guild else 0, message.channel.id, message.author.id)
+
+
+async def untimed_message_tracker(client, message):
+    """
+    The registered `message_tracker`, without the handler timing.
+    """
+    guild = message.guild
+    if guild is None or guild.id not in client.interface.guild_channels:
+        return
+    client.interface.bump_user(guild.id, message.channel.id, message.author.id)
+
+
+def make_messages(channels, count, args):
+    other_guilds = [FakeGuild(random.getrandbits(62), 0) for _ in range(args.other_guilds)]
+    messages = []
+    for _ in range(count):
+        roll = random.random()
+        if roll < args.timer_fraction:
+            # Message by a subscriber in their timer channel
+            guild, channel, timer = random.choice(channels)
+            channelid = channel.id
+            userid = random.choice(list(timer.subscribed))
+        elif roll < args.timer_fraction + args.timer_guild_fraction:
+            # Message elsewhere in a guild with a timer
+            guild, channel, timer = random.choice(channels)
+            channelid = random.getrandbits(62)
+            userid = random.getrandbits(62)
+        else:
+            # Message in a guild without timers, or in a direct message
+            guild = random.choice(other_guilds) if random.random() > 0.01 else None
+            channelid = random.getrandbits(62)
+            userid = random.getrandbits(62)
+        messages.append(SimpleNamespace(
+            guild=guild,
+            channel=SimpleNamespace(id=channelid),
+            author=SimpleNamespace(id=userid)
+        ))
+    return messages
+
+
+async def dispatch(handler, client, messages):
+    start = time.perf_counter()
+    for message in messages:
+        await handler(client, message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=int, default=5000, help="Number of messages per second.")
+    parser.add_argument('--seconds', type=int, default=60, help="Number of seconds of messages to process.")
+    parser.add_argument('--guilds', type=int, default=200, help="Number of guilds with a timer.")
+    parser.add_argument('--other-guilds', type=int, default=5000, help="Number of guilds without timers.")
+    parser.add_argument('--members', type=int, default=20, help="Number of subscribers in each timer.")
+    parser.add_argument('--timer-fraction', type=float, default=0.02,
+                        help="Fraction of messages sent by subscribers in their timer channel.")
+    parser.add_argument('--timer-guild-fraction', type=float, default=0.1,
+                        help="Fraction of messages sent in other channels of guilds with a timer.")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        client, interface, channels = build(tmpdir, args)
+        messages = make_messages(channels, args.rate * args.seconds, args)
+
+        trackers = (
+            ("Previous tracker", old_message_tracker),
+            ("Previous, fixed id", fixed_message_tracker),
+            ("Prefiltered, untimed", untimed_message_tracker),
+            ("Prefiltered, timed", message_tracker),
+        )
+        print("{:<20} {:>12} {:>12} {:>10}".format("Tracker", "msgs/s", "us/msg", "load"))
+        for name, handler in trackers:
+            elapsed = loop.run_until_complete(dispatch(handler, client, messages))
+            print("{:<20} {:>12.0f} {:>12.2f} {:>9.1%}".format(
+                name, len(messages) / elapsed, elapsed / len(messages) * 1e6, elapsed / args.seconds
+            ))
+
+        interface.journal.close()
+        interface.registry.close()
+        client.config.close()
+
+
+if __name__ == '__main__':
+    main()
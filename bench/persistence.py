@@ -0,0 +1,339 @@
+"""
+Benchmark suite for the persistence layer.
+
+Generates synthetic property and session databases and timer save files of the requested sizes,
+then measures the latency percentiles and throughput of the `BotData` property operations,
+the `TimerRegistry` session queries and writes, and the timer save and restore.
+Results are written as JSON, and can be compared against an earlier run to catch regressions.
+Run from the top level directory, e.g.
+    python3 bench/persistence.py --sessions 1000000 --users 100000 --output results.json
+    python3 bench/persistence.py --sessions 1000000 --users 100000 --compare results.json --threshold 0.2
+Large databases take a while to generate, and can be kept between runs with `--data-dir`.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import argparse
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from BotData import BotData  # noqa
+from Timer.registry import TimerRegistry  # noqa
+from restore_bench import build as build_save, reset  # noqa
+
+
+def summarise(latencies, elapsed=None):
+    """
+    Summarise a list of per-operation latencies, in seconds.
+    Throughput is taken from `elapsed` if given, e.g. when it includes committing queued writes.
+    """
+    latencies = sorted(latencies)
+    count = len(latencies)
+    total = sum(latencies)
+
+    def pct(p):
+        return latencies[min(count - 1, int(p / 100 * count))]
+
+    return {
+        'count': count,
+        'mean': total / count,
+        'p50': pct(50),
+        'p90': pct(90),
+        'p99': pct(99),
+        'max': latencies[-1],
+        'throughput': count / (elapsed if elapsed is not None else total),
+    }
+
+
+def measure(func, args_list):
+    """
+    Call `func` with each argument tuple in turn, returning the summary of the call latencies.
+    """
+    latencies = []
+    clock = time.perf_counter
+    for args in args_list:
+        start = clock()
+        func(*args)
+        latencies.append(clock() - start)
+    return summarise(latencies)
+
+
+def measure_committed(func, args_list, flush):
+    """
+    Measure queued writes, with the throughput including the time to commit them all.
+    """
+    latencies = []
+    clock = time.perf_counter
+    begin = clock()
+    for args in args_list:
+        start = clock()
+        func(*args)
+        latencies.append(clock() - start)
+    flush()
+    return summarise(latencies, elapsed=clock() - begin)
+
+
+class Dataset(object):
+    """
+    Synthetic users, guilds and sessions.
+    Each user belongs to a home guild, and starts sessions over the past year.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.users = [self.rng.getrandbits(62) for _ in range(args.users)]
+        self.guilds = [self.rng.getrandbits(62) for _ in range(args.guilds)]
+        self.now = int(time.time())
+
+    def home_guild(self, index):
+        return self.guilds[index % len(self.guilds)]
+
+    def random_member(self):
+        index = self.rng.randrange(len(self.users))
+        return self.users[index], self.home_guild(index)
+
+    def session(self):
+        userid, guildid = self.random_member()
+        return (userid, guildid, guildid ^ 1, self.now - self.rng.randrange(365 * 86400), self.rng.randrange(60, 7200))
+
+
+def data_path(args, tmpdir, kind):
+    """
+    Path of a generated database, reused between runs when a data directory is given.
+    """
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        name = "{}_{}_{}_{}_{}.db".format(kind, args.sessions, args.users, args.guilds, args.seed)
+        return os.path.join(args.data_dir, name)
+    return os.path.join(tmpdir, "{}.db".format(kind))
+
+
+def generate_config(fp, data):
+    """
+    Fill a property database with a stored notification level and cached name for every user.
+    """
+    BotData(app="pomo", data_file=fp).close()
+    conn = sqlite3.connect(fp)
+    rows = []
+    for userid in data.users:
+        rows.append((userid, "notify_level", json.dumps(data.rng.randrange(4))))
+        rows.append((userid, "name_cache", json.dumps(["User {}".format(userid), data.now])))
+    conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def generate_sessions(fp, data, count, chunk=100000):
+    """
+    Fill a session database with `count` sessions, then let the registry build its indexes and rollups.
+    """
+    conn = sqlite3.connect(fp)
+    conn.execute("CREATE TABLE IF NOT EXISTS sessions (userid INTEGER NOT NULL, guildid INTEGER NOT NULL, "
+                 "roleid INTEGER NOT NULL, starttime INTEGER NOT NULL, duration INTEGER NOT NULL)")
+    for i in range(0, count, chunk):
+        conn.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)",
+                         [data.session() for _ in range(min(chunk, count - i))])
+        conn.commit()
+    conn.close()
+    TimerRegistry(fp).close()
+
+
+def bench_botdata(fp, data, samples, results):
+    config = BotData(app="pomo", data_file=fp)
+    users = config.users
+    rng = data.rng
+
+    keys = [(rng.choice(data.users), "notify_level") for _ in range(samples)]
+    for key in keys:
+        users.get(*key)
+    results['botdata.get.cached'] = measure(users.get, keys)
+
+    def get_uncached(userid, prop):
+        users.cache.pop((userid, prop), None)
+        users.get(userid, prop)
+    results['botdata.get.uncached'] = measure(get_uncached, keys)
+
+    batches = [([rng.choice(data.users) for _ in range(100)],) for _ in range(max(1, samples // 100))]
+
+    def get_many_uncached(ids):
+        users.cache.clear()
+        users.get_many(ids, "name_cache")
+    results['botdata.get_many.uncached_100'] = measure(get_many_uncached, batches)
+
+    writes = [(rng.choice(data.users), "notify_level", rng.randrange(4)) for _ in range(samples)]
+    results['botdata.set'] = measure_committed(users.set, writes, config.flush)
+    config.close()
+
+
+def bench_registry(fp, data, samples, results):
+    registry = TimerRegistry(fp)
+    rng = data.rng
+
+    members = [data.random_member() for _ in range(samples)]
+    results['registry.get_sessions_where.member'] = measure(
+        lambda userid, guildid: registry.get_sessions_where(userid=userid, guildid=guildid), members
+    )
+    results['registry.get_sessions_where.guild'] = measure(
+        lambda guildid: registry.get_sessions_where(guildid=guildid),
+        [(rng.choice(data.guilds),) for _ in range(max(1, samples // 100))]
+    )
+    results['registry.get_leaderboard'] = measure(
+        lambda guildid: registry.get_leaderboard(guildid, limit=20),
+        [(rng.choice(data.guilds),) for _ in range(max(1, samples // 10))]
+    )
+    results['registry.get_history_days'] = measure(
+        lambda userid, guildid: registry.get_history_days(userid, guildid, limit=25), members
+    )
+
+    sessions = [data.session() for _ in range(samples)]
+    results['registry.new_session'] = measure_committed(registry.new_session, sessions, registry.flush)
+    registry.close()
+
+
+def bench_save(tmpdir, args, results):
+    """
+    Measure the timer snapshot and the restore of the saved subscribers, with no request latency.
+    """
+    save_args = SimpleNamespace(guilds=args.save_guilds, subscribers=args.subscribers,
+                                cached=1.0, departed=0, latency=0)
+    save_dir = os.path.join(tmpdir, "save")
+    os.makedirs(save_dir)
+    client, interface, state = build_save(save_dir, save_args)
+    loop = asyncio.get_event_loop()
+
+    restores = []
+    saves = []
+    for _ in range(args.save_repeat):
+        reset(client, interface)
+        interface.journal.snapshot(state)
+        start = time.perf_counter()
+        loop.run_until_complete(interface.restore_save())
+        restores.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        interface.update_save()
+        saves.append(time.perf_counter() - start)
+
+    results['save.update_save'] = summarise(saves)
+    results['save.restore_save'] = summarise(restores)
+
+    interface.journal.close()
+    interface.registry.close()
+    client.config.close()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.realpath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, metric, threshold):
+    """
+    Compare results against a baseline run.
+    An operation regresses if its `metric` latency grew, or its throughput fell, by more than `threshold`.
+    Returns the list of regressed operations.
+    """
+    regressions = []
+    print("{:<40} {:>12} {:>12} {:>9}".format("Operation", "Baseline", "Current", "Change"))
+    for name, result in sorted(results.items()):
+        base = baseline['results'].get(name, None)
+        if base is None:
+            print("{:<40} {:>12} {:>12.1f}us".format(name, "-", result[metric] * 1e6))
+            continue
+        change = result[metric] / base[metric] - 1 if base[metric] else 0
+        throughput_change = result['throughput'] / base['throughput'] - 1 if base['throughput'] else 0
+        regressed = change > threshold or throughput_change < -threshold
+        if regressed:
+            regressions.append(name)
+        print("{:<40} {:>10.1f}us {:>10.1f}us {:>+8.1%}{}".format(
+            name, base[metric] * 1e6, result[metric] * 1e6, change, "  REGRESSION" if regressed else ""
+        ))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100000, help="Number of stored sessions.")
+    parser.add_argument('--users', type=int, default=100000, help="Number of users with stored properties.")
+    parser.add_argument('--guilds', type=int, default=1000, help="Number of guilds the users are spread over.")
+    parser.add_argument('--subscribers', type=int, default=50000, help="Number of subscribers in the save file.")
+    parser.add_argument('--save-guilds', type=int, default=500, help="Number of guilds in the save file.")
+    parser.add_argument('--samples', type=int, default=2000, help="Number of samples of each fast operation.")
+    parser.add_argument('--save-repeat', type=int, default=5, help="Number of timed saves and restores.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the generated data.")
+    parser.add_argument('--data-dir', help="Directory to keep the generated databases in between runs.")
+    parser.add_argument('--output', help="File to write the JSON results to.")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against.")
+    parser.add_argument('--metric', default='p50', choices=['mean', 'p50', 'p90', 'p99'],
+                        help="Latency statistic used for the comparison.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown above which an operation counts as a regression.")
+    args = parser.parse_args()
+
+    data = Dataset(args)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_fp = data_path(args, tmpdir, "config")
+        sessions_fp = data_path(args, tmpdir, "sessions")
+
+        start = time.perf_counter()
+        if not os.path.exists(config_fp):
+            generate_config(config_fp, data)
+        if not os.path.exists(sessions_fp):
+            generate_sessions(sessions_fp, data, args.sessions)
+        print("Prepared {} users and {} sessions in {:.1f}s".format(
+            args.users, args.sessions, time.perf_counter() - start
+        ))
+
+        bench_botdata(config_fp, data, args.samples, results)
+        bench_registry(sessions_fp, data, args.samples, results)
+        bench_save(tmpdir, args, results)
+
+    print("{:<40} {:>10} {:>10} {:>10} {:>10} {:>12}".format("Operation", "p50", "p90", "p99", "max", "ops/s"))
+    for name, result in sorted(results.items()):
+        print("{:<40} {:>8.1f}us {:>8.1f}us {:>8.1f}us {:>8.1f}us {:>12.0f}".format(
+            name, *(result[key] * 1e6 for key in ('p50', 'p90', 'p99', 'max')), result['throughput']
+        ))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'time': int(time.time()),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'sizes': {key: getattr(args, key) for key in ('sessions', 'users', 'guilds', 'subscribers', 'save_guilds')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta']['sizes'] != report['meta']['sizes']:
+            print("Warning: the baseline was run with different sizes {}".format(baseline['meta']['sizes']))
+        print()
+        regressions = compare(results, baseline, args.metric, args.threshold)
+        if regressions:
+            print("{} operations regressed by more than {:.0%}.".format(len(regressions), args.threshold))
+            sys.exit(1)
+        print("No regressions above {:.0%}.".format(args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Throughput benchmark of reaction event handling, with synthetic reaction payloads.
+
+Compares the previous pair of handlers, which both ran for every reaction and searched the
+channel timers for the reacted message, with the merged `TimerInterface.on_reaction` dispatch.
+The previous handlers and subscriber lookup are frozen copies, and the merged dispatch is measured
+as registered, including the handler timing added by `utils.metrics`.
+Most reactions are outside timer channels, as in a large deployment.
+Run from the top level directory, e.g.
+    python3 bench/reaction_dispatch.py --guilds 200 --events 200000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from BotData import BotData  # noqa
+from Timer import TimerInterface, TimerSubscriber  # noqa
+from restore_bench import FakeClient, FakeGuild, FakeChannel  # noqa
+
+
+def old_bump_user(interface, guildid, channelid, userid):
+    """
+    The previous `TimerInterface.bump_user`, which looked up the subscriber map for every event.
+    """
+    if guildid == 0:
+        return
+    subber = interface.subscribers.get((guildid, userid), None)
+    if subber is not None and channelid == subber.timer.channel.id:
+        warned = subber.warnings
+        subber.bump()
+        interface.journal.record_bump(subber, force=bool(warned))
+
+
+async def old_reaction_tracker(interface, client, payload):
+    old_bump_user(interface, payload.guild_id or 0, payload.channel_id, payload.user_id)
+
+
+async def old_reaction_sub(interface, client, payload):
+    """
+    The previous subscribe handler, up to the point of subscribing.
+    """
+    if str(payload.emoji) != "✅":
+        return
+    if payload.guild_id is None:
+        return
+    guild = client.get_guild(payload.guild_id)
+    if guild is None:
+        return
+    if (payload.guild_id, payload.user_id) in interface.subscribers:
+        return
+    if payload.user_id == client.user.id:
+        return
+    tchan = interface.channels.get(payload.channel_id, None)
+    if tchan is None:
+        return
+    timer = next((timer for timer in tchan.timers if payload.message_id in timer.timer_messages), None)
+    if timer is None:
+        return
+
+
+def build(tmpdir, args):
+    TimerInterface.save_fp = os.path.join(tmpdir, "timerstatus.json")
+    client = FakeClient(BotData(app="pomo", data_file=os.path.join(tmpdir, "config.db")))
+    interface = TimerInterface(client, os.path.join(tmpdir, "sessions.db"))
+
+    channels = []
+    for i in range(args.guilds):
+        guild = FakeGuild(random.getrandbits(62), 0)
+        client.guilds[guild.id] = guild
+        channel = FakeChannel(random.getrandbits(62), guild)
+        timer = interface.create_timer("Group {}".format(i), SimpleNamespace(id=random.getrandbits(62), guild=guild),
+                                       channel)
+        for j in range(timer.max_messages):
+            timer.add_message(random.getrandbits(62))
+        for j in range(args.members):
+            member = guild.add_member(random.getrandbits(62), True)
+            interface.add_subscriber(TimerSubscriber(member, timer, interface))
+        channels.append((guild, channel, timer))
+    return client, interface, channels
+
+
+def make_payloads(channels, count, timer_fraction):
+    payloads = []
+    for _ in range(count):
+        guild, channel, timer = random.choice(channels)
+        if random.random() < timer_fraction:
+            # Reaction by a subscriber in a timer channel, possibly on a timer message
+            payloads.append(SimpleNamespace(
+                guild_id=guild.id,
+                channel_id=channel.id,
+                message_id=random.choice(timer.timer_messages + [random.getrandbits(62)]),
+                user_id=random.choice(list(timer.subscribed)),
+                emoji=random.choice(["✅", "👍"])
+            ))
+        else:
+            # Reaction by anyone elsewhere in the guild
+            payloads.append(SimpleNamespace(
+                guild_id=guild.id,
+                channel_id=random.getrandbits(62),
+                message_id=random.getrandbits(62),
+                user_id=random.getrandbits(62),
+                emoji=random.choice(["✅", "👍", "😂"])
+            ))
+    return payloads
+
+
+async def dispatch(handlers, client, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        for handler in handlers:
+            await handler(client, payload)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=200, help="Number of guilds with a timer.")
+    parser.add_argument('--members', type=int, default=20, help="Number of subscribers in each timer.")
+    parser.add_argument('--events', type=int, default=200000, help="Number of reaction events.")
+    parser.add_argument('--timer-fraction', type=float, default=0.02,
+                        help="Fraction of reactions made in timer channels.")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        client, interface, channels = build(tmpdir, args)
+        interface.journal.bump_interval = float('inf')
+        payloads = make_payloads(channels, args.events, args.timer_fraction)
+
+        old_handlers = [
+            lambda client, payload: old_reaction_tracker(interface, client, payload),
+            lambda client, payload: old_reaction_sub(interface, client, payload)
+        ]
+        old = loop.run_until_complete(dispatch(old_handlers, client, payloads))
+        new = loop.run_until_complete(dispatch([interface.on_reaction], client, payloads))
+
+        for name, elapsed in (("Separate handlers", old), ("Merged dispatch", new)):
+            print("{:<20} {:>10.0f} events/s".format(name, len(payloads) / elapsed))
+
+        interface.journal.close()
+        interface.registry.close()
+        client.config.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Microbenchmark of rendering timer status messages.
+
+Renders the pinned status of running timers with many members,
+once rebuilding every piece as before, and once using the cached stage table and member list,
+where only the remaining time is rendered afresh.
+Run from the top level directory, e.g.
+    python3 bench/render_status.py --timers 1000 --members 100
+"""
+import os
+import sys
+import time
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from Timer import Timer, TimerStage, TimerState  # noqa
+
+
+def make_timers(count, members):
+    """
+    Create `count` running timers with `members` subscribers each.
+    """
+    timers = []
+    for i in range(count):
+        timer = Timer("Bench {}".format(i), SimpleNamespace(id=i, mention="<@&{}>".format(i)), None)
+        timer.setup([TimerStage("Study", 50), TimerStage("Short break", 10),
+                     TimerStage("Study", 50), TimerStage("Long break", 30)])
+        timer.state = TimerState.RUNNING
+        for j in range(members):
+            member = SimpleNamespace(id=j, name="Member number {}".format(j))
+            timer.subscribed[j] = SimpleNamespace(member=member)
+        timer.mark_changed(members=True)
+        timers.append(timer)
+    return timers
+
+
+def render(timers, rounds, invalidate):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for timer in timers:
+            if invalidate:
+                timer.mark_changed(members=True)
+            timer.pretty_pinstatus()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--timers', type=int, default=1000, help="Number of running timers.")
+    parser.add_argument('--members', type=int, default=100, help="Number of members in each timer.")
+    parser.add_argument('--rounds', type=int, default=20, help="Number of times to render every timer.")
+    args = parser.parse_args()
+
+    timers = make_timers(args.timers, args.members)
+
+    uncached = render(timers, args.rounds, True)
+    cached = render(timers, args.rounds, False)
+
+    print("{:<10} {:>10.2f} ms per round".format("Uncached", uncached * 1000))
+    print("{:<10} {:>10.2f} ms per round".format("Cached", cached * 1000))
+    print("Speedup    {:>10.1f}x".format(uncached / cached))
+
+
+if __name__ == '__main__':
+    main()
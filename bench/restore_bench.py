@@ -0,0 +1,184 @@
+"""
+Offline benchmark of restoring saved timer subscribers at startup.
+
+Uses stand-in guild, channel and client objects with simulated request latencies,
+and compares the previous one-at-a-time member fetching with `TimerInterface.restore_save`.
+Run from the top level directory, e.g.
+    python3 bench/restore_bench.py --guilds 50 --subscribers 5000 --cached 0.5
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+import discord
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from BotData import BotData  # noqa
+from Timer import TimerInterface, TimerSubscriber  # noqa
+from utils.editqueue import EditQueue  # noqa
+
+
+class FakeGuild:
+    """
+    Guild stand-in with a partial member cache and simulated gateway and REST latencies.
+    """
+    def __init__(self, guildid, latency):
+        self.id = guildid
+        self.latency = latency
+        self.members = {}
+        self.cached = set()
+        self.requests = 0
+
+    def add_member(self, userid, cached):
+        member = SimpleNamespace(id=userid, name="User {}".format(userid), guild=self, bot=False)
+        self.members[userid] = member
+        if cached:
+            self.cached.add(userid)
+        return member
+
+    def get_member(self, userid):
+        return self.members[userid] if userid in self.cached else None
+
+    async def query_members(self, user_ids=None, limit=5):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return [self.members[userid] for userid in user_ids[:limit] if userid in self.members]
+
+    async def fetch_member(self, userid):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if userid not in self.members:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Member")
+        return self.members[userid]
+
+
+class FakeChannel:
+    def __init__(self, channelid, guild):
+        self.id = channelid
+        self.guild = guild
+        self.mention = "<#{}>".format(channelid)
+
+    async def fetch_message(self, msgid):
+        self.guild.requests += 1
+        await asyncio.sleep(self.guild.latency)
+        return SimpleNamespace(id=msgid, channel=self)
+
+
+class FakeClient:
+    def __init__(self, config):
+        self.config = config
+        self.guilds = {}
+        self.user = SimpleNamespace(id=0)
+        self.editor = EditQueue()
+
+    def get_guild(self, guildid):
+        return self.guilds.get(guildid, None)
+
+    def add_after_event(self, event, handler):
+        pass
+
+
+def build(tmpdir, args):
+    """
+    Create a client and interface with saved state for the requested number of guilds and subscribers.
+    """
+    TimerInterface.save_fp = os.path.join(tmpdir, "timerstatus.json")
+    client = FakeClient(BotData(app="pomo", data_file=os.path.join(tmpdir, "config.db")))
+    interface = TimerInterface(client, os.path.join(tmpdir, "sessions.db"))
+
+    subscribers = []
+    timer_channels = []
+    for i in range(args.guilds):
+        guild = FakeGuild(random.getrandbits(62), args.latency)
+        client.guilds[guild.id] = guild
+        channel = FakeChannel(random.getrandbits(62), guild)
+        timer = interface.create_timer("Group {}".format(i), SimpleNamespace(id=random.getrandbits(62), guild=guild),
+                                       channel)
+        timer_channels.append({'id': channel.id, 'msgid': random.getrandbits(62)})
+
+        for j in range(args.subscribers // args.guilds):
+            member = guild.add_member(random.getrandbits(62), random.random() < args.cached)
+            if random.random() < args.departed:
+                # Member has left the guild since the save
+                guild.members.pop(member.id)
+                guild.cached.discard(member.id)
+            subscribers.append(TimerSubscriber(member, timer, interface).serialise())
+
+    state = {'timers': [], 'subscribers': subscribers, 'timer_channels': timer_channels}
+    return client, interface, state
+
+
+async def restore_sequential(interface, savedata):
+    """
+    The previous restore, fetching each subscriber and status message in turn.
+    """
+    timers = {timer.role.id: timer for channel in interface.channels.values() for timer in channel.timers}
+    for sub_data in savedata['subscribers']:
+        if sub_data['roleid'] in timers:
+            timer = timers[sub_data['roleid']]
+            guild = interface.client.get_guild(sub_data['guildid'])
+            try:
+                member = await guild.fetch_member(sub_data['id'])
+            except discord.NotFound:
+                continue
+            subber = TimerSubscriber.deserialise(member, timer, interface, sub_data)
+            interface.subscribers[(guild.id, member.id)] = subber
+            timer.subscribed[member.id] = subber
+
+    for tchan_data in savedata['timer_channels']:
+        tchan = interface.channels[tchan_data['id']]
+        tchan.msg = await tchan.channel.fetch_message(tchan_data['msgid'])
+
+
+def reset(client, interface):
+    interface.subscribers.clear()
+    for tchan in interface.channels.values():
+        tchan.msg = None
+        for timer in tchan.timers:
+            timer.subscribed.clear()
+    for guild in client.guilds.values():
+        guild.requests = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=50, help="Number of guilds with a timer.")
+    parser.add_argument('--subscribers', type=int, default=5000, help="Total number of saved subscribers.")
+    parser.add_argument('--cached', type=float, default=0.5, help="Fraction of members in the member cache.")
+    parser.add_argument('--departed', type=float, default=0.05, help="Fraction of members who left the guild.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated request latency in seconds.")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        client, interface, state = build(tmpdir, args)
+
+        start = time.perf_counter()
+        loop.run_until_complete(restore_sequential(interface, state))
+        sequential = time.perf_counter() - start
+        sequential_requests = sum(guild.requests for guild in client.guilds.values())
+
+        reset(client, interface)
+        interface.journal.snapshot(state)
+        start = time.perf_counter()
+        loop.run_until_complete(interface.restore_save())
+        concurrent = time.perf_counter() - start
+        concurrent_requests = sum(guild.requests for guild in client.guilds.values())
+
+        print("{:<20} {:>8.2f}s {:>8} requests".format("Sequential restore", sequential, sequential_requests))
+        print("{:<20} {:>8.2f}s {:>8} requests {:>8} subscribers restored".format(
+            "Concurrent restore", concurrent, concurrent_requests, len(interface.subscribers)
+        ))
+
+        interface.registry.close()
+        client.config.close()
+
+
+if __name__ == '__main__':
+    main()
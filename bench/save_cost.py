@@ -0,0 +1,103 @@
+"""
+Benchmark of timer state persistence costs.
+
+Compares the previous full JSON save, which rewrote every timer and subscriber,
+with the append-only `TimerJournal` and its compacted snapshots.
+Run from the top level directory, e.g.
+    python3 bench/save_cost.py --subscribers 50000 --group-size 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from Timer import Timer, TimerStage, TimerSubscriber  # noqa
+from Timer.journal import TimerJournal  # noqa
+
+
+def make_state(subscribers, group_size):
+    """
+    Build timers and subscribers using lightweight stand-ins for the discord objects.
+    """
+    interface = SimpleNamespace(client=None, journal=None, scheduler=None)
+    timers = []
+    subbers = []
+    for i in range(subscribers // group_size):
+        guild = SimpleNamespace(id=random.getrandbits(62))
+        timer = Timer("Group {}".format(i), SimpleNamespace(id=random.getrandbits(62), guild=guild), None)
+        timer.setup([TimerStage("Study", 25), TimerStage("Break", 5)])
+        for j in range(group_size):
+            member = SimpleNamespace(id=random.getrandbits(62), guild=guild)
+            subber = TimerSubscriber(member, timer, interface)
+            timer.subscribed[member.id] = subber
+            subbers.append(subber)
+        timers.append(timer)
+    return timers, subbers
+
+
+def full_save(fp, timers, subbers):
+    """
+    The previous `update_save`, serialising and rewriting the complete state.
+    """
+    data = {
+        'timers': [timer.serialise() for timer in timers],
+        'subscribers': [subber.serialise() for subber in subbers],
+        'timer_channels': []
+    }
+    with open(fp, 'w') as f:
+        f.write(json.dumps(data))
+    return data
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=50000, help="Total number of subscribers.")
+    parser.add_argument('--group-size', type=int, default=50, help="Number of subscribers in each timer.")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of repetitions of the full state saves.")
+    args = parser.parse_args()
+
+    timers, subbers = make_state(args.subscribers, args.group_size)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_fp = os.path.join(tmpdir, "timerstatus.json")
+        journal = TimerJournal(os.path.join(tmpdir, "journal_status.json"))
+
+        full = timed(lambda: full_save(save_fp, timers, subbers), args.repeat)
+        state = full_save(save_fp, timers, subbers)
+        snapshot = timed(lambda: journal.snapshot(state), args.repeat)
+
+        event_count = 10000
+        sub = timed(lambda: journal.record_sub(random.choice(subbers)), event_count)
+        bump = timed(lambda: journal.record_bump(random.choice(subbers), force=True), event_count)
+        stage = timed(lambda: journal.record_timer('stage', random.choice(timers), subscribers=True), event_count // 10)
+
+        journal.close()
+        start = time.perf_counter()
+        restored = TimerJournal(journal.snapshot_fp).load()
+        load = time.perf_counter() - start
+
+    print("State: {} timers, {} subscribers".format(len(timers), len(subbers)))
+    print("{:<40} {:>10.2f} ms".format("Full JSON save", full * 1000))
+    print("{:<40} {:>10.2f} ms".format("Atomic snapshot", snapshot * 1000))
+    print("{:<40} {:>10.2f} us".format("Journal sub event", sub * 1e6))
+    print("{:<40} {:>10.2f} us".format("Journal bump event", bump * 1e6))
+    print("{:<40} {:>10.2f} us".format("Journal stage event ({} members)".format(args.group_size), stage * 1e6))
+    print("{:<40} {:>10.2f} ms ({} subscribers)".format(
+        "Snapshot and journal replay", load * 1000, len(restored['subscribers'])
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of subscriber lookups by user and by guild.
+
+Compares scanning the full `(guildid, userid)` subscriber map, as `get_subs_for` and the
+leaderboard used to, with the maintained user and guild indexes of `TimerInterface`.
+Run from the top level directory, e.g.
+    python3 bench/subscriber_index.py --guilds 5000 --members 20
+"""
+import time
+import random
+import argparse
+import tempfile
+
+from reaction_dispatch import build
+
+
+def timed(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=5000, help="Number of guilds with a timer.")
+    parser.add_argument('--members', type=int, default=20, help="Number of subscribers in each guild.")
+    parser.add_argument('--lookups', type=int, default=200, help="Number of lookups of each kind.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        client, interface, channels = build(tmpdir, args)
+        subscribers = interface.subscribers
+        print("{} subscribers across {} guilds".format(len(subscribers), len(channels)))
+
+        keys = random.sample(list(subscribers), args.lookups)
+        users = [(userid,) for _, userid in keys]
+        guilds = [(guildid,) for guildid, _ in keys]
+
+        def scan_user(userid):
+            return [value for (key, value) in subscribers.items() if key[1] == userid]
+
+        def scan_guild(guildid):
+            return [value for (key, value) in subscribers.items() if key[0] == guildid]
+
+        results = [
+            ("User scan", timed(scan_user, users)),
+            ("User index", timed(interface.get_subs_for, users)),
+            ("Guild scan", timed(scan_guild, guilds)),
+            ("Guild index", timed(interface.get_guild_subs, guilds)),
+        ]
+
+        # Cost of maintaining the indexes on subscription changes
+        subbers = [(subscribers[key],) for key in keys]
+        removals = timed(lambda subber: interface.remove_subscriber(subber.member.guild.id, subber.id), subbers)
+        additions = timed(interface.add_subscriber, subbers)
+        results.append(("Index removal", removals))
+        results.append(("Index addition", additions))
+
+        for name, elapsed in results:
+            print("{:<16} {:>12.2f} µs".format(name, elapsed * 1e6))
+
+        start = time.perf_counter()
+        problems = interface.check_subscriber_indexes()
+        print("Invariant check  {:>12.2f} ms, {} problems".format((time.perf_counter() - start) * 1000, len(problems)))
+
+        interface.journal.close()
+        interface.registry.close()
+        client.config.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark of event loop wakeups caused by running group timers.
+
+Compares the previous design, where every running timer polled its own state once a second,
+with the shared `TimerScheduler`, which only wakes when a stage deadline is due.
+Run from the top level directory, e.g.
+    python3 bench/timer_wakeups.py --timers 10000 --seconds 10
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from Timer import Timer, TimerStage, TimerState  # noqa
+from Timer.scheduler import TimerScheduler  # noqa
+
+
+class BenchInterface:
+    """
+    Minimal interface stand-in holding the shared scheduler.
+    """
+    def __init__(self):
+        self.scheduler = TimerScheduler(Timer.now)
+        self.journal = None
+        self.notifier = None
+
+
+def make_timers(count, interface=None):
+    """
+    Create `count` running timers without members, with stage deadlines spread over the next minute.
+    """
+    now = Timer.now()
+    timers = []
+    for i in range(count):
+        timer = Timer("Bench {}".format(i), None, None, interface=interface)
+        timer.setup([TimerStage("Study", 1), TimerStage("Break", 1)])
+        timer.state = TimerState.RUNNING
+        timer.current_stage_start = now - random.randrange(60)
+        timers.append(timer)
+    return timers
+
+
+async def polling_loop(timer, counter):
+    """
+    The previous per-timer `runloop`, counting each wakeup.
+    """
+    while timer.state == TimerState.RUNNING:
+        counter[0] += 1
+        remaining = int(60*timer.stages[timer.current_stage].duration - (timer.now() - timer.current_stage_start))
+        if remaining <= 0:
+            await timer.change_stage(timer.current_stage + 1)
+        await asyncio.sleep(1)
+
+
+async def bench_polling(count, seconds):
+    counter = [0]
+    timers = make_timers(count)
+    tasks = [asyncio.ensure_future(polling_loop(timer, counter)) for timer in timers]
+
+    await asyncio.sleep(1)
+    counter[0] = 0
+    changes = sum(timer.current_stage for timer in timers)
+    await asyncio.sleep(seconds)
+    wakeups = counter[0]
+    changes = sum(timer.current_stage for timer in timers) - changes
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return wakeups, changes
+
+
+async def bench_scheduler(count, seconds):
+    interface = BenchInterface()
+    scheduler = interface.scheduler
+    timers = make_timers(count, interface=interface)
+    for timer in timers:
+        timer.schedule()
+    scheduler.start()
+
+    await asyncio.sleep(1)
+    wakeups = scheduler.wakeups
+    fired = scheduler.fired
+    await asyncio.sleep(seconds)
+    wakeups = scheduler.wakeups - wakeups
+    fired = scheduler.fired - fired
+
+    scheduler.stop()
+    return wakeups, fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--timers', type=int, default=10000, help="Number of simulated running timers.")
+    parser.add_argument('--seconds', type=int, default=10, help="Length of each measurement window.")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    for name, bench in (("per-timer polling", bench_polling), ("shared scheduler", bench_scheduler)):
+        start = time.process_time()
+        wakeups, changes = loop.run_until_complete(bench(args.timers, args.seconds))
+        cpu = time.process_time() - start
+        print("{:<18} {:>10.1f} wakeups/s {:>8} stage changes {:>8.2f}s cpu".format(
+            name, wakeups / args.seconds, changes, cpu
+        ))
+
+
+if __name__ == '__main__':
+    main()
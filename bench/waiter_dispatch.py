@@ -0,0 +1,155 @@
+"""
+Benchmark of reaction dispatch with many concurrent pagers.
+
+Compares `discord.Client.wait_for`, which runs the check of every pending pager for each reaction,
+with the keyed `WaiterRegistry` used by the interactive utilities.
+Every pager waits on its own message, and reactions are spread over the pager messages.
+Run from the top level directory, e.g.
+    python3 bench/waiter_dispatch.py --pagers 5000 --events 20000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from types import SimpleNamespace
+
+import discord
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
+
+from utils.waiters import WaiterRegistry  # noqa
+from utils import interactive  # noqa
+
+
+NEXT = "▶"
+PREV = "◀"
+
+
+class FakeMessage:
+    def __init__(self, msgid):
+        self.id = msgid
+        self.pages_shown = 0
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def remove_reaction(self, emoji, user):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+
+class FakeEditor:
+    def edit(self, message, **kwargs):
+        message.pages_shown += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.user = SimpleNamespace(id=0)
+        self.editor = FakeEditor()
+        self.handlers = defaultdict(list)
+        self.waiters = WaiterRegistry(self)
+
+    def add_after_event(self, event, func):
+        self.handlers[event].append(func)
+
+
+async def old_pager(client, out_msg, author):
+    """
+    The waiting loop of the previous pager, using `client.wait_for` with a closure check.
+    """
+    def check(reaction, user):
+        result = reaction.message.id == out_msg.id
+        result = result and str(reaction.emoji) in [NEXT, PREV]
+        result = result and not (user.id == client.user.id)
+        result = result and not (user != author)
+        return result
+
+    while True:
+        try:
+            reaction, user = await client.wait_for('reaction_add', check=check, timeout=300)
+        except asyncio.TimeoutError:
+            break
+        out_msg.pages_shown += 1
+
+
+async def settle(count):
+    for _ in range(count):
+        await asyncio.sleep(0)
+
+
+async def run_old(args, events):
+    client = discord.Client()
+    client._connection.user = SimpleNamespace(id=0)
+    messages = [FakeMessage(i) for i in range(args.pagers)]
+    authors = [SimpleNamespace(id=i + 1) for i in range(args.pagers)]
+    tasks = [asyncio.ensure_future(old_pager(client, msg, author)) for msg, author in zip(messages, authors)]
+    await settle(5)
+
+    elapsed = 0
+    for index, emoji in events:
+        reaction = SimpleNamespace(message=messages[index], emoji=emoji)
+        start = time.perf_counter()
+        client.dispatch('reaction_add', reaction, authors[index])
+        elapsed += time.perf_counter() - start
+        await settle(5)
+
+    for task in tasks:
+        task.cancel()
+    await settle(5)
+    return elapsed, sum(msg.pages_shown for msg in messages)
+
+
+async def run_keyed(args, events):
+    client = FakeClient()
+    messages = [FakeMessage(i) for i in range(args.pagers)]
+    authors = [SimpleNamespace(id=i + 1) for i in range(args.pagers)]
+    pages = ["Page {}".format(i) for i in range(3)]
+    tasks = [
+        asyncio.ensure_future(interactive._pager(SimpleNamespace(client=client, author=author), msg,
+                                                 interactive.PageSource(pages), True))
+        for msg, author in zip(messages, authors)
+    ]
+    await settle(5)
+    assert len(client.waiters) == args.pagers
+
+    handler = client.handlers['reaction_add'][0]
+    elapsed = 0
+    for index, emoji in events:
+        reaction = SimpleNamespace(message=messages[index], emoji=emoji)
+        start = time.perf_counter()
+        await handler(client, reaction, authors[index])
+        elapsed += time.perf_counter() - start
+        await settle(5)
+
+    for task in tasks:
+        task.cancel()
+    await settle(5)
+    return elapsed, sum(msg.pages_shown for msg in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pagers', type=int, default=5000, help="Number of concurrently open pagers.")
+    parser.add_argument('--events', type=int, default=20000, help="Number of reactions to dispatch.")
+    args = parser.parse_args()
+
+    events = [(random.randrange(args.pagers), random.choice([NEXT, PREV])) for _ in range(args.events)]
+
+    loop = asyncio.get_event_loop()
+    results = [
+        ("Check scan", loop.run_until_complete(run_old(args, events))),
+        ("Keyed waiters", loop.run_until_complete(run_keyed(args, events))),
+    ]
+    print("{} reactions across {} open pagers".format(args.events, args.pagers))
+    for name, (elapsed, handled) in results:
+        print("{:<16} {:>10.1f} us/event {:>8} pages turned".format(name, elapsed / len(events) * 1e6, handled))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 import os
+import copy
+import time
+from collections import OrderedDict
 from datetime import datetime
 import sqlite3 as sq
 import json
 
+from utils.dbwriter import WriteBehindQueue, configure_connection
+
 prop_table_info = [
         ("users", "users", ["userid"]),
         ("guilds", "guilds", ["guildid"]),
@@ -10,11 +15,13 @@ prop_table_info = [
 
 
 class BotData:
-    def __init__(self, app="", data_file="data.db", version=0):
+    def __init__(self, app="", data_file="data.db", version=0, cache_size=10000,
+                 wal=True, synchronous="NORMAL", batch_interval=0.05, batch_size=200, validate_interval=None):
         to_create = not os.path.exists(data_file)
 
         # Connect to database
         self.conn = sq.connect(data_file, timeout=20)
+        configure_connection(self.conn, wal=wal, synchronous=synchronous)
 
         # Handle version checking
         now = datetime.timestamp(datetime.utcnow())
@@ -50,22 +57,63 @@ class BotData:
                      "Please migrate database.").format(current_version, version)
                 )
 
+        # Start the writer thread for property writes
+        self.writer = WriteBehindQueue(data_file,
+                                       batch_interval=batch_interval, batch_size=batch_size,
+                                       wal=wal, synchronous=synchronous)
+
         # Load property tables
         for name, table_name, keys in prop_table_info:
-            manipulator = _propTableManipulator(table_name, keys, self.conn, app)
+            manipulator = _propTableManipulator(table_name, keys, self.conn, app,
+                                                cache_size=cache_size, writer=self.writer,
+                                                validate_interval=validate_interval)
             self.__setattr__(name, manipulator)
 
+    def flush(self):
+        """
+        Block until all queued writes are committed.
+        """
+        self.writer.flush()
+
+    async def flush_async(self):
+        """
+        Wait, without blocking the event loop, until all queued writes are committed.
+        """
+        await self.writer.flush_async()
+
     def close(self):
+        self.writer.close()
         self.conn.commit()
         self.conn.close()
 
 
 class _propTableManipulator:
-    def __init__(self, table, keys, conn, app):
+    # Cache marker for properties which have no stored value
+    _missing = object()
+
+    def __init__(self, table, keys, conn, app, cache_size=10000, writer=None, validate_interval=None):
         self.table = table
         self.keys = keys
         self.conn = conn
         self.app = app
+        self.writer = writer  # WriteBehindQueue for property writes
+
+        # LRU cache of decoded values, keyed by (keys..., mapped property)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        # Encoded values of writes which may not be committed yet, keyed like the cache.
+        # Reads fall back to these, so that they never wait for the writer thread.
+        self._pending = {}  # Map cache key -> (write sequence number, encoded value)
+        self._prune_at = 1000
+
+        # When other processes write to the database, the cache is checked for changes every `validate_interval`
+        self.validate_interval = validate_interval
+        self.invalidations = 0
+        self._data_version = None
+        self._validated = 0
 
         self.ensure_tables()
         self.propmap = self.get_propmap()
@@ -106,34 +154,186 @@ class _propTableManipulator:
                 self.propmap = self.get_propmap()
                 self.conn.commit()
 
+    def _cache_store(self, key, value):
+        """
+        Store a decoded value in the cache, evicting the least recently used entries if required.
+        """
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _pending_value(self, key):
+        """
+        Return the encoded value of the uncommitted write of the given cache key, or `None` if there isn't one.
+        """
+        entry = self._pending.get(key, None)
+        if entry is None:
+            return None
+        if entry[0] > self.writer.completed:
+            return entry[1]
+        self._pending.pop(key)
+        return None
+
+    def _pending_writes(self, prop):
+        """
+        Return a dictionary `id -> encoded value` of the uncommitted writes of the given mapped property.
+        Only used with tables with a single key.
+        """
+        completed = self.writer.completed
+        return {key[0]: value for key, (seq, value) in self._pending.items() if key[1] == prop and seq > completed}
+
+    def _track_pending(self, key, value):
+        """
+        Record an uncommitted write, dropping the entries of committed writes once there are many of them.
+        """
+        self._pending[key] = (self.writer.submitted, value)
+        if len(self._pending) > self._prune_at:
+            completed = self.writer.completed
+            self._pending = {key: entry for key, entry in self._pending.items() if entry[0] > completed}
+            self._prune_at = max(1000, 2 * len(self._pending))
+
+    def validate_cache(self):
+        """
+        Clear the cache if the database has been changed by another process since the last check,
+        at most once every `validate_interval` seconds.
+        Changes are detected through the `PRAGMA data_version` of the writer connection,
+        which ignores the commits of our own writer, so our own writes never clear the cache.
+        """
+        if self.validate_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._validated < self.validate_interval:
+            return
+
+        version = self.writer.external_version()
+        if version is None:
+            # The writer is committing, check again on the next read
+            return
+        self._validated = now
+
+        if self._data_version is not None and version != self._data_version:
+            self.cache.clear()
+            self.invalidations += 1
+        self._data_version = version
+
+    def cache_info(self):
+        """
+        Return a dictionary of cache statistics.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.cache),
+            'maxsize': self.cache_size,
+            'invalidations': self.invalidations
+        }
+
     def get(self, *args, default=None):
         if len(args) != len(self.keys) + 1:
             raise Exception("Improper number of keys passed to get.")
         prop = self.map_prop(args[-1])
-        criteria = " AND ".join("{} = ?" for key in args)
+        key = (*args[:-1], prop)
+        self.validate_cache()
 
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT value from {} where {}'.format(self.table, criteria).format(*self.keys, 'property'), tuple([*args[:-1], prop]))
-        value = cursor.fetchone()
-        return json.loads(value[0]) if (value and value[0]) else default
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            value = self.cache[key]
+        else:
+            self.misses += 1
+            pending = self._pending_value(key)
+            if pending is not None:
+                value = json.loads(pending)
+            else:
+                criteria = " AND ".join("{} = ?" for key in args)
+
+                cursor = self.conn.cursor()
+                cursor.execute('SELECT value from {} where {}'.format(self.table, criteria).format(*self.keys, 'property'), tuple([*args[:-1], prop]))
+                row = cursor.fetchone()
+                value = json.loads(row[0]) if (row and row[0]) else self._missing
+            self._cache_store(key, value)
+
+        if value is self._missing:
+            return default
+        # Copy mutable values so that callers can't modify the cached value
+        return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+
+    def get_many(self, ids, prop):
+        """
+        Batched version of `get` for tables with a single key.
+        Returns a dictionary `id -> value` for each of the given ids with a stored value.
+        """
+        if len(self.keys) > 1:
+            raise Exception("This method cannot currently be used when there are multiple keys")
+        prop = self.map_prop(prop)
+        self.validate_cache()
+
+        values = {}
+        missing = []
+        for keyid in set(ids):
+            key = (keyid, prop)
+            if key in self.cache:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                if self.cache[key] is not self._missing:
+                    values[keyid] = self.cache[key]
+            else:
+                pending = self._pending_value(key)
+                if pending is None:
+                    missing.append(keyid)
+                else:
+                    self.misses += 1
+                    value = json.loads(pending)
+                    self._cache_store(key, value)
+                    values[keyid] = value
+
+        if missing:
+            self.misses += len(missing)
+            cursor = self.conn.cursor()
+            found = {}
+            # Stay well within the SQLite variable limit
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i+500]
+                cursor.execute(
+                    'SELECT {}, value FROM {} WHERE property = ? AND {} IN ({})'.format(
+                        self.keys[0], self.table, self.keys[0], ", ".join('?' for keyid in chunk)
+                    ),
+                    (prop, *chunk)
+                )
+                found.update((row[0], json.loads(row[1])) for row in cursor.fetchall() if row[1])
+            for keyid in missing:
+                value = found.get(keyid, self._missing)
+                self._cache_store((keyid, prop), value)
+                if value is not self._missing:
+                    values[keyid] = value
+
+        # Copy mutable values so that callers can't modify the cached values
+        return {keyid: copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+                for keyid, value in values.items()}
 
     def set(self, *args):
+        """
+        Queue a property write, and update the cache immediately.
+        Returns a future which resolves when the write is committed.
+        """
         if len(args) != len(self.keys) + 2:
             raise Exception("Improper number of keys passed to set.")
         prop = self.map_prop(args[-2])
         value = json.dumps(args[-1])
-        criteria = " AND ".join("{} = ?" for key in args[:-1])
         values = ", ".join("?" for key in args)
 
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT EXISTS(SELECT 1 from {} where {})'.format(self.table, criteria).format(*self.keys, 'property'), tuple([*args[:-2], prop]))
-        exists = cursor.fetchone()
+        # Write through to the cache, decoding a fresh copy of the stored value
+        key = (*args[:-2], prop)
+        self._cache_store(key, json.loads(value))
 
-        if not exists[0]:
-            cursor.execute('INSERT INTO {} VALUES ({})'.format(self.table, values), tuple([*args[:-2], prop, value]))
-        else:
-            cursor.execute('UPDATE {} SET value = ? WHERE {}'.format(self.table, criteria).format(*self.keys, 'property'), tuple([value, *args[:-2], prop]))
-        self.conn.commit()
+        # The primary key covers the keys and property, so a replace acts as an insert or update
+        future = self.writer.execute(
+            'INSERT OR REPLACE INTO {} VALUES ({})'.format(self.table, values),
+            tuple([*args[:-2], prop, value])
+        )
+        self._track_pending(key, value)
+        return future
 
     def find(self, prop, value, read=False):
         if len(self.keys) > 1:
@@ -144,7 +344,7 @@ class _propTableManipulator:
 
         cursor = self.conn.cursor()
         cursor.execute('SELECT {} FROM {} WHERE property = ? AND value = ?'.format(self.keys[0], self.table), (prop, value))
-        return [value[0] for value in cursor.fetchall()]
+        return self._merge_pending(prop, [row[0] for row in cursor.fetchall()], lambda stored: stored == value)
 
     def find_not_empty(self, prop):
         if len(self.keys) > 1:
@@ -153,4 +353,16 @@ class _propTableManipulator:
 
         cursor = self.conn.cursor()
         cursor.execute('SELECT {} FROM {} WHERE property = ? AND value IS NOT NULL AND value != \'\''.format(self.keys[0], self.table), (prop,))
-        return [value[0] for value in cursor.fetchall()]
+        return self._merge_pending(prop, [row[0] for row in cursor.fetchall()], bool)
+
+    def _merge_pending(self, prop, keyids, matches):
+        """
+        Update the ids found by a query of the given property with the uncommitted writes of the property.
+        Ids with an uncommitted write are kept if `matches` accepts the pending encoded value.
+        """
+        pending = self._pending_writes(prop)
+        if not pending:
+            return keyids
+        found = [keyid for keyid in keyids if keyid not in pending]
+        found.extend(keyid for keyid, value in pending.items() if matches(value))
+        return found
@@ -1,18 +1,21 @@
-import asyncio
+import re
 import datetime
-import logging
-import traceback
 import discord
 from enum import Enum
+from array import array
 
-from logger import log
+from utils.metrics import metrics
 
 
 class Timer(object):
     clock_period = 600
     max_warning = 1
+    max_messages = 5  # Number of recent stage messages owned by the timer
+    clock = None  # Optional function returning the current timestamp, used by `now`
+
+    def __init__(self, name, role, channel, clock_channel=None, stages=None, interface=None):
+        self.interface = interface  # Owning TimerInterface, if any
 
-    def __init__(self, name, role, channel, clock_channel=None, stages=None):
         self.channel = channel
         self.clock_channel = clock_channel
         self.role = role
@@ -21,7 +24,7 @@ class Timer(object):
 
         self.start_time = None  # Session start time
         self.current_stage_start = None  # Time at which the current stage started
-        self.remaining = None  # Amount of time until the next stage starts
+        self._remaining = None  # Last recorded time until the next stage starts, see `remaining`
         self.state = TimerState.STOPPED  # Current state of the timer
 
         self.stages = stages  # List of stages in this timer
@@ -29,10 +32,17 @@ class Timer(object):
 
         self.subscribed = {}  # Dict of subbed members, userid maps to (user, lastupdate, timesubbed)
 
+        self.member_state = SubscriberState()  # Scalar state of the subscribers, see `TimerSubscriber`
+
         self.timer_messages = []  # List of sent message ids that this timer owns, e.g. for reaction handling
 
         self.last_clockupdate = 0
 
+        self.version = 0  # Incremented whenever the displayed timer state changes, see `mark_changed`
+        self.member_version = 0  # Incremented whenever the subscribers change
+        self._stage_cache = None  # (version, head, tail) of the rendered stage table
+        self._member_cache = None  # (member_version, rendered member list)
+
         if stages:
             self.setup(stages)
 
@@ -54,12 +64,87 @@ class Timer(object):
         now = self.now()
         self.start_time = now
 
-        self.remaining = stages[0].duration
+        self.remaining = stages[0].duration * 60
         self.current_stage_start = now
 
+        self.mark_changed()
+        self.record('setup')
+
         # Return self for method chaining
         return self
 
+    @property
+    def remaining(self):
+        """
+        Number of seconds until the next stage starts.
+        Computed from the current stage start while the timer is running.
+        """
+        if self.state == TimerState.RUNNING and self.stages:
+            return int(60 * self.stages[self.current_stage].duration - (self.now() - self.current_stage_start))
+        return self._remaining
+
+    @remaining.setter
+    def remaining(self, value):
+        self._remaining = value
+
+    def stage_deadline(self):
+        """
+        Return the timestamp at which the current stage ends, or `None` if the timer isn't running.
+        """
+        if self.state == TimerState.RUNNING and self.stages:
+            return self.current_stage_start + 60 * self.stages[self.current_stage].duration
+        return None
+
+    def schedule(self):
+        """
+        Register the current stage deadline with the interface scheduler.
+        Should be called whenever the state, stage or stage start of the timer changes.
+        """
+        if self.interface is not None:
+            self.interface.scheduler.schedule(self)
+
+    def mark_changed(self, members=False):
+        """
+        Invalidate the cached status rendering.
+        Should be called whenever the name, state, stages or current stage of the timer changes,
+        and with `members` set whenever a member subscribes or unsubscribes.
+        """
+        self.version += 1
+        if members:
+            self.member_version += 1
+
+    def status_key(self):
+        """
+        Return a key which changes whenever the rendered status of the timer may change,
+        including the remaining time of a running timer.
+        """
+        return (self.version, self.member_version, self.remaining if self.state == TimerState.RUNNING else None)
+
+    def record(self, event, subscribers=False):
+        """
+        Record the current state of the timer, and optionally of its subscribers, in the interface journal.
+        """
+        if self.interface is not None and self.interface.journal is not None:
+            self.interface.journal.record_timer(event, self, subscribers=subscribers)
+
+    def add_message(self, msgid):
+        """
+        Add a message to the recent messages owned by the timer, forgetting the oldest if required.
+        """
+        self.timer_messages.append(msgid)
+        removed = self.timer_messages[:-self.max_messages]
+        self.timer_messages = self.timer_messages[-self.max_messages:]  # Truncate
+
+        if self.interface is not None:
+            self.interface.index_messages(self, added=(msgid,), removed=removed)
+
+    def notify(self, member, content):
+        """
+        Send a direct message to a member in the background, through the interface notification dispatcher.
+        """
+        if self.interface is not None and self.interface.notifier is not None:
+            self.interface.notifier.send(member, content)
+
     async def update_clock_channel(self, force=False):
         """
         Try to update the name of the status channel with the current status
@@ -89,17 +174,24 @@ class Timer(object):
         """
         return self.parse_dur(self.remaining, show_seconds=show_seconds)
 
-    def pretty_pinstatus(self):
+    def _pretty_members(self):
         """
-        Return a formatted status string for use in the pinned status message.
+        Return the rendered subscriber list, cached until the subscribers change.
         """
-        subbed_names = [m.member.name for m in self.subscribed.values()]
-        subbed_str = "```{}```".format(", ".join(subbed_names)) if subbed_names else "*No members*"
+        if self._member_cache is None or self._member_cache[0] != self.member_version:
+            subbed_names = [m.member.name for m in self.subscribed.values()]
+            subbed_str = "```{}```".format(", ".join(subbed_names)) if subbed_names else "*No members*"
+            self._member_cache = (self.member_version, subbed_str)
+        return self._member_cache[1]
 
-        if self.state in [TimerState.RUNNING, TimerState.PAUSED]:
+    def _pretty_stages(self):
+        """
+        Return the rendered status header and stage table, cached until the timer changes.
+        The table is split around the remaining time of the current stage, into a `(head, tail)` pair.
+        """
+        if self._stage_cache is None or self._stage_cache[0] != self.version:
             # Collect the component strings and data
             current_stage_name = self.stages[self.current_stage].name
-            remaining = self.pretty_remaining()
 
             # Create a list of lines for the stage string
             longest_stage_len = max(len(stage.name) for stage in self.stages)
@@ -110,23 +202,32 @@ class Timer(object):
                     prefix="->" if i == self.current_stage else "​  ",
                     name=stage.name,
                     dur=stage.duration,
-                    current="(**{}**)".format(remaining) if i == self.current_stage else ""
+                    current="(**\0**)" if i == self.current_stage else ""
                 ) for i, stage in enumerate(self.stages)
             ]
             # Create the stage string itself
             stage_str = "\n".join(stage_str_lines)
 
-            # Create the final formatted status string
+            # Create the formatted status header and table, with a marker for the remaining time
             status_str = ("**{name}**: {current_stage_name} {paused}\n"
-                          "{stage_str}\n"
-                          "{subbed_str}").format(name=self.name,
-                                                 role=self.role.mention,
-                                                 paused=" ***Paused***" if self.state == TimerState.PAUSED else "",
-                                                 current_stage_name=current_stage_name,
-                                                 stage_str=stage_str,
-                                                 subbed_str=subbed_str)
+                          "{stage_str}\n").format(name=self.name,
+                                                  paused=" ***Paused***" if self.state == TimerState.PAUSED else "",
+                                                  current_stage_name=current_stage_name,
+                                                  stage_str=stage_str)
+            head, _, tail = status_str.partition("\0")
+            self._stage_cache = (self.version, head, tail)
+        return self._stage_cache[1:]
+
+    def pretty_pinstatus(self):
+        """
+        Return a formatted status string for use in the pinned status message.
+        Only the remaining time is rendered afresh, the rest is cached until the timer or its subscribers change.
+        """
+        if self.state in [TimerState.RUNNING, TimerState.PAUSED]:
+            head, tail = self._pretty_stages()
+            status_str = head + self.pretty_remaining() + tail + self._pretty_members()
         elif self.state == TimerState.STOPPED:
-            status_str = "**{}**: *Timer not running.*\n{}".format(self.name, subbed_str)
+            status_str = "**{}**: *Timer not running.*\n{}".format(self.name, self._pretty_members())
         return status_str
 
     def pretty_summary(self):
@@ -183,6 +284,7 @@ class Timer(object):
             setup=stage_str
         )
 
+    @metrics.timed('timer_stage_change_seconds')
     async def change_stage(self, stage_index, notify=True, inactivity_check=True, report_old=True):
         """
         Advance the timer to the new stage.
@@ -194,20 +296,21 @@ class Timer(object):
         self.current_stage = stage_index
         self.current_stage_start = self.now()
         self.remaining = self.stages[stage_index].duration * 60
+        self.mark_changed()
+        self.schedule()
+
+        # Handle inactivity of the subbed users
+        if inactivity_check:
+            warn_ids, unsub_ids = self.member_state.check_inactivity(
+                self.now() - current_stage.duration * 60, self.max_warning
+            )
+        else:
+            warn_ids, unsub_ids = set(), set()
+        self.member_state.clear_seen(self.now())
+        needs_warning = [self.subscribed[userid] for userid in warn_ids]
+        unsubs = [self.subscribed[userid] for userid in unsub_ids]
 
-        # Update clocked times for all the subbed users and handle inactivity
-        needs_warning = []
-        unsubs = []
-        for subber in self.subscribed.values():
-            subber.touch()
-            if inactivity_check:
-                if subber.warnings >= self.max_warning:
-                    subber.warnings += 1
-                    unsubs.append(subber)
-                elif (self.now() - subber.last_seen) > current_stage.duration * 60:
-                    subber.warnings += 1
-                    if subber.warnings >= self.max_warning:
-                        needs_warning.append(subber)
+        self.record('stage', subscribers=True)
 
         # Handle not having any subscribers
         empty = (len(self.subscribed) == 0)
@@ -252,8 +355,7 @@ class Timer(object):
                     pass
 
                 # Add the stage message to the owned message list
-                self.timer_messages.append(out_msg.id)
-                self.timer_messages = self.timer_messages[-5:]  # Truncate
+                self.add_message(out_msg.id)
             else:
                 """
                 await self.channel.send(
@@ -267,37 +369,34 @@ class Timer(object):
                 """
                 pass
 
-            # Notify the subscribers as desired
+            # Notify the subscribers as desired, without waiting for delivery
             for subber in self.subscribed.values():
-                try:
-                    out_msg = None
-                    if subber in unsubs and subber.notify >= NotifyLevel.FINAL:
-                        await subber.member.send(
-                            "You have been unsubscribed from group **{}** in {} due to inactivity!".format(
-                                self.name,
-                                self.channel.mention
-                            )
-                        )
-                    elif subber in needs_warning and subber.notify >= NotifyLevel.WARNING:
-                        out_msg = await subber.member.send(
-                            ("**Warning** from group **{}** in {}!\n"
-                             "Please respond or react to a timer message "
-                             "to avoid being unsubscribed on the next stage.\n{}").format(
-                                 self.name,
-                                 self.channel.mention,
-                                 main_line
-                             )
+                if subber.id in unsub_ids and subber.notify >= NotifyLevel.FINAL:
+                    self.notify(
+                        subber.member,
+                        "You have been unsubscribed from group **{}** in {} due to inactivity!".format(
+                            self.name,
+                            self.channel.mention
                         )
-                    elif subber.notify >= NotifyLevel.ALL:
-                        out_msg = await subber.member.send(
-                            "Status update for group **{}** in {}!\n{}".format(self.name,
-                                                                               self.channel.mention,
-                                                                               main_line)
-                        )
-                except discord.Forbidden:
-                    pass
-                except discord.HTTPException:
-                    pass
+                    )
+                elif subber.id in warn_ids and subber.notify >= NotifyLevel.WARNING:
+                    self.notify(
+                        subber.member,
+                        ("**Warning** from group **{}** in {}!\n"
+                         "Please respond or react to a timer message "
+                         "to avoid being unsubscribed on the next stage.\n{}").format(
+                             self.name,
+                             self.channel.mention,
+                             main_line
+                         )
+                    )
+                elif subber.notify >= NotifyLevel.ALL:
+                    self.notify(
+                        subber.member,
+                        "Status update for group **{}** in {}!\n{}".format(self.name,
+                                                                           self.channel.mention,
+                                                                           main_line)
+                    )
 
         for subber in unsubs:
             await subber.unsub()
@@ -308,44 +407,33 @@ class Timer(object):
         """
         await self.change_stage(0, report_old=False)
         self.state = TimerState.RUNNING
-        for subber in self.subscribed.values():
-            subber.touch()
-            subber.active = True
+        self.member_state.accrue(self.now())
+        self.member_state.set_active(True)
 
-        asyncio.ensure_future(self.runloop())
+        self.mark_changed()
+        self.schedule()
+        self.record('start', subscribers=True)
 
     def stop(self):
         """
         Stop the timer, and ensure the subscriber clocked times are updated.
         """
-        for subber in self.subscribed.values():
-            subber.touch()
-            subber.active = False
+        self.member_state.accrue(self.now())
+        self.member_state.set_active(False)
 
         self.state = TimerState.STOPPED
-
-    async def runloop(self):
-        while self.state == TimerState.RUNNING:
-            self.remaining = int(60*self.stages[self.current_stage].duration - (self.now() - self.current_stage_start))
-            if self.remaining <= 0:
-                try:
-                    await self.change_stage(self.current_stage + 1)
-                    asyncio.ensure_future(self.update_clock_channel(force=True))
-                except Exception:
-                    full_traceback = traceback.format_exc()
-                    log("Exception encountered while changing stage.\n{}".format(full_traceback),
-                        context="TIMER_RUNLOOP",
-                        level=logging.ERROR)
-
-            # Disable clock update since the channel update ratelimit is too slow
-            # asyncio.ensure_future(self.update_clock_channel())
-            await asyncio.sleep(1)
+        self.mark_changed()
+        self.schedule()
+        self.record('stop', subscribers=True)
 
     @staticmethod
     def now():
         """
         Helper to get the current UTC timestamp as an integer.
+        Uses `Timer.clock` instead of the system time when it is set, e.g. to a simulated clock.
         """
+        if Timer.clock is not None:
+            return int(Timer.clock())
         return int(datetime.datetime.timestamp(datetime.datetime.utcnow()))
 
     @staticmethod
@@ -395,9 +483,14 @@ class Timer(object):
             TimerStage.deserialise(stage_data) for stage_data in data['stages']
         ] if data['stages'] else None
         self.current_stage = data.get('current_stage', 0)
+
+        old_messages = self.timer_messages
         self.timer_messages = data.get('messages', [])
+        if self.interface is not None:
+            self.interface.index_messages(self, added=self.timer_messages, removed=old_messages)
 
-        asyncio.ensure_future(self.runloop())
+        self.mark_changed()
+        self.schedule()
         return self
 
 
@@ -480,25 +573,57 @@ class TimerChannel(object):
     msg: discord.Message
         A valid and current discord Message in the channel.
         Holds the updating timer status messages.
+    editor: EditQueue
+        The queue used to edit the status message.
     """
-    __slots__ = ('channel', 'timers', 'msg', 'old_desc')
+    __slots__ = ('channel', 'timers', 'msg', 'old_desc', 'editor', 'last_refresh', 'last_signature')
 
-    def __init__(self, channel):
+    def __init__(self, channel, editor):
         self.channel = channel
+        self.editor = editor
 
         self.timers = []
         self.msg = None
 
         self.old_desc = ""
 
-    async def update(self):
+        self.last_refresh = Timer.now()  # Time at which the status was last rendered for refreshing
+        self.last_signature = None  # Signature of the timers at the last refresh
+
+    def is_active(self):
         """
-        Create or update the channel status message.
+        Whether any of the timers in the channel are running or paused.
+        """
+        return any(timer.state != TimerState.STOPPED for timer in self.timers)
+
+    def signature(self):
+        """
+        Cheap summary of the timer state shown in the status message.
+        The status only needs refreshing for reasons other than the passage of time if this changes.
+        """
+        return tuple((timer.version, timer.member_version) for timer in self.timers)
+
+    @metrics.timed('timer_render_seconds')
+    def render(self):
+        """
+        Return the current status message description, or `None` if there are no timers.
         """
         messages = [timer.pretty_pinstatus() for timer in self.timers]
-        if messages:
-            desc = "\n\n".join(messages)
+        return "\n\n".join(messages) if messages else None
 
+    @metrics.timed('timer_channel_update_seconds')
+    async def update(self, desc=None):
+        """
+        Create or update the channel status message.
+
+        Parameters
+        ----------
+        desc: str
+            The rendered status description, if already available.
+        """
+        if desc is None:
+            desc = self.render()
+        if desc is not None:
             # Don't resend the same message
             if desc == self.old_desc:
                 return
@@ -511,7 +636,8 @@ class TimerChannel(object):
             )
             if self.msg is not None:
                 try:
-                    await self.msg.edit(embed=embed)
+                    # Only the latest status is sent if earlier edits are still waiting
+                    await self.editor.edit(self.msg, embed=embed)
                 except discord.NotFound:
                     self.msg = None
                 except discord.Forbidden:
@@ -593,7 +719,207 @@ class NotifyLevel(Enum):
         return NotImplemented
 
 
+class SubscriberState(object):
+    """
+    Scalar state of a group of subscribers, held in parallel typed arrays indexed by slot.
+
+    Each timer keeps the state of its subscribers in one instance, so that large groups stay compact,
+    and stage changes check every subscriber in bulk.
+    `TimerSubscriber` objects are views of a single slot.
+    Subscribers which are not attached to a timer hold their state in a private instance.
+
+    Activity is also flagged in the `seen` byte array, which is cleared at every stage change.
+    The flags let the inactivity check select its candidates with C level byte operations,
+    so that only subscribers without recent activity are examined individually.
+    """
+    columns = ('last_seen', 'last_updated', 'clocked_time', 'warnings', 'active')
+
+    # Number of seconds after a flag reset before activity is flagged again,
+    # so that the flags still apply to a stage change which runs a little late
+    flag_grace = 60
+
+    # Cached `bytes.translate` tables, mapping warning counts to 1 when they reach the given maximum
+    _warned_tables = {}
+
+    def __init__(self):
+        self.ids = array('q')  # Id of the subscriber in each slot, or 0 for free slots
+        self.last_seen = array('q')  # Timestamp of the last activity of the subscriber
+        self.last_updated = array('q')  # Timestamp of the last clocked time update
+        self.clocked_time = array('q')  # Number of seconds clocked in the current session
+        self.warnings = bytearray()  # Number of inactivity warnings since the last activity
+        self.active = bytearray()  # Whether the clocked time is currently accruing
+        self.live = bytearray()  # Whether the slot is in use
+        self.seen = bytearray()  # Whether the subscriber was active at or after `seen_since`
+
+        self.seen_since = 0  # Timestamp from which activity is flagged in `seen`
+        self._free = []  # Free slots
+
+    def __len__(self):
+        return len(self.ids) - len(self._free)
+
+    def allocate(self, userid):
+        """
+        Return a zeroed slot for the given user.
+        """
+        if self._free:
+            slot = self._free.pop()
+            for name in self.columns:
+                getattr(self, name)[slot] = 0
+        else:
+            slot = len(self.ids)
+            self.ids.append(0)
+            self.live.append(0)
+            self.seen.append(0)
+            for name in self.columns:
+                getattr(self, name).append(0)
+        self.ids[slot] = userid
+        self.live[slot] = 1
+        return slot
+
+    def release(self, slot):
+        self.ids[slot] = 0
+        self.live[slot] = 0
+        self.seen[slot] = 0
+        self.warnings[slot] = 0
+        self.active[slot] = 0
+        self._free.append(slot)
+
+    def attach(self, subber):
+        """
+        Move the state of a subscriber into a new slot, and point the subscriber view at it.
+        """
+        if subber.state is self:
+            return
+        state, slot = subber.state, subber.slot
+        new_slot = self.allocate(subber.id)
+        for name in self.columns:
+            getattr(self, name)[new_slot] = getattr(state, name)[slot]
+        self.seen[new_slot] = self.last_seen[new_slot] >= self.seen_since
+        state.release(slot)
+        subber.state, subber.slot = self, new_slot
+
+    def detach(self, subber):
+        """
+        Move the state of a subscriber out into a private instance, freeing its slot.
+        """
+        if subber.state is self:
+            SubscriberState().attach(subber)
+
+    def see(self, slot, timestamp):
+        """
+        Record activity of the subscriber in the given slot.
+        """
+        self.last_seen[slot] = timestamp
+        self.seen[slot] = timestamp >= self.seen_since
+
+    def clear_seen(self, now):
+        """
+        Clear the activity flags, at the start of a stage.
+        """
+        self.seen = bytearray(len(self.ids))
+        self.seen_since = now + self.flag_grace
+
+    def accrue(self, now):
+        """
+        Add the time since the last update to the clocked time of every active subscriber.
+        Clocked time only needs accruing when the active status changes, see `TimerSubscriber.touch`.
+        """
+        self.clocked_time = array('q', [
+            clocked + now - updated if active else clocked
+            for clocked, updated, active in zip(self.clocked_time, self.last_updated, self.active)
+        ])
+        self.last_updated = array('q', [now]) * len(self.ids)
+
+    def set_active(self, active):
+        """
+        Set the active status of every subscriber, after accruing their clocked time.
+        """
+        self.active = bytearray(self.live) if active else bytearray(len(self.ids))
+
+    def check_inactivity(self, since, max_warning):
+        """
+        Count an inactivity warning for every subscriber with no activity since the timestamp `since`,
+        and for every subscriber which had already been warned `max_warning` times.
+
+        When `since` is no later than `seen_since`, every flagged subscriber is known to be active,
+        and only the unflagged subscribers are compared with `since`.
+        Otherwise, e.g. after a skipped inactivity check, every subscriber is compared.
+
+        Returns
+        -------
+        The set of ids of the subscribers which should now be warned,
+        and the set of ids of the subscribers which should be unsubscribed.
+        """
+        ids = self.ids
+        size = len(ids)
+        if not size:
+            return set(), set()
+        warnings = self.warnings
+        last_seen = self.last_seen
+
+        table = self._warned_tables.get(max_warning, None)
+        if table is None:
+            table = self._warned_tables[max_warning] = bytes(int(i >= max_warning) for i in range(256))
+        warned = warnings.translate(table)
+        unsub_slots = _flagged_slots(warned)
+
+        # Combine the byte masks as integers, since the masks only hold zeros and ones
+        candidates = int.from_bytes(self.live, 'little') & ~int.from_bytes(warned, 'little')
+        if since <= self.seen_since:
+            candidates &= ~int.from_bytes(self.seen, 'little')
+            inactive_slots = [
+                slot for slot in _flagged_slots(candidates.to_bytes(size, 'little'))
+                if last_seen[slot] < since
+            ]
+        else:
+            inactive = bytes(map(since.__gt__, last_seen))
+            inactive_slots = _flagged_slots(
+                (candidates & int.from_bytes(inactive, 'little')).to_bytes(size, 'little')
+            )
+
+        for slot in unsub_slots:
+            warnings[slot] = min(warnings[slot] + 1, 255)
+        for slot in inactive_slots:
+            warnings[slot] += 1
+
+        warn_ids = {ids[slot] for slot in inactive_slots if warnings[slot] >= max_warning}
+        unsub_ids = {ids[slot] for slot in unsub_slots}
+        return warn_ids, unsub_ids
+
+
+_FLAG = re.compile(b'\x01')
+
+
+def _flagged_slots(mask):
+    """
+    Indexes of the nonzero bytes of a mask holding only zeros and ones.
+    """
+    return [match.start() for match in _FLAG.finditer(mask)]
+
+
+def _state_field(name, cast=None):
+    """
+    Property reading and writing a column of the subscriber state, in the slot of the subscriber.
+    """
+    if cast is None:
+        def fget(self):
+            return getattr(self.state, name)[self.slot]
+    else:
+        def fget(self):
+            return cast(getattr(self.state, name)[self.slot])
+
+    def fset(self, value):
+        getattr(self.state, name)[self.slot] = value
+
+    return property(fget, fset)
+
+
 class TimerSubscriber(object):
+    """
+    A member subscribed to a timer.
+    The scalar state of the subscriber lives in a slot of the `SubscriberState` of the timer,
+    once the subscriber is added to it, and is read and written through the properties below.
+    """
     __slots__ = (
         'member',
         'timer',
@@ -602,13 +928,15 @@ class TimerSubscriber(object):
         'client',
         'id',
         'time_joined',
-        'last_updated',
-        'clocked_time',
-        'active',
-        'last_seen',
-        'warnings'
+        'state',
+        'slot'
     )
 
+    last_updated = _state_field('last_updated')
+    clocked_time = _state_field('clocked_time')
+    warnings = _state_field('warnings')
+    active = _state_field('active', bool)
+
     def __init__(self, member, timer, interface, notify=NotifyLevel.WARNING):
         self.member = member
         self.timer = timer
@@ -618,6 +946,9 @@ class TimerSubscriber(object):
         self.client = interface.client
         self.id = member.id
 
+        self.state = SubscriberState()
+        self.slot = self.state.allocate(self.id)
+
         now = Timer.now()
         self.time_joined = now
 
@@ -628,6 +959,15 @@ class TimerSubscriber(object):
         self.last_seen = now
         self.warnings = 0
 
+    @property
+    def last_seen(self):
+        return self.state.last_seen[self.slot]
+
+    @last_seen.setter
+    def last_seen(self, value):
+        # Also flags the activity, see `SubscriberState.see`
+        self.state.see(self.slot, value)
+
     async def unsub(self):
         return await self.interface.unsub(self.member.guild.id, self.id)
 
@@ -638,6 +978,8 @@ class TimerSubscriber(object):
     def touch(self):
         """
         Update the clocked time based on the active status.
+        The clocked time of every subscriber of a timer is accrued in bulk when the timer starts or stops,
+        so this is only needed before reading the clocked time or changing the active status of a single subscriber.
         """
         now = Timer.now()
         self.clocked_time += (now - self.last_updated) if self.active else 0
@@ -1,35 +1,64 @@
-import os
-import traceback
+import time
 import logging
-import json
 import asyncio
+import traceback
 
 import discord
 
 from cmdClient import Context
 
 from logger import log
+from utils.metrics import metrics
 
-from .trackers import message_tracker, reaction_tracker
+from .trackers import message_tracker
 from .Timer import Timer, TimerChannel, TimerSubscriber, TimerStage, NotifyLevel, TimerState
 from .registry import TimerRegistry
+from .scheduler import TimerScheduler
+from .journal import TimerJournal
+from .notifier import NotificationDispatcher
 from .voice import sub_on_vcjoin
 
 
 class TimerInterface(object):
-    save_interval = 120
+    # State changes are journalled as they happen, so snapshots only compact the journal
+    save_interval = 600
+    compact_entries = 20000
     save_fp = "data/timerstatus.json"
 
-    def __init__(self, client, db_filename):
+    # Status message refresh settings, see `refresh_channels`
+    refresh_budget = 5  # Maximum number of status message edits per second
+    refresh_tick = 1  # Seconds between refresh rounds
+    refresh_min_interval = 5  # Minimum number of seconds between refreshes of a channel
+    boundary_window = 60  # Seconds either side of a stage change in which a channel is refreshed eagerly
+
+    # Maximum number of concurrent member and message requests while restoring
+    restore_concurrency = 20
+    restore_report_interval = 10
+
+    def __init__(self, client, db_filename, db_options=None, refresh_budget=None):
         self.client = client
-        self.registry = TimerRegistry(db_filename)
+        self.registry = TimerRegistry(db_filename, **(db_options or {}))
+        self.scheduler = TimerScheduler(Timer.now)
+        self.journal = TimerJournal(self.save_fp)
+        self.notifier = NotificationDispatcher()
 
         self.guild_channels = {}
         self.channels = {}
-        self.subscribers = {}
+        self.subscribers = {}  # Map of (guildid, userid) -> TimerSubscriber
+        self.user_subscribers = {}  # Map of userid -> {guildid: TimerSubscriber}
+        self.guild_subscribers = {}  # Map of guildid -> {userid: TimerSubscriber}
+        self.message_timers = {}  # Map of messageid -> Timer, for the messages owned by each timer
+        self.clock_timers = {}  # Map of clock channelid -> Timer
+        self.clock_guilds = {}  # Map of guildid -> number of clock channels in the guild
 
         self.last_save = 0
 
+        if refresh_budget is not None:
+            self.refresh_budget = refresh_budget
+        self.refresh_renders = 0  # Number of status messages rendered by the refresh scheduler
+        self.refresh_edits = 0  # Number of status message edits issued by the refresh scheduler
+        self.restore_progress = [0, 0]  # Number of processed and total subscribers being restored
+
         self.ready = False
 
         self.setup_client()
@@ -48,8 +77,7 @@ class TimerInterface(object):
 
         # Track user activity in timer channels
         client.add_after_event("message", message_tracker)
-        client.add_after_event("raw_reaction_add", reaction_tracker)
-        client.add_after_event("raw_reaction_add", self.reaction_sub)
+        client.add_after_event("raw_reaction_add", self.on_reaction)
 
         # Voice event handlers
         client.add_after_event("voice_state_update", sub_on_vcjoin)
@@ -60,22 +88,105 @@ class TimerInterface(object):
 
         self.load_timers()
         await self.restore_save()
+        self.scheduler.start()
 
         self.ready = True
         asyncio.ensure_future(self.updateloop())
 
     async def updateloop(self):
         while True:
-            channels = self.channels.values()
-            delay = max((0.1, 60/len(channels)))
-
-            for tchan in channels:
-                asyncio.ensure_future(tchan.update())
-                await asyncio.sleep(delay)
+            start = time.monotonic()
+            try:
+                self.refresh_channels()
+            except Exception:
+                log("Exception encountered while refreshing timer channels.\n{}".format(traceback.format_exc()),
+                    context="TIMER_REFRESH",
+                    level=logging.ERROR)
 
-            if Timer.now() - self.last_save > self.save_interval:
+            if Timer.now() - self.last_save > self.save_interval or self.journal.entries > self.compact_entries:
                 self.update_save()
 
+            await asyncio.sleep(max(0, self.refresh_tick - (time.monotonic() - start)))
+
+    def refresh_priority(self, tchan, now):
+        """
+        Return the refresh priority of a timer channel, or `None` if it doesn't need refreshing.
+        The priority grows with the time since the last refresh, and is boosted for channels whose
+        timers have changed since, or which are close to a stage change.
+        Channels with no active timers are only refreshed when they change.
+        """
+        age = now - tchan.last_refresh
+        if not tchan.timers or age < self.refresh_min_interval:
+            return None
+
+        changed = tchan.signature() != tchan.last_signature
+        if not tchan.is_active():
+            return 2 * age if changed else None
+
+        weight = 4 if changed else 1
+        for timer in tchan.timers:
+            if timer.state == TimerState.RUNNING and (
+                    timer.remaining <= self.boundary_window
+                    or now - timer.current_stage_start <= self.boundary_window):
+                weight *= 2
+                break
+        return weight * age
+
+    @metrics.timed('timer_refresh_seconds')
+    def refresh_channels(self):
+        """
+        Refresh the status messages of the highest priority timer channels,
+        within the per second edit budget.
+        Channels whose rendered status is unchanged are marked as refreshed without using the budget.
+        """
+        now = Timer.now()
+
+        candidates = []
+        for tchan in self.channels.values():
+            priority = self.refresh_priority(tchan, now)
+            if priority is not None:
+                candidates.append((priority, tchan))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        budget = self.refresh_budget * self.refresh_tick
+        for _, tchan in candidates:
+            if budget <= 0:
+                break
+
+            tchan.last_refresh = now
+            tchan.last_signature = tchan.signature()
+            desc = tchan.render()
+            self.refresh_renders += 1
+            if desc != tchan.old_desc:
+                asyncio.ensure_future(tchan.update(desc))
+                self.refresh_edits += 1
+                budget -= 1
+
+    def channel_staleness(self):
+        """
+        Return a map of channelid -> seconds since the status message was last refreshed,
+        for each timer channel with an active timer.
+        """
+        now = Timer.now()
+        return {
+            channelid: now - tchan.last_refresh
+            for channelid, tchan in self.channels.items() if tchan.is_active()
+        }
+
+    def refresh_stats(self):
+        """
+        Summary of the status refresh scheduler, for monitoring.
+        """
+        staleness = list(self.channel_staleness().values())
+        return {
+            'channels': len(self.channels),
+            'active': len(staleness),
+            'max_staleness': max(staleness) if staleness else 0,
+            'mean_staleness': sum(staleness) / len(staleness) if staleness else 0,
+            'renders': self.refresh_renders,
+            'edits': self.refresh_edits
+        }
+
     def load_timers(self):
         client = self.client
 
@@ -105,37 +216,29 @@ class TimerInterface(object):
                     continue
 
                 # Create the new timer
-                new_timer = Timer(name, role, channel, clock_channel)
+                new_timer = Timer(name, role, channel, clock_channel, interface=self)
 
                 # Get the timer channel, or create it
                 tchan = self.channels.get(channelid, None)
                 if tchan is None:
-                    tchan = TimerChannel(channel)
+                    tchan = TimerChannel(channel, self.client.editor)
                     channels.append(tchan)
                     self.channels[channelid] = tchan
 
                 # Bind the timer to the channel
                 tchan.timers.append(new_timer)
+                self.index_clock(new_timer)
 
             # Assign the channels to the guild
             self.guild_channels[guildid] = channels
 
     async def restore_save(self):
-        # Open save file if it exists
-        if not os.path.exists(self.save_fp):
-            return
-
-        with open(self.save_fp) as f:
-            try:
-                savedata = json.load(f)
-            except Exception:
-                log("Caught the following exception loading the temporary savefile\n{}".format(traceback.format_exc()),
-                    context="TIMER_RESTORE",
-                    level=logging.ERROR)
-                os.rename(self.save_fp, self.save_fp + '_CORRUPTED')
-                return
+        # Recover the latest snapshot and journalled changes
+        savedata = self.journal.load()
 
         if savedata:
+            start = time.perf_counter()
+
             # Create a roleid: timer map
             timers = {timer.role.id: timer for channel in self.channels.values() for timer in channel.timers}
 
@@ -145,44 +248,119 @@ class TimerInterface(object):
                     log("Restored timer {} (roleid {}) from save.".format(timer['name'], timer['roleid']),
                         context="TIMER_RESTORE")
 
+            # Group the subscribers by guild
+            guild_subs = {}
             for sub_data in savedata['subscribers']:
                 if sub_data['roleid'] in timers:
-                    timer = timers[sub_data['roleid']]
-
-                    guild = self.client.get_guild(sub_data['guildid'])
-                    if guild is None:
-                        continue
+                    guild_subs.setdefault(sub_data['guildid'], []).append(sub_data)
 
+            # Restore the guilds concurrently, sharing a bounded pool of member requests
+            self.restore_progress = [0, sum(len(subs) for subs in guild_subs.values())]
+            semaphore = asyncio.Semaphore(self.restore_concurrency)
+            reporter = asyncio.ensure_future(self._report_restore_progress())
+            try:
+                await asyncio.gather(*(
+                    self._restore_guild_subscribers(guildid, subs, timers, semaphore)
+                    for guildid, subs in guild_subs.items()
+                ))
+            finally:
+                reporter.cancel()
+
+            async def _restore_msg(tchan, msgid):
+                async with semaphore:
                     try:
-                        member = await guild.fetch_member(sub_data['id'])
-                    except discord.Forbidden:
-                        continue
+                        tchan.msg = await tchan.channel.fetch_message(msgid)
                     except discord.NotFound:
-                        continue
+                        pass
+                    except discord.Forbidden:
+                        pass
 
-                    if member is None:
-                        continue
+            await asyncio.gather(*(
+                _restore_msg(self.channels[tchan_data['id']], tchan_data['msgid'])
+                for tchan_data in savedata['timer_channels'] if tchan_data['id'] in self.channels
+            ))
 
-                    subber = TimerSubscriber.deserialise(member, timer, self, sub_data)
-                    self.subscribers[(member.guild.id, member.id)] = subber
-                    timer.subscribed[member.id] = subber
+            log("Restored {} of {} saved subscribers in {} guilds in {:.2f} seconds.".format(
+                len(self.subscribers),
+                self.restore_progress[1],
+                len(guild_subs),
+                time.perf_counter() - start
+            ), context="TIMER_RESTORE")
 
-                    log("Restored subscriber {} (id {}) in timer {} (roleid {}) from save.".format(member.name,
-                                                                                                   member.id,
-                                                                                                   timer.name,
-                                                                                                   timer.role.id),
-                        context="TIMER_RESTORE")
+    async def _report_restore_progress(self):
+        """
+        Periodically log the subscriber restore progress.
+        """
+        while True:
+            await asyncio.sleep(self.restore_report_interval)
+            log("Restoring subscribers, {} of {} processed.".format(*self.restore_progress),
+                context="TIMER_RESTORE")
 
-            for tchan_data in savedata['timer_channels']:
-                if tchan_data['id'] in self.channels:
-                    tchan = self.channels[tchan_data['id']]
-                    try:
-                        tchan.msg = await tchan.channel.fetch_message(tchan_data['msgid'])
-                    except discord.NotFound:
-                        continue
-                    except discord.Forbidden:
-                        continue
+    async def _restore_guild_subscribers(self, guildid, subs, timers, semaphore):
+        """
+        Restore the saved subscribers of a single guild.
+        """
+        guild = self.client.get_guild(guildid)
+        if guild is not None:
+            members = await self._fetch_members(guild, [sub_data['id'] for sub_data in subs], semaphore)
+
+            for sub_data in subs:
+                member = members.get(sub_data['id'], None)
+                if member is None:
+                    continue
 
+                timer = timers[sub_data['roleid']]
+                self.add_subscriber(TimerSubscriber.deserialise(member, timer, self, sub_data))
+
+        self.restore_progress[0] += len(subs)
+
+    async def _fetch_members(self, guild, userids, semaphore):
+        """
+        Retrieve the given guild members, returning a map `userid -> member`.
+        Members are taken from the member cache where possible,
+        then requested in bulk through the gateway,
+        and finally fetched individually, with at most `semaphore` requests in flight.
+        Members who could not be found are omitted.
+        """
+        members = {}
+        missing = []
+        for userid in userids:
+            member = guild.get_member(userid)
+            if member is not None:
+                members[userid] = member
+            else:
+                missing.append(userid)
+
+        # Bulk gateway queries are limited to 100 users each
+        queried = set()
+
+        async def _query(chunk):
+            async with semaphore:
+                try:
+                    for member in await guild.query_members(user_ids=chunk, limit=len(chunk)):
+                        members[member.id] = member
+                except Exception:
+                    # Leave these members to the individual fetches
+                    pass
+                else:
+                    # Users missing from a successful query are no longer in the guild
+                    queried.update(chunk)
+
+        await asyncio.gather(*(_query(missing[i:i+100]) for i in range(0, len(missing), 100)))
+
+        async def _fetch(userid):
+            async with semaphore:
+                try:
+                    members[userid] = await guild.fetch_member(userid)
+                except discord.Forbidden:
+                    pass
+                except discord.NotFound:
+                    pass
+
+        await asyncio.gather(*(_fetch(userid) for userid in missing if userid not in queried))
+        return members
+
+    @metrics.timed('timer_save_seconds')
     def update_save(self, save_name="autosave"):
         # Generate save dict
         timers = [timer for channel in self.channels.values() for timer in channel.timers]
@@ -195,21 +373,85 @@ class TimerInterface(object):
             'subscribers': sub_data,
             'timer_channels': tchan_data
         }
-        data_str = json.dumps(data)
-
-        # Backup the save file
-        if os.path.exists(self.save_fp):
-            os.replace(self.save_fp, "{}.{}.old".format(self.save_fp, save_name))
 
-        with open(self.save_fp, 'w') as f:
-            f.write(data_str)
+        # Atomically write the snapshot, backing up the previous one, and compact the journal
+        self.journal.snapshot(data, backup_name=save_name)
 
         self.last_save = Timer.now()
 
+    def index_messages(self, timer, added=(), removed=()):
+        """
+        Update the message index with messages added to or removed from the messages owned by `timer`.
+        """
+        for msgid in removed:
+            if self.message_timers.get(msgid, None) is timer:
+                self.message_timers.pop(msgid)
+        for msgid in added:
+            self.message_timers[msgid] = timer
+
+    def index_clock(self, timer):
+        """
+        Add the clock channel of a timer, if it has one, to the clock channel index.
+        """
+        if timer.clock_channel is not None:
+            guildid = timer.clock_channel.guild.id
+            if self.clock_timers.get(timer.clock_channel.id, None) is None:
+                self.clock_guilds[guildid] = self.clock_guilds.get(guildid, 0) + 1
+            self.clock_timers[timer.clock_channel.id] = timer
+
+    def unindex_clock(self, timer):
+        """
+        Remove the clock channel of a timer from the clock channel index.
+        """
+        if timer.clock_channel is not None and self.clock_timers.get(timer.clock_channel.id, None) is timer:
+            guildid = timer.clock_channel.guild.id
+            self.clock_timers.pop(timer.clock_channel.id)
+            self.clock_guilds[guildid] -= 1
+            if not self.clock_guilds[guildid]:
+                self.clock_guilds.pop(guildid)
+
+    def get_clock_timer(self, guildid, channelid):
+        """
+        Return the timer with the given clock channel, or `None` if the channel isn't a clock channel.
+        """
+        if guildid not in self.clock_guilds:
+            return None
+        return self.clock_timers.get(channelid, None)
+
+    async def on_reaction(self, client, payload):
+        """
+        Handle a reaction in any channel.
+        Reactions in timer channels count as activity for subscribers of the channel timers,
+        and the subscribe reaction on a timer message subscribes the reacting user to the timer.
+        Reactions outside timer channels are dropped before any other work, including the handler timing.
+        """
+        # Quit immediately if the reaction isn't in a timer channel, which also excludes DMs
+        if payload.channel_id not in self.channels:
+            return
+        await self._timer_reaction(client, payload)
+
+    @metrics.timed('handler_seconds', handler='on_reaction')
+    async def _timer_reaction(self, client, payload):
+        """
+        Handle a reaction in a timer channel, see `on_reaction`.
+        """
+        # Bump the member if they are subscribed, otherwise check for a subscribe reaction
+        subber = self.subscribers.get((payload.guild_id, payload.user_id), None)
+        if subber is not None:
+            if payload.channel_id == subber.timer.channel.id:
+                self._bump(subber)
+        else:
+            await self.reaction_sub(client, payload)
+
     async def reaction_sub(self, client, payload):
         """
         Subscribe a user to a timer if press the subscribe reaction.
         """
+        # Get the timer who owns the message, if any
+        timer = self.message_timers.get(payload.message_id, None)
+        if timer is None:
+            return
+
         # Return if the emoji isn't the right one
         if str(payload.emoji) != "✅":
             return
@@ -229,17 +471,6 @@ class TimerInterface(object):
         if payload.user_id == client.user.id:
             return
 
-        # Get the timers in the current channel
-        tchan = self.channels.get(payload.channel_id, None)
-        if tchan is None:
-            return
-        timers = tchan.timers
-
-        # Get the timer who owns the message, if any
-        timer = next((timer for timer in timers if payload.message_id in timer.timer_messages), None)
-        if timer is None:
-            return
-
         # Get the reacting user
         user = guild.get_member(payload.user_id)
         if user is None:
@@ -278,13 +509,13 @@ class TimerInterface(object):
         guild = group_role.guild
 
         # Create the new timer
-        new_timer = Timer(group_name, group_role, bound_channel, clock_channel)
+        new_timer = Timer(group_name, group_role, bound_channel, clock_channel, interface=self)
 
         # Bind the timer to a timer channel, creating if required
         tchan = self.channels.get(bound_channel.id, None)
         if tchan is None:
             # Create the timer channel
-            tchan = TimerChannel(bound_channel)
+            tchan = TimerChannel(bound_channel, self.client.editor)
             self.channels[bound_channel.id] = tchan
 
             # Add the timer channel to the guild list, creating if required
@@ -294,6 +525,7 @@ class TimerInterface(object):
                 self.guild_channels[guild.id] = guild_channels
             guild_channels.append(tchan)
         tchan.timers.append(new_timer)
+        self.index_clock(new_timer)
 
         # Store the new timer in guild config
         timers = self.client.config.guilds.get(guild.id, "timers") or []
@@ -315,6 +547,10 @@ class TimerInterface(object):
         # Stop the timer
         timer.stop()
 
+        # Forget the timer messages and clock channel
+        self.index_messages(timer, removed=timer.timer_messages)
+        self.unindex_clock(timer)
+
         # Remove the timer from its channel
         tchan = self.channels.get(timer.channel.id, None)
         if tchan is not None:
@@ -322,6 +558,9 @@ class TimerInterface(object):
             # Cleanup if the channel has no remaining timers
             if len(tchan.timers) == 0:
                 self.channels.pop(timer.channel.id)
+                guild_channels = self.guild_channels.get(timer.channel.guild.id, [])
+                if tchan in guild_channels:
+                    guild_channels.remove(tchan)
 
         # Update the guild timer config
         guild = timer.channel.guild
@@ -343,7 +582,92 @@ class TimerInterface(object):
         """
         Retrieve all TimerSubscribers for the given userid.
         """
-        return [value for (key, value) in self.subscribers.items() if key[1] == userid]
+        return list(self.user_subscribers.get(userid, {}).values())
+
+    def get_guild_subs(self, guildid):
+        """
+        Retrieve all TimerSubscribers in the given guild.
+        """
+        return list(self.guild_subscribers.get(guildid, {}).values())
+
+    def add_subscriber(self, subber):
+        """
+        Add a subscriber to its timer and to the subscriber indexes,
+        replacing any existing subscription of the member in the guild.
+        """
+        guildid = subber.member.guild.id
+        if (guildid, subber.id) in self.subscribers:
+            self.remove_subscriber(guildid, subber.id)
+
+        self.subscribers[(guildid, subber.id)] = subber
+        self.user_subscribers.setdefault(subber.id, {})[guildid] = subber
+        self.guild_subscribers.setdefault(guildid, {})[subber.id] = subber
+
+        subber.timer.subscribed[subber.id] = subber
+        subber.timer.member_state.attach(subber)
+        subber.timer.mark_changed(members=True)
+
+    def remove_subscriber(self, guildid, userid):
+        """
+        Remove a subscriber from its timer and from the subscriber indexes.
+        Returns the removed subscriber, or `None` if the member wasn't subscribed.
+        """
+        subber = self.subscribers.pop((guildid, userid), None)
+        if subber is not None:
+            user_subs = self.user_subscribers[userid]
+            user_subs.pop(guildid)
+            if not user_subs:
+                self.user_subscribers.pop(userid)
+
+            guild_subs = self.guild_subscribers[guildid]
+            guild_subs.pop(userid)
+            if not guild_subs:
+                self.guild_subscribers.pop(guildid)
+
+            subber.timer.subscribed.pop(userid, None)
+            subber.timer.member_state.detach(subber)
+            subber.timer.mark_changed(members=True)
+        return subber
+
+    def check_subscriber_indexes(self):
+        """
+        Check the secondary subscriber indexes and the timer member maps against the primary subscriber map.
+        Returns a list of descriptions of each inconsistency found.
+        An empty list means the indexes are consistent.
+        """
+        problems = []
+        for (guildid, userid), subber in self.subscribers.items():
+            if self.user_subscribers.get(userid, {}).get(guildid, None) is not subber:
+                problems.append("Subscriber ({}, {}) missing from the user index.".format(guildid, userid))
+            if self.guild_subscribers.get(guildid, {}).get(userid, None) is not subber:
+                problems.append("Subscriber ({}, {}) missing from the guild index.".format(guildid, userid))
+            if subber.timer.subscribed.get(userid, None) is not subber:
+                problems.append("Subscriber ({}, {}) missing from its timer.".format(guildid, userid))
+
+        for userid, user_subs in self.user_subscribers.items():
+            for guildid in user_subs:
+                if (guildid, userid) not in self.subscribers:
+                    problems.append("Stale user index entry ({}, {}).".format(guildid, userid))
+            if not user_subs:
+                problems.append("Empty user index entry for {}.".format(userid))
+
+        for guildid, guild_subs in self.guild_subscribers.items():
+            for userid in guild_subs:
+                if (guildid, userid) not in self.subscribers:
+                    problems.append("Stale guild index entry ({}, {}).".format(guildid, userid))
+            if not guild_subs:
+                problems.append("Empty guild index entry for {}.".format(guildid))
+
+        for tchan in self.channels.values():
+            for timer in tchan.timers:
+                for userid, subber in timer.subscribed.items():
+                    if self.subscribers.get((timer.channel.guild.id, userid), None) is not subber:
+                        problems.append("Timer {} has untracked member {}.".format(timer.role.id, userid))
+                    if subber.state is not timer.member_state or timer.member_state.ids[subber.slot] != userid:
+                        problems.append("Timer {} member {} has no state slot.".format(timer.role.id, userid))
+                if len(timer.member_state) != len(timer.subscribed):
+                    problems.append("Timer {} has stale member state slots.".format(timer.role.id))
+        return problems
 
     def get_channel_timers(self, channelid):
         if channelid in self.channels:
@@ -360,16 +684,31 @@ class TimerInterface(object):
             await asyncio.sleep(1)
 
     def bump_user(self, guildid, channelid, userid):
-        # Return if we are in a DM context
-        if guildid == 0:
+        """
+        Record activity of a member in a channel.
+        Activity of subscribers in their timer channel is written straight into the timer member state,
+        and is only read at the next stage change, see `SubscriberState.check_inactivity`.
+        Subscribers with an inactivity warning are bumped normally, so that the cleared warning is journalled.
+        """
+        # Quit immediately outside timer channels, which also excludes DMs
+        tchan = self.channels.get(channelid, None)
+        if tchan is None:
             return
 
-        # Grab the subscriber if it exists
-        subber = self.subscribers.get((guildid, userid), None)
+        for timer in tchan.timers:
+            subber = timer.subscribed.get(userid, None)
+            if subber is not None:
+                state = subber.state
+                if state.warnings[subber.slot]:
+                    self._bump(subber)
+                else:
+                    state.see(subber.slot, Timer.now())
+                return
 
-        # Bump the subscriber
-        if subber is not None and channelid == subber.timer.channel.id:
-            subber.bump()
+    def _bump(self, subber):
+        warned = subber.warnings
+        subber.bump()
+        self.journal.record_bump(subber, force=bool(warned))
 
     async def sub(self, ctx, member, timer):
         log("Subscribing user {} (uid: {}) to timer {} (rid: {})".format(member.name,
@@ -396,8 +735,8 @@ class TimerInterface(object):
         except discord.NotFound:
             await ctx.error_reply("Group role `{}` doesn't exist! This group is broken.".format(timer.role.id))
 
-        timer.subscribed[member.id] = subber
-        self.subscribers[(member.guild.id, member.id)] = subber
+        self.add_subscriber(subber)
+        self.journal.record_sub(subber)
 
     async def unsub(self, guildid, userid):
         """
@@ -410,8 +749,8 @@ class TimerInterface(object):
             session = subber.session_data()
             subber.active = False
 
-            self.subscribers.pop((guildid, userid))
-            subber.timer.subscribed.pop(userid)
+            self.remove_subscriber(guildid, userid)
+            self.journal.record_unsub(guildid, userid)
 
             try:
                 await subber.member.remove_roles(subber.timer.role)
@@ -0,0 +1,198 @@
+import os
+import json
+import shutil
+import logging
+import traceback
+
+from logger import log
+
+
+class TimerJournal(object):
+    """
+    Append-only journal of timer state changes, on top of periodic compacted snapshots.
+
+    Every state change is written to the journal file as a single JSON line as it happens.
+    A snapshot holds the complete timer state, in the save format produced by `TimerInterface.update_save`,
+    together with the sequence number of the last journal entry it includes.
+    Snapshots are written atomically, after which the journal is truncated.
+    The current state is recovered by replaying the journal entries newer than the latest snapshot.
+
+    Parameters
+    ----------
+    snapshot_fp: str
+        Path of the snapshot file.
+    journal_fp: str
+        Path of the journal file. Defaults to the snapshot path with a `.journal` suffix.
+    """
+    # Minimum number of seconds between journalled bumps of the same subscriber
+    bump_interval = 60
+
+    def __init__(self, snapshot_fp, journal_fp=None):
+        self.snapshot_fp = snapshot_fp
+        self.journal_fp = journal_fp or snapshot_fp + ".journal"
+
+        self.seq = 0  # Sequence number of the last recorded entry
+        self.entries = 0  # Number of entries in the journal file
+
+        self._file = None
+        self._bumped = {}  # Map (guildid, userid) -> last journalled bump time
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.journal_fp, 'a')
+        return self._file
+
+    def record(self, event, **data):
+        """
+        Append a state change to the journal.
+        """
+        self.seq += 1
+        self.entries += 1
+        data['seq'] = self.seq
+        data['event'] = event
+
+        journal = self._open()
+        journal.write(json.dumps(data) + '\n')
+        journal.flush()
+
+    def record_timer(self, event, timer, subscribers=False):
+        """
+        Record the current state of a timer, and optionally of its subscribers.
+        """
+        self.record(
+            event,
+            timer=timer.serialise(),
+            subscribers=[subber.serialise() for subber in timer.subscribed.values()] if subscribers else []
+        )
+
+    def record_sub(self, subber):
+        self.record('sub', subscriber=subber.serialise())
+
+    def record_unsub(self, guildid, userid):
+        self._bumped.pop((guildid, userid), None)
+        self.record('unsub', guildid=guildid, id=userid)
+
+    def record_bump(self, subber, force=False):
+        """
+        Record a subscriber bump.
+        To keep message tracking cheap, bumps are only journalled if they cleared a warning,
+        or if the last journalled bump of the subscriber is older than `bump_interval`.
+        """
+        key = (subber.member.guild.id, subber.id)
+        if force or subber.last_seen - self._bumped.get(key, 0) >= self.bump_interval:
+            self._bumped[key] = subber.last_seen
+            self.record('bump', guildid=key[0], id=key[1], last_seen=subber.last_seen)
+
+    def snapshot(self, state, backup_name=None):
+        """
+        Atomically write a snapshot of the full state and truncate the journal.
+        If `backup_name` is given, the previous snapshot is kept as a backup.
+        """
+        state = dict(state, seq=self.seq)
+        tmp_fp = self.snapshot_fp + ".tmp"
+        with open(tmp_fp, 'w') as f:
+            f.write(json.dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+
+        if backup_name and os.path.exists(self.snapshot_fp):
+            shutil.copyfile(self.snapshot_fp, "{}.{}.old".format(self.snapshot_fp, backup_name))
+        os.replace(tmp_fp, self.snapshot_fp)
+
+        # The snapshot now includes every journal entry
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_fp, 'w')
+        self.entries = 0
+
+    def load(self):
+        """
+        Read the latest snapshot and replay the journal entries recorded after it.
+        Returns the recovered state, in the snapshot format, or `None` if there is no saved state.
+        """
+        state = None
+        if os.path.exists(self.snapshot_fp):
+            with open(self.snapshot_fp) as f:
+                try:
+                    state = json.load(f)
+                except Exception:
+                    log("Caught the following exception loading the timer snapshot\n{}".format(traceback.format_exc()),
+                        context="TIMER_RESTORE",
+                        level=logging.ERROR)
+                    state = None
+            if state is None:
+                os.rename(self.snapshot_fp, self.snapshot_fp + '_CORRUPTED')
+
+        base_seq = state.get('seq', 0) if state else 0
+        self.seq = base_seq
+
+        entries = []
+        if os.path.exists(self.journal_fp):
+            valid_length = 0
+            truncated = False
+            with open(self.journal_fp, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line.decode())
+                    except ValueError:
+                        # Partially written final entry
+                        log("Discarding unreadable journal entry after seq {}.".format(self.seq),
+                            context="TIMER_RESTORE",
+                            level=logging.WARNING)
+                        truncated = True
+                        break
+                    valid_length += len(line)
+                    if entry['seq'] > base_seq:
+                        entries.append(entry)
+                        self.seq = entry['seq']
+
+            # Cut off any unreadable tail so that new entries can be appended
+            if truncated:
+                os.truncate(self.journal_fp, valid_length)
+
+        if state is None and not entries:
+            return None
+
+        # Key the state for replay
+        state = state or {}
+        timers = {data['roleid']: data for data in state.get('timers', [])}
+        subscribers = {(data['guildid'], data['id']): data for data in state.get('subscribers', [])}
+
+        for entry in entries:
+            self.apply(entry, timers, subscribers)
+        self.entries = len(entries)
+
+        log("Replayed {} journal entries on top of the timer snapshot.".format(len(entries)),
+            context="TIMER_RESTORE")
+
+        return {
+            'timers': list(timers.values()),
+            'subscribers': list(subscribers.values()),
+            'timer_channels': state.get('timer_channels', [])
+        }
+
+    @staticmethod
+    def apply(entry, timers, subscribers):
+        """
+        Apply a single journal entry to the keyed timer and subscriber state.
+        """
+        event = entry['event']
+        if 'timer' in entry:
+            timers[entry['timer']['roleid']] = entry['timer']
+            for data in entry['subscribers']:
+                subscribers[(data['guildid'], data['id'])] = data
+        elif event == 'sub':
+            data = entry['subscriber']
+            subscribers[(data['guildid'], data['id'])] = data
+        elif event == 'unsub':
+            subscribers.pop((entry['guildid'], entry['id']), None)
+        elif event == 'bump':
+            data = subscribers.get((entry['guildid'], entry['id']), None)
+            if data is not None:
+                data['last_seen'] = entry['last_seen']
+                data['warnings'] = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
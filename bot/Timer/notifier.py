@@ -0,0 +1,141 @@
+import time
+import asyncio
+import logging
+import traceback
+from collections import deque
+
+import discord
+
+from logger import log
+from utils.editqueue import TokenBucket
+
+
+class NotificationDispatcher(object):
+    """
+    Fire-and-forget dispatcher for direct message notifications.
+
+    Messages are sent concurrently in the background, limited by a global semaphore
+    and a token bucket for each destination user, so callers such as `Timer.change_stage`
+    never wait for direct messages to be delivered.
+    Users whose direct messages are closed (the send raises `discord.Forbidden`) are remembered
+    for `closed_ttl` seconds, and notifications to them are skipped in the meantime.
+
+    Parameters
+    ----------
+    concurrency: int
+        Maximum number of direct messages in flight at once.
+    user_limit: int
+        Number of messages allowed to a single user in each `user_period`.
+    user_period: float
+        Length of the per user rate limit window, in seconds.
+    closed_ttl: float
+        Number of seconds to skip a user for after their direct messages were found closed.
+    """
+    def __init__(self, concurrency=10, user_limit=5, user_period=5, closed_ttl=86400):
+        self.concurrency = concurrency
+        self.user_limit = user_limit
+        self.user_period = user_period
+        self.closed_ttl = closed_ttl
+
+        self._semaphore = None
+        self._buckets = {}  # Map userid -> TokenBucket
+        self.closed = {}  # Map userid -> time at which their direct messages were found closed
+
+        self._sent_times = deque(maxlen=10000)  # Monotonic times of recent successful sends
+
+        self.pending = 0  # Number of notifications waiting or in flight
+        self.sent = 0  # Number of notifications delivered
+        self.failed = 0  # Number of notifications which failed to send
+        self.forbidden = 0  # Number of notifications refused because direct messages were closed
+        self.skipped = 0  # Number of notifications skipped for users with closed direct messages
+
+    def send(self, member, content):
+        """
+        Queue a direct message to `member`, and return immediately.
+        """
+        if self.is_closed(member.id):
+            self.skipped += 1
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.pending += 1
+        asyncio.ensure_future(self._deliver(member, content))
+
+    def is_closed(self, userid):
+        """
+        Whether the user's direct messages were recently found closed.
+        """
+        closed_at = self.closed.get(userid, None)
+        if closed_at is not None and time.monotonic() - closed_at > self.closed_ttl:
+            self.closed.pop(userid)
+            closed_at = None
+        return closed_at is not None
+
+    def forget(self, userid):
+        """
+        Allow notifications to a user again, e.g. after they have changed their notification settings.
+        """
+        self.closed.pop(userid, None)
+
+    def throughput(self, window=60):
+        """
+        Average number of notifications delivered per second over the last `window` seconds.
+        """
+        cutoff = time.monotonic() - window
+        return sum(1 for sent_at in self._sent_times if sent_at >= cutoff) / window
+
+    def stats(self):
+        """
+        Summary of the dispatcher state, for monitoring.
+        """
+        return {
+            'pending': self.pending,
+            'sent': self.sent,
+            'failed': self.failed,
+            'forbidden': self.forbidden,
+            'skipped': self.skipped,
+            'closed_users': len(self.closed),
+            'throughput': self.throughput()
+        }
+
+    def _bucket_for(self, userid):
+        bucket = self._buckets.get(userid, None)
+        if bucket is None:
+            # Forget idle users with a full budget
+            if len(self._buckets) >= 10000:
+                now = time.monotonic()
+                for key in [key for key, value in self._buckets.items() if not value.wait_time(now)]:
+                    self._buckets.pop(key)
+            bucket = self._buckets[userid] = TokenBucket(self.user_limit, self.user_period)
+        return bucket
+
+    async def _deliver(self, member, content):
+        try:
+            # Wait for the user's budget
+            bucket = self._bucket_for(member.id)
+            wait = bucket.wait_time(time.monotonic())
+            while wait:
+                await asyncio.sleep(wait)
+                wait = bucket.wait_time(time.monotonic())
+            bucket.take()
+
+            async with self._semaphore:
+                if self.is_closed(member.id):
+                    self.skipped += 1
+                    return
+                await member.send(content)
+            self.sent += 1
+            self._sent_times.append(time.monotonic())
+        except discord.Forbidden:
+            self.forbidden += 1
+            self.closed[member.id] = time.monotonic()
+        except discord.HTTPException:
+            self.failed += 1
+        except Exception:
+            self.failed += 1
+            log("Caught the following exception while sending a notification.\n{}".format(traceback.format_exc()),
+                context="TIMER_NOTIFIER",
+                level=logging.ERROR)
+        finally:
+            self.pending -= 1
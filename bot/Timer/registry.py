@@ -1,5 +1,8 @@
 import sqlite3 as sq
 
+from utils.dbwriter import WriteBehindQueue, configure_connection
+from utils.metrics import metrics
+
 
 class TimerRegistry(object):
     session_keys = (
@@ -10,11 +13,24 @@ class TimerRegistry(object):
         'duration'
     )
 
-    def __init__(self, db_file):
+    # Current schema version, stored in the database `user_version`
+    schema_version = 3
+
+    # Length of the `daily_totals` rollup buckets, in seconds
+    day_length = 60 * 60 * 24
+
+    def __init__(self, db_file, wal=True, synchronous="NORMAL", batch_interval=0.05, batch_size=200):
         self.conn = sq.connect(db_file, timeout=20)
         self.conn.row_factory = sq.Row
+        configure_connection(self.conn, wal=wal, synchronous=synchronous)
 
         self.ensure_table()
+        self.upgrade_schema()
+
+        # Session writes are committed in batches by the writer thread
+        self.writer = WriteBehindQueue(db_file,
+                                       batch_interval=batch_interval, batch_size=batch_size,
+                                       wal=wal, synchronous=synchronous)
 
     def ensure_table(self):
         """
@@ -30,10 +46,120 @@ class TimerRegistry(object):
         cursor.execute("CREATE TABLE IF NOT EXISTS sessions ({})".format(columns))
         self.conn.commit()
 
+    def upgrade_schema(self):
+        """
+        Apply any outstanding schema upgrades, in order, and record the new schema version.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+
+        if version > self.schema_version:
+            raise Exception(
+                ("Session database version is {}, required version is {}. "
+                 "Please migrate database.").format(version, self.schema_version)
+            )
+
+        for next_version in range(version + 1, self.schema_version + 1):
+            getattr(self, "_upgrade_v{}".format(next_version))(cursor)
+            cursor.execute("PRAGMA user_version = {}".format(next_version))
+            self.conn.commit()
+
+    def _upgrade_v1(self, cursor):
+        """
+        Add the guild indexes used by the leaderboard queries.
+        """
+        cursor.execute("CREATE INDEX IF NOT EXISTS sessions_guild_time ON sessions (guildid, starttime)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS sessions_guild_user ON sessions (guildid, userid)")
+
+    def _upgrade_v2(self, cursor):
+        """
+        Add the `daily_totals` rollup table, and fill it from the existing sessions.
+        """
+        columns = ("guildid INTEGER NOT NULL, "
+                   "userid INTEGER NOT NULL, "
+                   "day INTEGER NOT NULL, "
+                   "seconds INTEGER NOT NULL, "
+                   "session_count INTEGER NOT NULL, "
+                   "PRIMARY KEY (guildid, userid, day)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS daily_totals ({})".format(columns))
+        cursor.execute("CREATE INDEX IF NOT EXISTS daily_totals_guild_day ON daily_totals (guildid, day)")
+        self.backfill_daily_totals(cursor=cursor)
+
+    def _upgrade_v3(self, cursor):
+        """
+        Add the member session index used by the history queries.
+        """
+        cursor.execute("CREATE INDEX IF NOT EXISTS sessions_guild_user_time ON sessions (guildid, userid, starttime)")
+
+    def backfill_daily_totals(self, guildid=None, cursor=None):
+        """
+        Rebuild the `daily_totals` rollup from the raw session table, for one guild or for every guild.
+        Sessions are bucketed by the UTC day they started on.
+        Queued sessions don't need flushing first, since the writer updates the rollup in the same transaction.
+        """
+        commit = cursor is None
+        cursor = cursor or self.conn.cursor()
+        where = "WHERE guildid = ?" if guildid is not None else ""
+        params = (guildid,) if guildid is not None else ()
+
+        cursor.execute("DELETE FROM daily_totals {}".format(where), params)
+        cursor.execute(
+            "INSERT INTO daily_totals "
+            "SELECT guildid, userid, starttime / {0} AS day, SUM(duration), COUNT(*) FROM sessions {1} "
+            "GROUP BY guildid, userid, day".format(self.day_length, where),
+            params
+        )
+        if commit:
+            self.conn.commit()
+
+    def check_daily_totals(self, guildid=None):
+        """
+        Compare the `daily_totals` rollup against totals computed from the raw session table.
+        Returns a list of `(guildid, userid, day, expected_seconds, expected_count, seconds, count)`
+        tuples for each rollup entry which is missing, unexpected, or inconsistent.
+        An empty list means the rollup is consistent.
+        """
+        where = "WHERE guildid = ?" if guildid is not None else ""
+        params = (guildid,) if guildid is not None else ()
+        raw = ("SELECT guildid, userid, starttime / {} AS day, SUM(duration) AS seconds, COUNT(*) AS session_count "
+               "FROM sessions {} GROUP BY guildid, userid, day").format(self.day_length, where)
+
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT raw.guildid, raw.userid, raw.day, raw.seconds, raw.session_count, "
+            "rollup.seconds, rollup.session_count "
+            "FROM ({raw}) AS raw LEFT JOIN daily_totals AS rollup "
+            "ON rollup.guildid = raw.guildid AND rollup.userid = raw.userid AND rollup.day = raw.day "
+            "WHERE rollup.seconds IS NOT raw.seconds OR rollup.session_count IS NOT raw.session_count "
+            "UNION ALL "
+            "SELECT rollup.guildid, rollup.userid, rollup.day, NULL, NULL, rollup.seconds, rollup.session_count "
+            "FROM (SELECT * FROM daily_totals {where}) AS rollup LEFT JOIN ({raw}) AS raw "
+            "ON rollup.guildid = raw.guildid AND rollup.userid = raw.userid AND rollup.day = raw.day "
+            "WHERE raw.day IS NULL".format(raw=raw, where=where),
+            params * 3
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def flush(self):
+        """
+        Block until all queued session writes are committed.
+        """
+        self.writer.flush()
+
+    async def flush_async(self):
+        """
+        Wait, without blocking the event loop, until all queued session writes are committed.
+        The query methods only read committed sessions, so callers which need to see recent sessions await this first.
+        """
+        await self.writer.flush_async()
+
     def close(self):
+        self.writer.close()
         self.conn.commit()
         self.conn.close()
 
+    @metrics.timed('registry_seconds', op='get_sessions_where')
     def get_sessions_where(self, **kwargs):
         keys = [(key, kwargs[key]) for key in kwargs if key in self.session_keys]
 
@@ -46,12 +172,175 @@ class TimerRegistry(object):
         cursor.execute('SELECT * FROM sessions {}'.format(keystr), tuple(value for key, value in keys))
         return cursor.fetchall()
 
+    @staticmethod
+    def _window(guildid, since_day=None, exclude=()):
+        """
+        Build the `WHERE` clause and parameters selecting guild rollup entries
+        on or after the day `since_day`, and not belonging to the `exclude` users.
+        """
+        conditions = ["guildid = ?"]
+        params = [guildid]
+        if since_day is not None:
+            conditions.append("day >= ?")
+            params.append(since_day)
+        if exclude:
+            conditions.append("userid NOT IN ({})".format(", ".join('?' for userid in exclude)))
+            params.extend(exclude)
+        return "WHERE " + " AND ".join(conditions), params
+
+    @metrics.timed('registry_seconds', op='get_leaderboard')
+    def get_leaderboard(self, guildid, since_day=None, limit=None, offset=0, exclude=()):
+        """
+        Return a list of `(userid, total)` rows with the total session duration of each user in the guild,
+        ordered by decreasing total and then by userid.
+        Totals are read from the `daily_totals` rollup.
+
+        Parameters
+        ----------
+        guildid: int
+            The guild to total sessions in.
+        since_day: int
+            If given, only sessions starting on or after this UTC day number are counted.
+        limit: int
+            Maximum number of rows to return.
+        offset: int
+            Number of leading rows to skip.
+        exclude: Iterable(int)
+            Userids to leave out of the leaderboard.
+        """
+        where, params = self._window(guildid, since_day, tuple(exclude))
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT userid, SUM(seconds) AS total FROM daily_totals {} "
+            "GROUP BY userid ORDER BY total DESC, userid LIMIT ? OFFSET ?".format(where),
+            (*params, limit if limit is not None else -1, offset)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    @metrics.timed('registry_seconds', op='count_leaderboard')
+    def count_leaderboard(self, guildid, since_day=None, exclude=()):
+        """
+        Return the number of users with sessions in the given leaderboard window.
+        """
+        where, params = self._window(guildid, since_day, tuple(exclude))
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(DISTINCT userid) FROM daily_totals {}".format(where), tuple(params))
+        return cursor.fetchone()[0]
+
+    @metrics.timed('registry_seconds', op='get_user_totals')
+    def get_user_totals(self, guildid, userids, since_day=None):
+        """
+        Return a dictionary `userid -> total` of the total session duration of each of the given users.
+        Users without sessions in the window are omitted.
+        """
+        userids = tuple(userids)
+        if not userids:
+            return {}
+
+        where, params = self._window(guildid, since_day)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT userid, SUM(seconds) FROM daily_totals {} AND userid IN ({}) GROUP BY userid".format(
+                where, ", ".join('?' for userid in userids)
+            ),
+            (*params, *userids)
+        )
+        return dict(tuple(row) for row in cursor.fetchall())
+
+    @metrics.timed('registry_seconds', op='get_history_days')
+    def get_history_days(self, userid, guildid, before_day=None, limit=None, offset=0):
+        """
+        Return a list of `(day, seconds, session_count)` rows summarising the sessions of a member on each day,
+        latest day first.
+        Days are numbered from the epoch in the timezone `offset` seconds ahead of UTC,
+        and sessions are counted on the day they started.
+        UTC days are read from the `daily_totals` rollup, other timezones are grouped from the session table.
+
+        Parameters
+        ----------
+        userid: int
+            The member's user id.
+        guildid: int
+            The guild to read sessions from.
+        before_day: int
+            If given, only days before this day number are returned.
+            Used as a keyset cursor for paging through the days.
+        limit: int
+            Maximum number of days to return.
+        offset: int
+            Timezone offset from UTC, in seconds.
+        """
+        params = [guildid, userid]
+        if offset:
+            query = ("SELECT (starttime + ?) / {0} AS day, SUM(duration), COUNT(*) FROM sessions "
+                     "WHERE guildid = ? AND userid = ? {1} "
+                     "GROUP BY day ORDER BY day DESC LIMIT ?")
+            params.insert(0, offset)
+            condition = "AND starttime < ?"
+            before = before_day * self.day_length - offset if before_day is not None else None
+        else:
+            query = ("SELECT day, seconds, session_count FROM daily_totals "
+                     "WHERE guildid = ? AND userid = ? {1} "
+                     "ORDER BY day DESC LIMIT ?")
+            condition = "AND day < ?"
+            before = before_day
+        if before is not None:
+            params.append(before)
+        params.append(limit if limit is not None else -1)
+
+        cursor = self.conn.cursor()
+        cursor.execute(query.format(self.day_length, condition if before is not None else ""), tuple(params))
+        return [tuple(row) for row in cursor.fetchall()]
+
+    @metrics.timed('registry_seconds', op='count_history_days')
+    def count_history_days(self, userid, guildid, offset=0):
+        """
+        Return the number of days on which the member started a session, see `get_history_days`.
+        """
+        cursor = self.conn.cursor()
+        if offset:
+            cursor.execute(
+                "SELECT COUNT(DISTINCT (starttime + ?) / {}) FROM sessions WHERE guildid = ? AND userid = ?".format(
+                    self.day_length
+                ),
+                (offset, guildid, userid)
+            )
+        else:
+            cursor.execute("SELECT COUNT(*) FROM daily_totals WHERE guildid = ? AND userid = ?", (guildid, userid))
+        return cursor.fetchone()[0]
+
+    @metrics.timed('registry_seconds', op='get_day_sessions')
+    def get_day_sessions(self, userid, guildid, day, offset=0):
+        """
+        Return a list of `(starttime, duration)` rows for the sessions the member started on the given day,
+        latest first. See `get_history_days` for the day numbering.
+        """
+        start = day * self.day_length - offset
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT starttime, duration FROM sessions "
+            "WHERE guildid = ? AND userid = ? AND starttime >= ? AND starttime < ? "
+            "ORDER BY starttime DESC",
+            (guildid, userid, start, start + self.day_length)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    @metrics.timed('registry_seconds', op='new_session')
     def new_session(self, *args):
+        """
+        Queue a new session for storage, together with the corresponding daily rollup update.
+        Returns a future which resolves when the session is committed.
+        """
         if len(args) != len(self.session_keys):
             raise ValueError("Improper number of session keys passed for storage.")
 
-        cursor = self.conn.cursor()
         value_str = ", ".join('?' for key in args)
+        session = dict(zip(self.session_keys, args))
 
-        cursor.execute('INSERT INTO sessions VALUES ({})'.format(value_str), tuple(args))
-        self.conn.commit()
+        return self.writer.submit([
+            ('INSERT INTO sessions VALUES ({})'.format(value_str), tuple(args)),
+            ("INSERT INTO daily_totals VALUES (?, ?, ?, ?, 1) "
+             "ON CONFLICT (guildid, userid, day) DO UPDATE SET "
+             "seconds = seconds + excluded.seconds, session_count = session_count + 1",
+             (session['guildid'], session['userid'], session['starttime'] // self.day_length, session['duration']))
+        ])
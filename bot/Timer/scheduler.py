@@ -0,0 +1,139 @@
+import heapq
+import asyncio
+import logging
+import traceback
+
+from logger import log
+
+
+class TimerScheduler(object):
+    """
+    Single deadline scheduler shared by every timer owned by a `TimerInterface`.
+
+    Running timers register the timestamp at which their current stage ends.
+    The scheduler sleeps until the earliest registered deadline, and only wakes
+    to change the stage of timers which are actually due.
+    Deadlines are held in a heap of `(deadline, token, timer)` entries.
+    Rescheduling a timer simply pushes a new entry with a new token,
+    and entries with outdated tokens are discarded when they reach the top of the heap.
+
+    Parameters
+    ----------
+    now: Function() -> int
+        Function returning the current timestamp, in the same units as the deadlines.
+    """
+    def __init__(self, now):
+        self.now = now
+
+        self._heap = []  # Heap of (deadline, token, timer) entries
+        self._tokens = {}  # Map of id(timer) -> current valid token
+        self._counter = 0  # Source of unique entry tokens
+
+        self._wakeup = None  # Event set when the earliest deadline changes
+        self._task = None  # Task running the scheduler loop
+
+        self.wakeups = 0  # Number of times the scheduler loop has woken up
+        self.fired = 0  # Number of stage changes triggered by the scheduler
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def schedule(self, timer):
+        """
+        Register or update the next stage deadline of the given timer.
+        Unschedules the timer if it has no pending deadline.
+        """
+        deadline = timer.stage_deadline()
+        if deadline is None:
+            return self.unschedule(timer)
+
+        self._counter += 1
+        self._tokens[id(timer)] = self._counter
+        heapq.heappush(self._heap, (deadline, self._counter, timer))
+
+        # Wake the loop if this is now the earliest deadline
+        if self._wakeup is not None and self._heap[0][1] == self._counter:
+            self._wakeup.set()
+
+    def unschedule(self, timer):
+        """
+        Remove any pending deadline for the given timer.
+        The corresponding heap entry is discarded lazily.
+        """
+        self._tokens.pop(id(timer), None)
+
+    def wake(self):
+        """
+        Force the scheduler to re-examine its deadlines, e.g. after the clock has been adjusted.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        """
+        Start the scheduler loop, if it isn't already running.
+        """
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def stop(self):
+        """
+        Cancel the scheduler loop.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _pop_due(self, now):
+        """
+        Pop and return the timers with a valid deadline at or before `now`.
+        """
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, token, timer = heapq.heappop(heap)
+            if self._tokens.get(id(timer), None) != token:
+                # Outdated entry
+                continue
+            self._tokens.pop(id(timer))
+
+            # Recheck the deadline in case the timer was modified without being rescheduled
+            actual = timer.stage_deadline()
+            if actual is None:
+                continue
+            elif actual > now:
+                self.schedule(timer)
+            else:
+                due.append(timer)
+        return due
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            self.wakeups += 1
+
+            for timer in self._pop_due(self.now()):
+                self.fired += 1
+                asyncio.ensure_future(self._fire(timer))
+
+            timeout = max(self._heap[0][0] - self.now(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, timer):
+        try:
+            await timer.change_stage(timer.current_stage + 1)
+            asyncio.ensure_future(timer.update_clock_channel(force=True))
+        except Exception:
+            full_traceback = traceback.format_exc()
+            log("Exception encountered while changing stage.\n{}".format(full_traceback),
+                context="TIMER_SCHEDULER",
+                level=logging.ERROR)
+
+            # Retry shortly if the timer never made it to the next stage
+            if id(timer) not in self._tokens:
+                asyncio.get_event_loop().call_later(1, self.schedule, timer)
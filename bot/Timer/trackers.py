@@ -1,8 +1,17 @@
+from utils.metrics import metrics
+
+
 async def message_tracker(client, message):
-    client.interface.bump_user(message.guild or 0, message.channel.id, message.author.id)
+    """
+    Count messages in timer channels as activity of their subscribed authors.
+    Messages outside guilds with timers are dropped before any other work, including the handler timing.
+    """
+    guild = message.guild
+    if guild is None or guild.id not in client.interface.guild_channels:
+        return
+    _track_message(client.interface, guild.id, message)
 
 
-async def reaction_tracker(client, payload):
-    client.interface.bump_user(payload.guild_id or 0,
-                               payload.channel_id,
-                               payload.user_id)
+@metrics.timed('handler_seconds', handler='message_tracker')
+def _track_message(interface, guildid, message):
+    interface.bump_user(guildid, message.channel.id, message.author.id)
@@ -5,6 +5,9 @@ import asyncio
 
 from cmdClient import cmd, checks
 
+from utils.metrics import metrics
+from utils import interactive  # noqa
+
 """
 Exec level commands to manage the bot.
 
@@ -15,6 +18,10 @@ Commands provided:
         Executes code using standard python exec
     eval:
         Executes code and awaits it if required
+    stats:
+        Shows the recorded timings and the current queue and cache counters
+    checktotals:
+        Checks the daily session totals against the raw sessions, and optionally rebuilds them
 """
 
 
@@ -25,13 +32,98 @@ async def cmd_reboot(ctx):
     Usage``:
         reboot
     Description:
-        Update the timer status save file and reboot the client.
+        Update the timer status save file, commit any queued database writes, and reboot the client.
     """
     ctx.client.interface.update_save("reboot")
+    await ctx.client.interface.registry.flush_async()
+    await ctx.client.config.flush_async()
     await ctx.reply("Saved state. Rebooting now!")
     await ctx.client.logout()
 
 
+@cmd("stats")
+@checks.is_owner()
+async def cmd_stats(ctx):
+    """
+    Usage``:
+        stats [filter]
+    Description:
+        Show the event loop lag, the timings of the event handlers, commands, timer updates and database operations,
+        and the current queue and cache counters.
+        Only timings and counters whose name contains the filter are shown, if one is given.
+    """
+    name_filter = ctx.arg_str.strip()
+
+    lines = ["{:<48} {:>8} {:>9} {:>9} {:>9}".format("Timing", "count", "p50 ms", "p99 ms", "max ms")]
+    for (name, labels), histogram in sorted(metrics.histograms.items()):
+        full_name = "{}{}".format(name, "".join("[{}]".format(label) for _, label in labels))
+        if name_filter in full_name and histogram.count:
+            lines.append("{:<48} {:>8} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                full_name, histogram.count,
+                *(1000 * value for value in (histogram.percentile(50), histogram.percentile(99), histogram.max))
+            ))
+
+    lines.append("")
+    lines.append("{:<48} {:>8}".format("Counter", "value"))
+    for name, labels, value in sorted(metrics.collect(), key=lambda reading: (reading[0], sorted(reading[1].items()))):
+        full_name = "{}{}".format(name, "".join("[{}]".format(label) for label in labels.values()))
+        if name_filter in full_name:
+            lines.append("{:<48} {:>8}".format(full_name, round(value, 2) if isinstance(value, float) else value))
+
+    blocks = [lines[i:i + 25] for i in range(0, len(lines), 25)]
+    await ctx.pager(["```\n{}\n```".format("\n".join(block)) for block in blocks])
+
+
+@cmd("checktotals")
+@checks.is_owner()
+async def cmd_checktotals(ctx):
+    """
+    Usage``:
+        checktotals [guildid] [rebuild]
+    Description:
+        Check the daily session totals read by the leaderboard and history against the raw session table,
+        for the given guild, or for every guild if no guild is given.
+        Inconsistent totals are listed, and rebuilt from the raw sessions if `rebuild` is given.
+        Scans the whole session table when checking every guild, so may take some time on large databases.
+    """
+    args = ctx.arg_str.split()
+    rebuild = 'rebuild' in args
+    args = [arg for arg in args if arg != 'rebuild']
+    if len(args) > 1 or (args and not args[0].isdigit()):
+        return await ctx.error_reply("Usage: `checktotals [guildid] [rebuild]`")
+    guildid = int(args[0]) if args else None
+    scope = "guild `{}`".format(guildid) if guildid is not None else "every guild"
+
+    # Include any queued sessions in the check
+    registry = ctx.client.interface.registry
+    await registry.flush_async()
+
+    problems = registry.check_daily_totals(guildid)
+    if not problems:
+        return await ctx.reply("The daily totals of {} are consistent.".format(scope))
+
+    if rebuild:
+        registry.backfill_daily_totals(guildid)
+        remaining = registry.check_daily_totals(guildid)
+        summary = "Rebuilt the daily totals of {}, fixing {} inconsistent entries, {} remain.".format(
+            scope, len(problems), len(remaining)
+        )
+    else:
+        summary = "Found {} inconsistent daily totals in {}. Use `rebuild` to rebuild them.".format(
+            len(problems), scope
+        )
+
+    lines = ["{:<20} {:<20} {:>6} {:>10} {:>6} {:>10} {:>6}".format(
+        "guildid", "userid", "day", "expected", "count", "stored", "count"
+    )]
+    for row in problems:
+        lines.append("{:<20} {:<20} {:>6} {:>10} {:>6} {:>10} {:>6}".format(
+            *("-" if value is None else value for value in row)
+        ))
+    blocks = [lines[i:i + 25] for i in range(0, len(lines), 25)]
+    await ctx.pager(["{}\n```\n{}\n```".format(summary, "\n".join(block)) for block in blocks])
+
+
 @cmd("async")
 @checks.is_owner()
 async def cmd_async(ctx):
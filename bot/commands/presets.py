@@ -5,7 +5,7 @@ from Timer import TimerInterface
 
 from wards import timer_admin
 from utils import timer_utils, interactive, ctx_addons  # noqa
-from utils.lib import paginate_list
+from utils.lib import ListPages
 
 
 def get_presets(ctx):
@@ -66,7 +66,7 @@ async def cmd_preset(ctx):
             return await ctx.embedreply("No presets available! Start creating presets with `addpreset`")
 
         # Format and return the list
-        pages = paginate_list(pretty_presets, title="Available Timer Presets")
+        pages = ListPages(pretty_presets, title="Available Timer Presets")
         return await ctx.pager(pages)
     elif ctx.alias.lower() == "preset":
         # Prompt for the preset if not given
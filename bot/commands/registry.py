@@ -1,101 +1,92 @@
 import datetime as dt
-import discord
 
 from cmdClient import cmd
 from cmdClient import checks
 
 from utils import interactive # noqa
+from utils.interactive import PageSource
 
 from Timer import Timer
+from Timer.registry import TimerRegistry
 
 
-@cmd("history",
-     group="Registry",
-     desc="Display a list of past sessions in the current guild.",
-     aliases=['hist'])
-@checks.in_guild()
-async def cmd_hist(ctx):
+class _HistoryPages(object):
     """
-    Usage``:
-        history
-    Description:
-        Display a list of your past timer sessions in the current guild.
-        All times are given in UTC.
+    Lazily built session history pages, one page per day, for use with `ctx.pager`.
+    Days are read from the registry in chunks, using the last loaded day as a keyset cursor,
+    and the sessions of a day are only read when its page is displayed.
+    The current session of the member, if any, is merged into the stored history.
     """
-    # Get the past sessions for this user
-    sessions = ctx.client.interface.registry.get_sessions_where(userid=ctx.author.id, guildid=ctx.guild.id)
-
-    # Get the current timer if it exists
-    timer = ctx.client.interface.get_timer_for(ctx.guild.id, ctx.author.id)
-
-    # Quit if we don't have anything
-    if not sessions and not timer:
-        return await ctx.reply("You have not completed any timer sessions!")
-
-    # Get today's date and timestamp
-    today = dt.datetime.utcnow().date()
-    today = dt.datetime(today.year, today.month, today.day)
-    today_ts = dt.datetime.timestamp(today)
-
-    # Build a sorted list of the author's sessions
-    session_table = sorted(
-        [(sesh['starttime'], sesh['duration']) for sesh in sessions],
-        key=lambda tup: tup[0],
-        reverse=True
-    )
-
-    # Add the current session if it exists
-    if timer:
-        sesh_data = timer.subscribed[ctx.author.id].session_data()
-        session_table.insert(0, (sesh_data[3], sesh_data[4]))
-
-    # Build the map (date_string, [session strings])
-    day_sessions = []
-
-    current_offset = 0
-    current_sessions = []
-    current_total = 0
-    for start, dur in session_table:
-        # Get current offset and corresponding session list
-        date_offset = (today_ts - start) // (60 * 60 * 24) + 1
-
-        # If we have a new offset, generate and store the old day's data
-        if date_offset > current_offset:
-            if current_sessions:
-                day_str = (today - dt.timedelta(current_offset)).strftime("%A, %d %b %Y")
-                dur_str = "{:<13}      {}".format("Total:", _parse_duration(current_total))
-                day_sessions.append((day_str, current_sessions, dur_str))
-
-            current_offset = date_offset
-            current_sessions = []
-            current_total = 0
-
-        # Generate the session string
-        sesh_str = "{} - {}  --  {}".format(
-            dt.datetime.fromtimestamp(start).strftime("%H:%M"),
-            dt.datetime.fromtimestamp(start + dur).strftime("%H:%M"),
-            _parse_duration(dur)
+    chunk_len = 25
+
+    def __init__(self, ctx, offset=0, live=None):
+        self.ctx = ctx
+        self.offset = offset
+        self.live = live
+        self.registry = ctx.client.interface.registry
+        self.day_length = TimerRegistry.day_length
+
+        self.count = self.registry.count_history_days(ctx.author.id, ctx.guild.id, offset=offset)
+        self.days = []  # Loaded (day, seconds) rows, latest first
+        self.exhausted = False  # Whether every stored day has been loaded
+        self._load_days()
+
+        # Add the current session to its day, which is the latest day
+        if live is not None:
+            live_day = (live[0] + offset) // self.day_length
+            if self.days and self.days[0][0] == live_day:
+                self.days[0] = (live_day, self.days[0][1] + live[1])
+            else:
+                self.days.insert(0, (live_day, live[1]))
+                self.count += 1
+
+    def _load_days(self):
+        """
+        Load the next chunk of stored days.
+        """
+        before_day = self.days[-1][0] if self.days else None
+        rows = self.registry.get_history_days(
+            self.ctx.author.id, self.ctx.guild.id,
+            before_day=before_day, limit=self.chunk_len, offset=self.offset
         )
-        current_sessions.append(sesh_str)
-
-        current_total += dur
-
-    # Add the last day
-    # TODO: Is there a nicer recipe for this?
-    if current_sessions:
-        day_str = (today - dt.timedelta(current_offset)).strftime("%A, %d %b %Y")
-        dur_str = "{:<13}      {}".format("Total:", _parse_duration(current_total))
-        day_sessions.append((day_str, current_sessions, dur_str))
-
-    # Make the pages
-    pages = []
-    num = len(day_sessions)
-    for i, (day_str, sessions, total_str) in enumerate(day_sessions):
-        page_str = " ({}/{})".format(i+1, num) if num > 1 else ""
+        self.days.extend((day, seconds) for day, seconds, _ in rows)
+        self.exhausted = len(rows) < self.chunk_len
+
+    def __len__(self):
+        return self.count
+
+    def strftime(self, timestamp, fmt):
+        return dt.datetime.utcfromtimestamp(timestamp + self.offset).strftime(fmt)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("History page index out of range.")
+
+        while index >= len(self.days) and not self.exhausted:
+            self._load_days()
+        day, total = self.days[index]
+
+        sessions = self.registry.get_day_sessions(self.ctx.author.id, self.ctx.guild.id, day, offset=self.offset)
+        if self.live is not None and (self.live[0] + self.offset) // self.day_length == day:
+            sessions.insert(0, self.live)
+
+        session_strs = [
+            "{} - {}  --  {}".format(
+                self.strftime(start, "%H:%M"),
+                self.strftime(start + dur, "%H:%M"),
+                _parse_duration(dur)
+            ) for start, dur in sessions
+        ]
+        total_str = "{:<13}      {}".format("Total:", _parse_duration(total))
+
+        day_str = dt.datetime.utcfromtimestamp(day * self.day_length).strftime("%A, %d %b %Y")
+        num = len(self)
+        page_str = " ({}/{})".format(index+1, num) if num > 1 else ""
         header = day_str + page_str
 
-        page = (
-            "All times are in UTC! The current time in UTC is {now}.\n"
+        zone = _offset_str(self.offset)
+        return (
+            "All times are in {zone}! The current time in {zone} is {now}.\n"
             "```md\n"
             "{header}\n"
             "{header_rule}\n"
@@ -104,14 +95,83 @@ async def cmd_hist(ctx):
             "{total_str}"
             "```"
         ).format(
-            now=dt.datetime.utcnow().strftime("**%H:%M** on **%d %b %Y**"),
+            zone=zone,
+            now=self.strftime(Timer.now(), "**%H:%M** on **%d %b %Y**"),
             header=header,
             header_rule='=' * len(header),
-            session_list='\n'.join(sessions),
+            session_list='\n'.join(session_strs),
             total_rule='+' + (len(total_str) - 2) * '-' + '+',
             total_str=total_str
         )
-        pages.append(page)
+
+
+def _parse_offset(offset_str):
+    """
+    Parse a timezone offset from UTC of the form `+10`, `-3:30` or `UTC+5:45` into a number of seconds.
+    Returns `None` if the string isn't a valid offset.
+    """
+    offset_str = offset_str.strip().upper()
+    if offset_str.startswith("UTC"):
+        offset_str = offset_str[3:]
+    if not offset_str:
+        return 0
+
+    sign = -1 if offset_str[0] == '-' else 1
+    parts = offset_str.lstrip('+-').split(':')
+    if len(parts) > 2 or not all(part.isdigit() for part in parts):
+        return None
+    hours = int(parts[0])
+    minutes = int(parts[1]) if len(parts) > 1 else 0
+    if hours > 14 or minutes >= 60:
+        return None
+    return sign * (hours * 3600 + minutes * 60)
+
+
+def _offset_str(offset):
+    if not offset:
+        return "UTC"
+    return "UTC{}{:02d}:{:02d}".format('-' if offset < 0 else '+', abs(offset) // 3600, (abs(offset) % 3600) // 60)
+
+
+@cmd("history",
+     group="Registry",
+     desc="Display a list of past sessions in the current guild.",
+     aliases=['hist'])
+@checks.in_guild()
+async def cmd_hist(ctx):
+    """
+    Usage``:
+        history [utc offset]
+    Description:
+        Display a list of your past timer sessions in the current guild.
+        All times are given in UTC, unless a timezone offset is given.
+        Sessions are listed on the day they started.
+    Parameters::
+        utc offset: Your timezone offset from UTC, e.g. `+10` or `-3:30`.
+    Examples``:
+        history
+        history +5:30
+    """
+    offset = _parse_offset(ctx.arg_str)
+    if offset is None:
+        return await ctx.error_reply("Couldn't understand the timezone offset `{}`.".format(ctx.arg_str))
+
+    # Wait for queued sessions to be committed, so that they are included
+    await ctx.client.interface.registry.flush_async()
+
+    # Get the current session if it exists
+    live = None
+    timer = ctx.client.interface.get_timer_for(ctx.guild.id, ctx.author.id)
+    if timer:
+        sesh_data = timer.subscribed[ctx.author.id].session_data()
+        live = (sesh_data[3], sesh_data[4])
+
+    # Only the displayed page is queried and rendered
+    pages = _HistoryPages(ctx, offset=offset, live=live)
+
+    # Quit if we don't have anything
+    if not pages:
+        return await ctx.reply("You have not completed any timer sessions!")
 
     # Finally, run the pager
     await ctx.pager(pages)
@@ -126,6 +186,78 @@ def _parse_duration(dur):
     return "{:02d}:{:02d}:{:02d}".format(hours, minutes, seconds)
 
 
+class _LeaderboardPages(object):
+    """
+    Lazily built leaderboard pages, for use as a `ctx.pager` page source.
+    Each page is queried from the registry when it is displayed,
+    and the names of the users on the page are resolved in a single batch.
+    Current sessions of guild members are merged into the stored session totals.
+    """
+    page_len = 20
+
+    def __init__(self, ctx, head, since_day):
+        self.ctx = ctx
+        self.head = head
+        self.since_day = since_day
+        self.registry = ctx.client.interface.registry
+
+        # Collect the current session durations of subscribed guild members
+        live = {subber.id: subber.session_data()[4] for subber in ctx.client.interface.get_guild_subs(ctx.guild.id)}
+        stored = self.registry.get_user_totals(ctx.guild.id, live, since_day=since_day)
+
+        self.live = tuple(live)
+        self.live_totals = [(userid, stored.get(userid, 0) + clocked) for userid, clocked in live.items()]
+        self.count = self.registry.count_leaderboard(ctx.guild.id, since_day=since_day, exclude=self.live) + len(live)
+
+    def __len__(self):
+        return -(-self.count // self.page_len)
+
+    def rows(self, index):
+        """
+        Return the `(userid, total)` rows on the given page.
+        """
+        start = index * self.page_len
+        end = start + self.page_len
+
+        # Fetch enough stored rows to cover the page whatever the positions of the current sessions.
+        offset = max(start - len(self.live), 0)
+        stored = self.registry.get_leaderboard(
+            self.ctx.guild.id,
+            since_day=self.since_day,
+            limit=self.page_len + len(self.live),
+            offset=offset,
+            exclude=self.live
+        )
+
+        # Merge in the current sessions, and cut out the page
+        merged = sorted(stored + self.live_totals, key=lambda row: (-row[1], row[0]))
+        return [row for pos, row in enumerate(merged, start=offset) if start <= pos < end]
+
+    async def get_page(self, index):
+        """
+        Build the given page, or return `None` if there is no such page.
+        """
+        if not 0 <= index < len(self):
+            return None
+
+        # Build the string pairs
+        rows = self.rows(index)
+        names = await self.ctx.client.user_names.resolve([userid for userid, _ in rows])
+        total_strs = [(names[userid], _parse_duration(total)) for userid, total in rows]
+
+        max_len = len(max(list(zip(*total_strs))[0], key=len))
+        block = ["{0[0]:^{max_len}} {0[1]:>10}".format(pair, max_len=max_len) for pair in total_strs]
+
+        num = len(self)
+        header = self.head + " (Page {}/{})".format(index+1, num) if num > 1 else self.head
+        header_rule = "=" * len(header)
+        return "```md\n{}\n{}\n{}```".format(
+            header,
+            header_rule,
+            "\n".join(block)
+        )
+
+
 @cmd("leaderboard",
      group="Registry",
      desc="Display total member group time in the last day/week/month or all-time.",
@@ -137,97 +269,42 @@ async def cmd_lb(ctx):
         lb [day | week | month]
     Description:
         Display the total timer time of each guild member, within the specified period.
-        The periods are rolling, i.e. `day` means the last 24h.
+        The periods are counted in whole UTC days, including today,
+        and sessions are counted on the day they started.
         Without a period specified, the all-time totals will be shown.
     Parameters::
-        day: Show totals of sessions within the last 24 hours
-        week: Show totals of sessions within the last 7 days
-        month: Show totals of sessions within the last 31 days
+        day: Show totals of sessions started today (UTC)
+        week: Show totals of sessions started within the last 7 days
+        month: Show totals of sessions started within the last 31 days
     """
-    out_msg = await ctx.reply("Generating leaderboard, please wait.")
-
-    # Get the past sessions for this guild
-    sessions = ctx.client.interface.registry.get_sessions_where(guildid=ctx.guild.id)
-
-    if not sessions:
-        return await ctx.reply("This guild has no past group sessions! Please check back soon.")
+    # Current utc day number
+    today = Timer.now() // TimerRegistry.day_length
 
-    # Current utc timestamp
-    now = Timer.now()
-
-    # Determine maximum time separation allowed for sessions
+    # Determine the earliest session day allowed
     region = ctx.arg_str.lower().strip()
     if not region or region == 'all':
-        max_dist = now
+        since_day = None
         head = "All-time leaderboard"
     elif region == 'day':
-        max_dist = 60 * 60 * 24
+        since_day = today
         head = "Daily leaderboard"
     elif region == 'week':
-        max_dist = 60 * 60 * 24 * 7
+        since_day = today - 6
         head = "Weekly leaderboard"
     elif region == 'month':
-        max_dist = 60 * 60 * 24 * 31
+        since_day = today - 30
         head = "Monthly leaderboard"
     else:
         return await ctx.error_reply("Unknown region specification `{}`.".format(ctx.arg_str))
 
-    # Tally total session times
-    total_dict = {}
-    for session in sessions:
-        if now - session['starttime'] > max_dist:
-            continue
-
-        if session['userid'] not in total_dict:
-            total_dict[session['userid']] = 0
-        total_dict[session['userid']] += session['duration']
-
-    for guildid, userid in ctx.client.interface.subscribers:
-        if guildid == ctx.guild.id:
-            sub_data = ctx.client.interface.subscribers[(guildid, userid)].session_data()
-            if userid not in total_dict:
-                total_dict[userid] = 0
-            total_dict[userid] += sub_data[4]
-
-    # Reshape and sort the totals
-    totals = sorted(list(total_dict.items()), key=lambda tup: tup[1], reverse=True)
-
-    # Build the string pairs
-    total_strs = []
-    for userid, total in totals:
-        # Find the user
-        user = ctx.client.get_user(userid)
-        if user is None:
-            try:
-                user = await ctx.client.fetch_user(userid)
-                user_str = user.name
-            except discord.NotFound:
-                user_str = str(userid)
-        else:
-            user_str = user.name
-
-        total_strs.append((user_str, _parse_duration(total)))
-
-    # Build pages in groups of 20
-    blocks = [total_strs[i:i+20] for i in range(0, len(total_strs), 20)]
-    max_block_lens = [len(max(list(zip(*block))[0], key=len)) for block in blocks]
-    page_blocks = [["{0[0]:^{max_len}} {0[1]:>10}".format(pair, max_len=max_block_lens[i]) for pair in block]
-                   for i, block in enumerate(blocks)]
-
-    num = len(page_blocks)
-    pages = []
-    for i, block in enumerate(page_blocks):
-        header = head + " (Page {}/{})".format(i+1, num) if num > 1 else head
-        header_rule = "=" * len(header)
-        page = "```md\n{}\n{}\n{}```".format(
-            header,
-            header_rule,
-            "\n".join(block)
-        )
-        pages.append(page)
+    # Wait for queued sessions to be committed, so that they are included
+    await ctx.client.interface.registry.flush_async()
 
-    await out_msg.delete()
+    # Only the displayed page is queried and rendered
+    pages = _LeaderboardPages(ctx, head, since_day)
     if not pages:
+        if since_day is None:
+            return await ctx.reply("This guild has no past group sessions! Please check back soon.")
         return await ctx.reply("No entries exist in the given range!")
 
-    await ctx.pager(pages, locked=False)
+    await ctx.pager(PageSource(pages.get_page, length=len(pages)), locked=False)
@@ -298,18 +298,16 @@ async def cmd_groups(ctx):
     if not ctx.client.interface.get_guild_timers(ctx.guild.id):
         return await ctx.error_reply("There are no groups set up in this guild!")
 
-    if "live_grouptokens" not in ctx.client.objects:
-        ctx.client.objects["live_grouptokens"] = {}
-    ctx.client.objects["live_grouptokens"][ctx.ch.id] = ctx.msg.id
+    def _version():
+        return tuple(
+            (tchan.channel.id, tuple(timer.status_key() for timer in tchan.timers))
+            for tchan in ctx.client.interface.guild_channels.get(ctx.guild.id, [])
+        )
 
     async def _groups():
-        # Check if we have a new token
-        if ctx.client.objects["live_grouptokens"].get(ctx.ch.id, 0) != ctx.msg.id:
-            return None
-
         # Build the embed description
         sections = []
-        for tchan in ctx.client.interface.guild_channels[ctx.guild.id]:
+        for tchan in ctx.client.interface.guild_channels.get(ctx.guild.id, []):
             if len(tchan.timers) > 0:
                 sections.append("{}\n\n{}".format(
                     tchan.channel.mention,
@@ -323,7 +321,8 @@ async def cmd_groups(ctx):
         )
         return {'embed': embed}
 
-    await ctx.live_reply(_groups)
+    # A newer group list in the same channel replaces this one
+    await ctx.live_reply(_groups, key=("groups", ctx.ch.id), version_func=_version)
 
 
 @cmd("status",
@@ -350,22 +349,15 @@ async def cmd_group(ctx):
             if timer is None:
                 return await ctx.error_reply("No groups are set up in this guild.")
 
-    if "live_statustokens" not in ctx.client.objects:
-        ctx.client.objects["live_statustokens"] = {}
-    ctx.client.objects["live_statustokens"][ctx.ch.id] = ctx.msg.id
-
     async def _status():
-        # Check if we have a new token
-        if ctx.client.objects["live_statustokens"].get(ctx.ch.id, 0) != ctx.msg.id:
-            return None
-
         embed = discord.Embed(
             description=timer.pretty_pinstatus(),
             colour=discord.Colour(0x9b59b6)
         )
         return {'embed': embed}
 
-    await ctx.live_reply(_status)
+    # A newer status in the same channel replaces this one
+    await ctx.live_reply(_status, key=("status", ctx.ch.id), version_func=timer.status_key)
 
 
 @cmd("notify",
@@ -438,6 +430,9 @@ async def cmd_notify(ctx):
             for subber in ctx.client.interface.get_subs_for(ctx.author.id):
                 subber.notify = NotifyLevel(newlevel)
 
+            # Retry direct messages, in case they have been opened since
+            ctx.client.interface.notifier.forget(ctx.author.id)
+
             # Send the update message
             await ctx.reply(message)
 
@@ -469,6 +464,8 @@ async def cmd_rename(ctx):
             "**Usage:** `rename <groupname>`"
         )
     timer.name = ctx.arg_str
+    timer.mark_changed()
+    timer.record('rename')
     await ctx.embedreply("Your group has been renamed to **{}**.".format(ctx.arg_str))
 
 
@@ -525,7 +522,9 @@ async def cmd_syncwith(ctx):
     # Change the stage and adjust the time
     await current_timer.change_stage(i, notify=False, inactivity_check=False, report_old=False)
     current_timer.current_stage_start = new_stage_start
-    current_timer.remaining = elapsed - target_duration
+    current_timer.mark_changed()
+    current_timer.schedule()
+    current_timer.record('sync')
 
     # Notify the user
     await ctx.embedreply(current_timer.pretty_pinstatus(), title="Timers synced!")
@@ -0,0 +1,59 @@
+"""
+Sharded launcher for PomoBot.
+
+Starts one `main.py` worker process per gateway shard, and restarts workers which fail.
+Run from the top directory, e.g.
+    python3 bot/launcher.py --shards 4
+Use `--fake-gateway` to run the workers locally without connecting to Discord.
+The fake workers see no guilds, so run them against a scratch `data` directory.
+"""
+import os
+import sys
+import signal
+import asyncio
+import argparse
+
+from config import conf
+from logger import log
+from sharding import ShardSupervisor
+
+# Get the real location
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, default=conf.getint('shard_count', 1),
+                        help="Number of gateway shards, and of worker processes.")
+    parser.add_argument('--fake-gateway', action='store_true',
+                        help="Run the workers without connecting to Discord.")
+    parser.add_argument('--crash-after', type=float, default=None,
+                        help="With a fake gateway, make the workers fail after this many seconds.")
+    args = parser.parse_args()
+
+    main_fp = os.path.join(__location__, 'main.py')
+
+    def command(shard_id, shard_count):
+        cmd = [sys.executable, main_fp, '--shard-id', str(shard_id), '--shard-count', str(shard_count)]
+        if args.fake_gateway:
+            cmd.append('--fake-gateway')
+            if args.crash_after is not None:
+                cmd.extend(('--crash-after', str(args.crash_after)))
+        return cmd
+
+    supervisor = ShardSupervisor(command, args.shards)
+
+    loop = asyncio.get_event_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, supervisor.stop)
+        except NotImplementedError:
+            pass
+
+    log("Launching {} shard workers{}.".format(args.shards, " with a fake gateway" if args.fake_gateway else ""),
+        context='SETUP')
+    loop.run_until_complete(supervisor.run())
+
+
+if __name__ == '__main__':
+    main()
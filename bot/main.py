@@ -1,4 +1,6 @@
 import os
+import sys
+import argparse
 
 from config import conf
 from logger import log
@@ -6,26 +8,90 @@ from cmdClient.cmdClient import cmdClient
 
 from BotData import BotData
 from Timer import TimerInterface
+from Timer.journal import TimerJournal
+from sharding import shard_path, seed_shard_save, FakeGateway
+from utils.editqueue import EditQueue
+from utils.usernames import UserNameCache
+from utils.livereply import LiveMessageRegistry
+from utils.waiters import WaiterRegistry
+from utils.metrics import metrics, LoopLagMonitor, instrument_commands, client_gauges
 
 # Get the real location
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
 
+# Read the shard this process runs, when started by the launcher
+parser = argparse.ArgumentParser(description="Run a PomoBot client, optionally as a single shard worker.")
+parser.add_argument('--shard-id', type=int, default=0)
+parser.add_argument('--shard-count', type=int, default=1)
+parser.add_argument('--fake-gateway', action='store_true')
+parser.add_argument('--crash-after', type=float, default=None)
+args = parser.parse_args()
+sharded = args.shard_count > 1
+
 # Load required data from configs
 masters = [int(master.strip()) for master in conf['masters'].split(",")]
-config = BotData(app="pomo", data_file="data/config_data.db", version=0)
+db_options = {
+    'wal': conf.getboolean('sqlite_wal', True),
+    'synchronous': conf.get('sqlite_synchronous', "NORMAL"),
+    'batch_interval': conf.getint('write_batch_ms', 50) / 1000,
+    'batch_size': conf.getint('write_batch_ops', 200)
+}
+
+# Shard workers share the config database, so cached properties are checked for changes by other workers
+config = BotData(app="pomo", data_file="data/config_data.db", version=0,
+                 validate_interval=conf.getint('shared_cache_seconds', 5) if sharded else None,
+                 **db_options)
 
 # Initialise the client
-client = cmdClient(prefix=conf['prefix'], owners=masters)
+if sharded:
+    client = cmdClient(prefix=conf['prefix'], owners=masters, shard_id=args.shard_id, shard_count=args.shard_count)
+else:
+    client = cmdClient(prefix=conf['prefix'], owners=masters)
 client.config = config
 client.log = log
+# Discord's global rate limit is shared by every shard
+client.editor = EditQueue(global_limit=max(1, 40 // args.shard_count))
+client.user_names = UserNameCache(client)
+client.live_messages = LiveMessageRegistry(client)
+client.waiters = WaiterRegistry(client)
 
 # Load the commands
 client.load_dir(os.path.join(__location__, 'commands'))
+instrument_commands(client)
+
+# Each shard keeps its own timer state, seeded from the unsharded state on the first sharded run
+if sharded:
+    base_save_fp = TimerInterface.save_fp
+    TimerInterface.save_fp = shard_path(base_save_fp, args.shard_id, args.shard_count)
+    seed_shard_save(TimerJournal(TimerInterface.save_fp), TimerJournal(base_save_fp),
+                    args.shard_id, args.shard_count)
 
 # Initialise the timer
-TimerInterface(client, conf['session_store'])
+TimerInterface(client, conf['session_store'], db_options=db_options,
+               refresh_budget=conf.getint('status_edits_per_second', 5))
+
+# Monitor the event loop lag, and write the metrics file if requested
+metrics_file = conf.get('metrics_file', None)
+if metrics_file:
+    metrics_file = shard_path(metrics_file, args.shard_id, args.shard_count)
+metrics.add_collector(lambda: client_gauges(client))
+lag_monitor = LoopLagMonitor(metrics, metrics_file=metrics_file,
+                             write_interval=conf.getint('metrics_interval', 15))
+client.loop.call_soon(lag_monitor.start)
 
 # Log and execute!
-log("Initial setup complete, logging in", context='SETUP')
-client.run(conf['TOKEN'])
+exit_code = 0
+if args.fake_gateway:
+    log("Initial setup complete, starting fake gateway", context='SETUP')
+    gateway = FakeGateway(client, args.shard_id, args.shard_count, crash_after=args.crash_after)
+    exit_code = client.loop.run_until_complete(gateway.run())
+else:
+    log("Initial setup complete, logging in", context='SETUP')
+    client.run(conf['TOKEN'])
+
+# Commit any queued writes once the client has shut down
+client.interface.journal.close()
+client.interface.registry.close()
+config.close()
+sys.exit(exit_code)
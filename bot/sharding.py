@@ -0,0 +1,249 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+
+from logger import log
+
+
+def shard_for_guild(guildid, shard_count):
+    """
+    Return the id of the gateway shard which receives the events of the given guild.
+    """
+    return (guildid >> 22) % shard_count
+
+
+def shard_path(path, shard_id, shard_count):
+    """
+    Return the shard-local version of a data file path, e.g. `data/timerstatus.shard2.json`.
+    Unsharded deployments keep the original path.
+    """
+    if shard_count <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return "{}.shard{}{}".format(root, shard_id, ext)
+
+
+def seed_shard_save(journal, base_journal, shard_id, shard_count):
+    """
+    Seed a new shard-local timer snapshot from the unsharded snapshot and journal,
+    keeping only the subscribers in guilds owned by the shard.
+    Does nothing if the shard already has saved state, or if there is no unsharded state.
+    Both journals are closed afterwards, since they are only opened for seeding.
+
+    Parameters
+    ----------
+    journal: TimerJournal
+        The journal of the shard.
+    base_journal: TimerJournal
+        The journal of the unsharded deployment.
+    """
+    try:
+        if os.path.exists(journal.snapshot_fp) or os.path.exists(journal.journal_fp):
+            return
+        state = base_journal.load()
+        if state is None:
+            return
+
+        state['subscribers'] = [
+            data for data in state['subscribers'] if shard_for_guild(data['guildid'], shard_count) == shard_id
+        ]
+        journal.snapshot(state)
+    finally:
+        journal.close()
+        base_journal.close()
+    log("Seeded shard {} timer state with {} subscribers from {}.".format(
+        shard_id, len(state['subscribers']), base_journal.snapshot_fp
+    ), context="SHARDING")
+
+
+class FakeGateway(object):
+    """
+    Stand-in for the Discord gateway connection of a worker, for running the launcher locally.
+
+    Instead of logging in, the worker launches its timer interface directly and then idles,
+    logging a heartbeat, until it receives `SIGINT` or `SIGTERM`.
+    It may be asked to exit with an error after some time, to exercise the supervisor restarts.
+
+    Parameters
+    ----------
+    client: cmdClient
+        The worker client.
+    shard_id: int
+        The shard the worker owns.
+    shard_count: int
+        The total number of shards.
+    crash_after: float
+        If given, the number of seconds after which to exit with an error.
+    heartbeat: float
+        Number of seconds between heartbeat log messages.
+    """
+    def __init__(self, client, shard_id, shard_count, crash_after=None, heartbeat=60):
+        self.client = client
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.crash_after = crash_after
+        self.heartbeat = heartbeat
+
+        self._stopped = None
+
+    def stop(self):
+        self._stopped.set()
+
+    async def run(self):
+        """
+        Run the fake connection until stopped.
+        Returns the exit code for the worker.
+        """
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+
+        log("Fake gateway connected for shard {} of {}.".format(self.shard_id, self.shard_count),
+            context="FAKE_GATEWAY")
+        await self.client.interface.launch(self.client)
+
+        started = time.monotonic()
+        while not self._stopped.is_set():
+            timeout = self.heartbeat
+            if self.crash_after is not None:
+                timeout = min(timeout, max(0, started + self.crash_after - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            if self.crash_after is not None and time.monotonic() - started >= self.crash_after:
+                log("Simulating a crash of shard {}.".format(self.shard_id),
+                    context="FAKE_GATEWAY",
+                    level=logging.WARNING)
+                return 1
+            if not self._stopped.is_set():
+                log("Shard {} alive, {} timer channels loaded.".format(
+                    self.shard_id, len(self.client.interface.channels)
+                ), context="FAKE_GATEWAY")
+
+        log("Fake gateway for shard {} stopped.".format(self.shard_id), context="FAKE_GATEWAY")
+        return 0
+
+
+class ShardSupervisor(object):
+    """
+    Runs one worker process per gateway shard, and restarts workers which fail.
+
+    Workers are started `start_interval` seconds apart, to respect the gateway identify rate limit.
+    A worker exiting with a non-zero code is restarted after a delay, which doubles with each
+    consecutive failure up to `max_restart_delay`, and resets once a worker has run for `stable_time`.
+    A worker exiting cleanly is not restarted.
+
+    Parameters
+    ----------
+    command: Function(int, int) -> List(str)
+        Function taking the shard id and shard count, and returning the command line of the worker.
+    shard_count: int
+        Number of shards, and hence of worker processes.
+    """
+    start_interval = 5
+    restart_delay = 5
+    max_restart_delay = 300
+    stable_time = 600
+    stop_timeout = 30
+
+    def __init__(self, command, shard_count):
+        self.command = command
+        self.shard_count = shard_count
+
+        self.processes = {}  # Map shard_id -> running worker process
+        self.restarts = {shard_id: 0 for shard_id in range(shard_count)}  # Map shard_id -> number of restarts
+
+        self._stopping = None
+
+    async def run(self):
+        """
+        Start the workers and supervise them until `stop` is called, or every worker has exited cleanly.
+        """
+        self._stopping = asyncio.Event()
+
+        tasks = []
+        for shard_id in range(self.shard_count):
+            if self._stopping.is_set():
+                break
+            tasks.append(asyncio.ensure_future(self._supervise(shard_id)))
+            if shard_id < self.shard_count - 1:
+                await self._sleep(self.start_interval)
+
+        await asyncio.gather(*tasks)
+        log("All shard workers have exited.", context="SUPERVISOR")
+
+    def stop(self):
+        """
+        Stop supervising, and ask every worker to shut down.
+        """
+        if self._stopping is None or self._stopping.is_set():
+            return
+        log("Stopping {} shard workers.".format(len(self.processes)), context="SUPERVISOR")
+        self._stopping.set()
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+    async def _sleep(self, delay):
+        """
+        Sleep for `delay` seconds, or until the supervisor is stopped.
+        """
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _supervise(self, shard_id):
+        delay = self.restart_delay
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(*self.command(shard_id, self.shard_count))
+            self.processes[shard_id] = process
+            log("Started shard {} worker with pid {}.".format(shard_id, process.pid), context="SUPERVISOR")
+
+            code = await self._wait(process)
+            self.processes.pop(shard_id)
+
+            if self._stopping.is_set():
+                log("Shard {} worker stopped with code {}.".format(shard_id, code), context="SUPERVISOR")
+                break
+            if code == 0:
+                log("Shard {} worker exited cleanly, not restarting.".format(shard_id), context="SUPERVISOR")
+                break
+
+            if time.monotonic() - started >= self.stable_time:
+                delay = self.restart_delay
+            self.restarts[shard_id] += 1
+            log("Shard {} worker exited with code {}, restarting in {} seconds.".format(shard_id, code, delay),
+                context="SUPERVISOR",
+                level=logging.WARNING)
+            await self._sleep(delay)
+            delay = min(2 * delay, self.max_restart_delay)
+
+    async def _wait(self, process):
+        """
+        Wait for a worker to exit, killing it if it doesn't stop within `stop_timeout` of a shutdown.
+        """
+        wait = asyncio.ensure_future(process.wait())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait((wait, stopping), return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+
+        if not wait.done():
+            try:
+                process.terminate()
+            except ProcessLookupError:
+                pass
+            try:
+                return await asyncio.wait_for(asyncio.shield(wait), self.stop_timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+        return await wait
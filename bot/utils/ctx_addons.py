@@ -1,4 +1,3 @@
-import asyncio
 import discord
 from cmdClient import Context
 
@@ -15,10 +14,11 @@ async def embedreply(ctx, desc, colour=discord.Colour(0x9b59b6), **kwargs):
 
 
 @Context.util
-async def live_reply(ctx, reply_func, update_interval=5, max_messages=20):
+async def live_reply(ctx, reply_func, update_interval=5, max_messages=20, key=None, version_func=None):
     """
     Acts as `ctx.reply`, but asynchronously updates the reply every `update_interval` seconds
     with the value of `reply_func`, until the value is `None`.
+    Updates are driven by the shared `client.live_messages` registry.
 
     Parameters
     ----------
@@ -29,6 +29,12 @@ async def live_reply(ctx, reply_func, update_interval=5, max_messages=20):
         An integer number of seconds.
     max_messages: int
         Maximum number of messages in channel to keep the reply live for.
+    key: Hashable
+        Optional key identifying the reply, e.g. a command and channel.
+        A new live reply with the same key stops updating this reply.
+    version_func: Function() -> Hashable
+        Optional function returning a value which changes whenever the reply content may change.
+        When given, the reply is only re-rendered when the value has changed.
 
     Returns
     -------
@@ -37,37 +43,11 @@ async def live_reply(ctx, reply_func, update_interval=5, max_messages=20):
     # Send the initial message
     message = await ctx.reply(**(await reply_func()))
 
-    # Start the counter
-    future = asyncio.ensure_future(_message_counter(ctx.client, ctx.ch, max_messages))
-
-    # Build the loop function
-    async def _reply_loop():
-        while not future.done():
-            await asyncio.sleep(update_interval)
-            args = await reply_func()
-            if args is not None:
-                await message.edit(**args)
-            else:
-                break
-
-    # Start the loop
-    asyncio.ensure_future(_reply_loop())
+    # Register the message for updates
+    ctx.client.live_messages.add(
+        message, reply_func,
+        interval=update_interval, max_messages=max_messages, key=key, version_func=version_func
+    )
 
     # Return the original message
     return message
-
-
-async def _message_counter(client, channel, max_count):
-    """
-    Helper for live_reply
-    """
-    # Build check function
-    def _check(message):
-        return message.channel == channel
-
-    # Loop until the message counter reaches maximum
-    count = 0
-    while count < max_count:
-        await client.wait_for('message', check=_check)
-        count += 1
-    return
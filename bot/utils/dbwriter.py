@@ -0,0 +1,253 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import traceback
+import sqlite3 as sq
+from concurrent.futures import Future
+
+from logger import log
+from utils.metrics import metrics
+
+
+# Queue markers
+_FLUSH = object()
+_CLOSE = object()
+
+
+def configure_connection(conn, wal=True, synchronous="NORMAL"):
+    """
+    Apply the journal settings to the given connection.
+    """
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous={}".format(synchronous))
+
+
+class WriteBehindQueue(object):
+    """
+    Write-behind queue for an SQLite database.
+
+    A dedicated writer thread owns its own connection to the database,
+    and groups the submitted writes into a single transaction
+    every `batch_interval` seconds or every `batch_size` writes, whichever comes first.
+    This keeps commits (and the corresponding disk syncs) off the event loop thread.
+
+    Reads should use a separate connection, and only see committed writes.
+    Readers which need to see earlier writes should await `flush_async` first, rather than blocking the loop.
+    The database schema should be set up before the queue is created.
+
+    Parameters
+    ----------
+    db_file: str
+        Path of the database file to write to.
+    batch_interval: float
+        Maximum number of seconds a write may wait before its batch is committed.
+    batch_size: int
+        Maximum number of writes in a single batch.
+    wal: bool
+        Whether to put the database in write-ahead log mode.
+    synchronous: str
+        The SQLite `synchronous` setting for the writer connection, e.g. `NORMAL` or `FULL`.
+    timeout: float
+        Number of seconds to wait for database locks.
+    """
+    def __init__(self, db_file, batch_interval=0.05, batch_size=200, wal=True, synchronous="NORMAL", timeout=20):
+        self.db_file = db_file
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self.wal = wal
+        self.synchronous = synchronous
+        self.timeout = timeout
+
+        self.pending = 0  # Number of submitted writes which have not been committed
+        self.submitted = 0  # Number of submitted writes, used as the sequence number of the latest write
+        self.completed = 0  # Number of writes committed or failed, which complete in submission order
+        self.batches = 0  # Number of committed batches
+        self.committed = 0  # Number of committed writes
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._conn = None  # Connection of the writer thread, only used by other threads under `_conn_lock`
+        self._conn_lock = threading.Lock()
+        self._commit_times = metrics.histogram('db_commit_seconds', db=os.path.basename(db_file))
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="dbwriter-{}".format(db_file), daemon=True)
+        self._thread.start()
+
+    def submit(self, statements):
+        """
+        Queue a list of `(sql, params)` statements to be executed together in the next batch.
+
+        Returns
+        -------
+        An `asyncio.Future` when called from a running event loop, otherwise a `concurrent.futures.Future`.
+        The future resolves once the statements are committed,
+        or raises the exception encountered while executing them.
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed write queue.")
+
+        future = Future()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+            self._queue.put((statements, future))
+        return self._awaitable(future)
+
+    def execute(self, sql, params=()):
+        """
+        Queue a single statement, see `submit`.
+        """
+        return self.submit([(sql, params)])
+
+    def _flush_future(self):
+        """
+        Queue a flush marker, returning a `concurrent.futures.Future` which resolves once it is reached.
+        """
+        future = Future()
+        self._queue.put((_FLUSH, future))
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Block until every write submitted so far has been committed.
+        Blocks the calling thread, so should not be used on the event loop, see `flush_async`.
+        """
+        if self._closed:
+            return
+        self._flush_future().result(timeout=timeout)
+
+    async def flush_async(self):
+        """
+        Wait, without blocking the event loop, until every write submitted so far has been committed.
+        """
+        if self._closed or not self.pending:
+            return
+        await asyncio.wrap_future(self._flush_future())
+
+    def close(self):
+        """
+        Commit all pending writes and stop the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        future = Future()
+        self._queue.put((_CLOSE, future))
+        future.result()
+        self._thread.join()
+
+    def external_version(self):
+        """
+        Return the `PRAGMA data_version` of the writer connection.
+        This changes whenever another connection, e.g. of another process, commits to the database,
+        but not when the writer commits its own batches.
+        Returns `None` instead of waiting if the writer is busy committing, or not yet connected.
+        """
+        if not self._conn_lock.acquire(blocking=False):
+            return None
+        try:
+            if self._conn is None:
+                return None
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            self._conn_lock.release()
+
+    @staticmethod
+    def _awaitable(future):
+        """
+        Wrap the future for the running event loop, if there is one.
+        """
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            return future
+        return asyncio.wrap_future(future, loop=loop) if loop.is_running() else future
+
+    def _run(self):
+        conn = sq.connect(self.db_file, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        configure_connection(conn, wal=self.wal, synchronous=self.synchronous)
+        with self._conn_lock:
+            self._conn = conn
+
+        closing = False
+        while not closing:
+            # Wait for the first operation of the batch, and collect more until the batch is full or due
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size and batch[-1][0] not in (_FLUSH, _CLOSE):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            writes = [op for op in batch if op[0] not in (_FLUSH, _CLOSE)]
+            if writes:
+                with self._conn_lock:
+                    self._commit(conn, writes)
+
+            for statements, future in batch:
+                if statements is _CLOSE:
+                    closing = True
+                if statements in (_FLUSH, _CLOSE):
+                    future.set_result(None)
+
+        with self._conn_lock:
+            self._conn = None
+            conn.close()
+
+    def _commit(self, conn, writes):
+        """
+        Execute and commit a batch of writes in a single transaction.
+        If the transaction fails, the writes are retried one at a time to isolate the failure.
+        """
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN")
+            for statements, _ in writes:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [self._commit_single(conn, statements) for statements, _ in writes]
+        else:
+            results = [None] * len(writes)
+        self._commit_times.record(time.perf_counter() - start)
+
+        with self._lock:
+            self.pending -= len(writes)
+            self.completed += len(writes)
+            self.batches += 1
+            self.committed += sum(result is None for result in results)
+
+        for (_, future), result in zip(writes, results):
+            if result is None:
+                future.set_result(None)
+            else:
+                future.set_exception(result)
+
+    def _commit_single(self, conn, statements):
+        """
+        Execute and commit a single write, returning the exception raised, if any.
+        """
+        try:
+            conn.execute("BEGIN")
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            log("Failed to write to {}.\n{}".format(self.db_file, traceback.format_exc()),
+                context="DB_WRITER",
+                level=logging.ERROR)
+            return e
@@ -0,0 +1,259 @@
+import time
+import asyncio
+import logging
+import traceback
+from collections import OrderedDict
+
+import discord
+
+from logger import log
+
+
+class TokenBucket(object):
+    """
+    Token bucket holding a request budget, e.g. of a single rate limit route.
+    """
+    __slots__ = ('limit', 'period', 'tokens', 'updated')
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.tokens = limit
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.period)
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        Number of seconds until the bucket can pay for another request.
+        """
+        self.refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) * self.period / self.limit
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _PendingEdit(object):
+    __slots__ = ('message', 'kwargs', 'queued_at', 'future')
+
+    def __init__(self, message, kwargs, queued_at, future):
+        self.message = message
+        self.kwargs = kwargs
+        self.queued_at = queued_at
+        self.future = future
+
+
+def _retrieve(future):
+    # Mark the exception as retrieved, so fire-and-forget edits don't log unhandled exceptions
+    if not future.cancelled():
+        future.exception()
+
+
+class EditQueue(object):
+    """
+    Outbound scheduler for message edits.
+
+    Each message has at most one pending edit, holding the latest requested content.
+    Requesting another edit of a message which is already waiting replaces the pending content,
+    so only the newest content is ever sent, and edits of one message are sent in order.
+    Pending edits are grouped by rate limit route (the channel of the message),
+    and the dispatcher always sends the stalest edit whose route and the global budget allow it,
+    so that busy channels can't starve the others or run into Discord's rate limits.
+
+    Parameters
+    ----------
+    route_limit: int
+        Number of edits allowed per route in each `route_period`.
+    route_period: float
+        Length of the route rate limit window, in seconds.
+    global_limit: int
+        Number of edits allowed across all routes per second.
+    concurrency: int
+        Maximum number of edits in flight at once.
+    max_pending: int
+        Maximum number of messages with a pending edit.
+        Edits of further messages are dropped until the queue drains.
+    """
+    def __init__(self, route_limit=5, route_period=5, global_limit=40, concurrency=10, max_pending=5000):
+        self.route_limit = route_limit
+        self.route_period = route_period
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+
+        self._routes = {}  # Map route -> OrderedDict(message_id -> _PendingEdit), oldest first
+        self._buckets = {}  # Map route -> TokenBucket
+        self._global = TokenBucket(global_limit, 1)
+        self._inflight = set()  # Ids of messages with an edit being sent
+
+        self._wakeup = None  # Event set when there may be a new edit to send
+        self._task = None  # Task running the dispatcher
+        self._semaphore = None
+
+        self.depth = 0  # Number of pending edits
+        self.sent = 0  # Number of edits sent
+        self.coalesced = 0  # Number of edits replaced by newer content before being sent
+        self.dropped = 0  # Number of edits abandoned without being sent
+        self.failed = 0  # Number of sent edits which raised an exception
+
+    @staticmethod
+    def route_for(message):
+        return message.channel.id
+
+    def edit(self, message, **kwargs):
+        """
+        Queue an edit of `message` with the given `Message.edit` keyword arguments.
+
+        Returns
+        -------
+        An `asyncio.Future` which resolves to `True` once the content (or newer content) is sent,
+        or to `False` if the edit was dropped.
+        Exceptions raised by the edit, e.g. `discord.NotFound`, are set on the future.
+        The future does not need to be awaited.
+        """
+        route = self.route_for(message)
+        pending = self._routes.get(route, None)
+        if pending is not None and message.id in pending:
+            # Replace the waiting content, and keep the original place in the queue
+            item = pending[message.id]
+            item.message = message
+            item.kwargs = kwargs
+            self.coalesced += 1
+            return item.future
+
+        future = asyncio.get_event_loop().create_future()
+        future.add_done_callback(_retrieve)
+
+        if self.depth >= self.max_pending:
+            self.dropped += 1
+            future.set_result(False)
+            return future
+
+        if pending is None:
+            pending = self._routes[route] = OrderedDict()
+        pending[message.id] = _PendingEdit(message, kwargs, time.monotonic(), future)
+        self.depth += 1
+
+        self.start()
+        self._wakeup.set()
+        return future
+
+    def discard(self, message):
+        """
+        Drop any pending edit of the given message, e.g. before deleting it.
+        """
+        pending = self._routes.get(self.route_for(message), None)
+        if pending is not None and message.id in pending:
+            item = pending.pop(message.id)
+            self.depth -= 1
+            self.dropped += 1
+            item.future.set_result(False)
+
+    def staleness(self):
+        """
+        Number of seconds the oldest pending edit has been waiting.
+        """
+        now = time.monotonic()
+        heads = [next(iter(pending.values())).queued_at for pending in self._routes.values() if pending]
+        return now - min(heads) if heads else 0
+
+    def start(self):
+        """
+        Start the dispatcher, if it isn't already running.
+        """
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    def _next_edit(self, now):
+        """
+        Pop the stalest edit which may be sent now.
+        Returns the edit and its route, or `None` and the number of seconds until an edit may be sent.
+        """
+        best = None
+        delay = None
+        for route, pending in self._routes.items():
+            # Only the oldest edit of each route is a candidate, to keep the per-route order
+            for item in pending.values():
+                if item.message.id not in self._inflight:
+                    break
+            else:
+                continue
+            if best is not None and item.queued_at >= best[1].queued_at:
+                continue
+
+            bucket = self._buckets.get(route, None)
+            wait = bucket.wait_time(now) if bucket is not None else 0
+            if wait:
+                delay = wait if delay is None else min(delay, wait)
+            else:
+                best = (route, item)
+
+        if best is None:
+            return None, delay
+
+        route, item = best
+        self._routes[route].pop(item.message.id)
+        if not self._routes[route]:
+            self._routes.pop(route)
+        self.depth -= 1
+        return best, None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+
+            if self.depth:
+                wait = self._global.wait_time(now)
+                if not wait:
+                    await self._semaphore.acquire()
+                    best, wait = self._next_edit(time.monotonic())
+                    if best is not None:
+                        route, item = best
+                        self._global.take()
+                        bucket = self._buckets.get(route, None)
+                        if bucket is None:
+                            bucket = self._buckets[route] = TokenBucket(self.route_limit, self.route_period)
+                        bucket.take()
+
+                        self._inflight.add(item.message.id)
+                        asyncio.ensure_future(self._send(item))
+                        continue
+                    self._semaphore.release()
+            else:
+                wait = None
+
+            # Forget idle routes with a full budget
+            if len(self._buckets) > len(self._routes) + 1000:
+                for route in [route for route, bucket in self._buckets.items()
+                              if route not in self._routes and not bucket.wait_time(now)]:
+                    self._buckets.pop(route)
+
+            # Sleep until an edit may be sent, a new edit arrives, or an edit completes
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, item):
+        try:
+            await item.message.edit(**item.kwargs)
+        except Exception as e:
+            self.failed += 1
+            if not isinstance(e, discord.HTTPException):
+                log("Caught the following exception while editing a message.\n{}".format(traceback.format_exc()),
+                    context="EDIT_QUEUE",
+                    level=logging.ERROR)
+            item.future.set_exception(e)
+        else:
+            self.sent += 1
+            item.future.set_result(True)
+        finally:
+            self._inflight.discard(item.message.id)
+            self._semaphore.release()
+            self._wakeup.set()
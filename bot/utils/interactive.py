@@ -1,9 +1,98 @@
 import asyncio
+import logging
+import traceback
+from collections import OrderedDict
+
 import discord
 from cmdClient import Context
 from cmdClient.lib import UserCancelled, ResponseTimedOut
 
-from .lib import paginate_list
+from logger import log
+
+from .lib import ListPages
+
+
+class PageSource(object):
+    """
+    On-demand source of pages for the `pager`.
+    Pages are fetched from the underlying source when they are first viewed,
+    and a small number of recently viewed pages are kept.
+
+    Parameters
+    ----------
+    source: Union(Sequence, Function(int) -> Awaitable)
+        Either a sequence of pages, with or without a `__len__`, which raises `IndexError` past the last page,
+        or an async callable taking a page index and returning the page, or `None` past the last page.
+    length: int
+        The number of pages, if known in advance.
+        Taken from the source if it is a sequence with a length.
+    cache_size: int
+        Maximum number of fetched pages to keep.
+    """
+    def __init__(self, source, length=None, cache_size=5):
+        self.source = source
+        self.cache_size = cache_size
+
+        if length is None and hasattr(source, '__getitem__') and hasattr(source, '__len__'):
+            length = len(source)
+        self.length = length  # Number of pages, or `None` until the last page is found
+
+        self._cache = OrderedDict()  # Map index -> page, least recently used first
+        self._pending = {}  # Map index -> Task fetching the page
+
+    async def get(self, index):
+        """
+        Return the page with the given index, or `None` if there is no such page.
+        """
+        if index < 0 or (self.length is not None and index >= self.length):
+            return None
+
+        if index in self._cache:
+            self._cache.move_to_end(index)
+            return self._cache[index]
+
+        task = self._pending.get(index, None)
+        if task is None:
+            task = self._pending[index] = asyncio.ensure_future(self._fetch(index))
+        return await task
+
+    def prefetch(self, index):
+        """
+        Start fetching the given page in the background, if it isn't already available.
+        """
+        if index >= 0 and (self.length is None or index < self.length):
+            if index not in self._cache and index not in self._pending:
+                self._pending[index] = asyncio.ensure_future(self._fetch(index))
+                self._pending[index].add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            log("Failed to prefetch a page.\n{}".format(
+                "".join(traceback.format_exception(None, task.exception(), task.exception().__traceback__))
+            ), context="PAGER", level=logging.ERROR)
+
+    async def _fetch(self, index):
+        try:
+            if hasattr(self.source, '__getitem__'):
+                try:
+                    page = self.source[index]
+                except IndexError:
+                    page = None
+            else:
+                page = await self.source(index)
+        finally:
+            self._pending.pop(index, None)
+
+        if page is None:
+            # Found the end of a source with unknown length
+            if self.length is None or index < self.length:
+                self.length = index
+        else:
+            self._cache[index] = page
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return page
 
 
 @Context.util
@@ -12,6 +101,7 @@ async def listen_for(ctx, allowed_input=None, timeout=120, lower=True, check=Non
     Listen for a one of a particular set of input strings,
     sent in the current channel by `ctx.author`.
     When found, return the message containing them.
+    Only messages in the current channel from `ctx.author` are considered, including by a custom `check`.
 
     Parameters
     ----------
@@ -44,14 +134,11 @@ async def listen_for(ctx, allowed_input=None, timeout=120, lower=True, check=Non
 
         # Create the check function
         def check(message):
-            result = (message.author == ctx.author)
-            result = result and (message.channel == ctx.ch)
-            result = result and ((message.content.lower() if lower else message.content) in allowed_input)
-            return result
+            return (message.content.lower() if lower else message.content) in allowed_input
 
     # Wait for a matching message, catch and transform the timeout
     try:
-        message = await ctx.client.wait_for('message', check=check, timeout=timeout)
+        message = await ctx.client.waiters.wait_for_message(ctx.ch.id, ctx.author.id, check=check, timeout=timeout)
     except asyncio.TimeoutError:
         raise ResponseTimedOut("Session timed out waiting for user response.") from None
 
@@ -93,13 +180,16 @@ async def selector(ctx, header, select_from, timeout=120, max_len=20):
     if len(select_from) == 0:
         raise ValueError("Selection list passed to `selector` cannot be empty.")
 
-    # Generate the selector pages
+    # Generate the selector pages as they are viewed
     footer = "Please type the number corresponding to your selection, or type `c` now to cancel."
-    list_pages = paginate_list(select_from, block_length=max_len)
-    pages = ["\n".join([header, page, footer]) for page in list_pages]
+    list_pages = ListPages(select_from, block_length=max_len)
+
+    async def _page(index):
+        if index < len(list_pages):
+            return "\n".join([header, list_pages[index], footer])
 
     # Post the pages in a paged message
-    out_msg = await ctx.pager(pages)
+    out_msg = await ctx.pager(PageSource(_page, length=len(list_pages)))
 
     # Listen for valid input
     valid_input = [str(i+1) for i in range(0, len(select_from))] + ['c', 'C']
@@ -129,14 +219,16 @@ async def selector(ctx, header, select_from, timeout=120, max_len=20):
 @Context.util
 async def pager(ctx, pages, locked=True, **kwargs):
     """
-    Shows the user each page from the provided list `pages` one at a time,
+    Shows the user each page from the provided `pages` one at a time,
     providing reactions to page back and forth between pages.
     This is done asynchronously, and returns after displaying the first page.
+    Pages are only fetched when they are viewed, with the next page fetched in advance.
 
     Parameters
     ----------
-    pages: List(Union(str, discord.Embed))
-        A list of either strings or embeds to display as the pages.
+    pages: Union(Sequence(Union(str, discord.Embed)), PageSource)
+        Either a sequence of strings or embeds to display as the pages,
+        or a `PageSource`, e.g. wrapping an async callable producing the pages.
     locked: bool
         Whether only the `ctx.author` should be able to use the paging reactions.
     kwargs: ...
@@ -145,31 +237,48 @@ async def pager(ctx, pages, locked=True, **kwargs):
     Returns: discord.Message
         This is the output message, returned for easy deletion.
     """
+    source = pages if isinstance(pages, PageSource) else PageSource(pages)
+
     # Handle broken input
-    if len(pages) == 0:
+    first_page = await source.get(0)
+    if first_page is None:
         raise ValueError("Pager cannot page with no pages!")
 
     # Post first page. Method depends on whether the page is an embed or not.
-    if isinstance(pages[0], discord.Embed):
-        out_msg = await ctx.reply(embed=pages[0])
+    if isinstance(first_page, discord.Embed):
+        out_msg = await ctx.reply(embed=first_page)
     else:
-        out_msg = await ctx.reply(pages[0])
+        out_msg = await ctx.reply(first_page)
 
     # Run the paging loop if required
-    if len(pages) > 1:
-        asyncio.ensure_future(_pager(ctx, out_msg, pages, locked))
+    if source.length is None or source.length > 1:
+        asyncio.ensure_future(_pager(ctx, out_msg, source, locked))
 
     # Return the output message
     return out_msg
 
 
-async def _pager(ctx, out_msg, pages, locked):
+async def _pager(ctx, out_msg, source, locked):
     """
     Asynchronous initialiser and loop for the `pager` utility above.
     """
     # Page number
     page = 0
 
+    # Quit if a source of unknown length turns out to have a single page, otherwise prefetch the second page
+    if source.length is None:
+        try:
+            second_page = await source.get(1)
+        except Exception:
+            log("Failed to fetch the second page, not paging.\n{}".format(traceback.format_exc()),
+                context="PAGER",
+                level=logging.ERROR)
+            return
+        if second_page is None:
+            return
+    else:
+        source.prefetch(1)
+
     # Add reactions to the output message
     next_emoji = "▶"
     prev_emoji = "◀"
@@ -183,10 +292,9 @@ async def _pager(ctx, out_msg, pages, locked):
         await ctx.error_reply("Cannot page results because I do not have permissions to react!")
         return
 
-    # Check function to determine whether a reaction is valid
+    # Check function to determine whether a reaction to the output message is valid
     def check(reaction, user):
-        result = reaction.message.id == out_msg.id
-        result = result and str(reaction.emoji) in [next_emoji, prev_emoji]
+        result = str(reaction.emoji) in [next_emoji, prev_emoji]
         result = result and not (user.id == ctx.client.user.id)
         result = result and not (locked and user != ctx.author)
         return result
@@ -195,23 +303,46 @@ async def _pager(ctx, out_msg, pages, locked):
     while True:
         # Wait for a valid reaction, break if we time out
         try:
-            reaction, user = await ctx.client.wait_for('reaction_add', check=check, timeout=300)
+            reaction, user = await ctx.client.waiters.wait_for_reaction(out_msg.id, check=check, timeout=300)
         except asyncio.TimeoutError:
             break
 
         # Attempt to remove the user's reaction, silently ignore errors
         asyncio.ensure_future(out_msg.remove_reaction(reaction.emoji, user))
 
-        # Change the page number
-        page += 1 if reaction.emoji == next_emoji else -1
-        page %= len(pages)
-
-        # Edit the message with the new page
-        active_page = pages[page]
+        # Change the page number, wrapping around at the ends
+        try:
+            if reaction.emoji == next_emoji:
+                new_page = page + 1
+                active_page = await source.get(new_page)
+                if active_page is None:
+                    new_page = 0
+                    active_page = await source.get(new_page)
+            else:
+                if page > 0:
+                    new_page = page - 1
+                elif source.length is not None:
+                    new_page = source.length - 1
+                else:
+                    # The last page of the source isn't known yet
+                    continue
+                active_page = await source.get(new_page)
+        except Exception:
+            # Stay on the current page, the failed page is fetched again if requested
+            log("Failed to fetch page {} of a pager.\n{}".format(new_page, traceback.format_exc()),
+                context="PAGER",
+                level=logging.ERROR)
+            continue
+        page = new_page
+
+        # Queue an edit to the new page, replacing any page still waiting to be shown
         if isinstance(active_page, discord.Embed):
-            await out_msg.edit(embed=active_page)
+            ctx.client.editor.edit(out_msg, embed=active_page)
         else:
-            await out_msg.edit(content=active_page)
+            ctx.client.editor.edit(out_msg, content=active_page)
+
+        # Fetch the next page in advance
+        source.prefetch(page + 1)
 
     # Clean up by removing the reactions
     try:
@@ -245,13 +376,9 @@ async def input(ctx, msg="", timeout=120):
     # Deliver prompt
     offer_msg = await ctx.reply(msg or "Please enter your input.")
 
-    # Criteria for the input message
-    def checks(m):
-        return m.author == ctx.author and m.channel == ctx.ch
-
     # Listen for the reply
     try:
-        result_msg = await ctx.client.wait_for("message", check=checks, timeout=timeout)
+        result_msg = await ctx.client.waiters.wait_for_message(ctx.ch.id, ctx.author.id, timeout=timeout)
     except asyncio.TimeoutError:
         raise ResponseTimedOut("Session timed out waiting for user response.") from None
 
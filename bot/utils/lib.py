@@ -46,19 +46,42 @@ def paginate_list(item_list, block_length=20, style="markdown", title=None):
         List of pages, each formatted into a codeblock,
         and containing at most `block_length` of the provided strings.
     """
-    lines = ["{0:<5}{1:<5}".format("{}.".format(i + 1), str(line)) for i, line in enumerate(item_list)]
-    page_blocks = [lines[i:i + block_length] for i in range(0, len(lines), block_length)]
-    pages = []
-    for i, block in enumerate(page_blocks):
-        pagenum = "Page {}/{}".format(i + 1, len(page_blocks))
-        if title:
-            header = "{} ({})".format(title, pagenum) if len(page_blocks) > 1 else title
+    return list(ListPages(item_list, block_length=block_length, style=style, title=title))
+
+
+class ListPages(object):
+    """
+    Lazily formatted version of `paginate_list`.
+    Acts as a sequence of the same pages, each formatted when it is accessed.
+    """
+    def __init__(self, item_list, block_length=20, style="markdown", title=None):
+        self.item_list = item_list
+        self.block_length = block_length
+        self.style = style
+        self.title = title
+
+    def __len__(self):
+        return -(-len(self.item_list) // self.block_length)
+
+    def __getitem__(self, index):
+        num = len(self)
+        if not 0 <= index < num:
+            raise IndexError("List page index out of range.")
+
+        start = index * self.block_length
+        lines = [
+            "{0:<5}{1:<5}".format("{}.".format(i + 1), str(line))
+            for i, line in enumerate(self.item_list[start:start + self.block_length], start=start)
+        ]
+
+        pagenum = "Page {}/{}".format(index + 1, num)
+        if self.title:
+            header = "{} ({})".format(self.title, pagenum) if num > 1 else self.title
         else:
             header = pagenum
         header_line = "=" * len(header)
-        full_header = "{}\n{}\n".format(header, header_line) if len(page_blocks) > 1 or title else ""
-        pages.append("```{}\n{}{}```".format(style, full_header, "\n".join(block)))
-    return pages
+        full_header = "{}\n{}\n".format(header, header_line) if num > 1 or self.title else ""
+        return "```{}\n{}{}```".format(self.style, full_header, "\n".join(lines))
 
 
 def timestamp_utcnow():
@@ -0,0 +1,147 @@
+import time
+import asyncio
+import logging
+import traceback
+
+import discord
+
+from logger import log
+
+
+class _LiveMessage(object):
+    __slots__ = (
+        'message', 'reply_func', 'interval', 'max_messages', 'key', 'version_func',
+        'count', 'next_update', 'last_version', 'updating', 'stopped'
+    )
+
+    def __init__(self, message, reply_func, interval, max_messages, key, version_func):
+        self.message = message
+        self.reply_func = reply_func
+        self.interval = interval
+        self.max_messages = max_messages
+        self.key = key
+        self.version_func = version_func
+
+        self.count = 0  # Number of messages posted in the channel since the reply
+        self.next_update = time.monotonic() + interval
+        self.last_version = version_func() if version_func is not None else None
+        self.updating = False
+        self.stopped = False
+
+
+class LiveMessageRegistry(object):
+    """
+    Registry of the live updating replies created by `live_reply`.
+
+    A single ticker task updates every live message when it is due,
+    and a single message listener counts the messages posted in each channel with live messages,
+    stopping the live messages which have been buried under `max_messages` newer messages.
+
+    Parameters
+    ----------
+    client: cmdClient
+        The client to listen for messages on.
+    tick: float
+        Number of seconds between checks for due updates.
+    """
+    def __init__(self, client, tick=1):
+        self.client = client
+        self.tick = tick
+
+        self.channels = {}  # Map channelid -> list of live messages in the channel
+        self.keys = {}  # Map supersede key -> live message
+        self._task = None  # Task running the ticker
+
+        self.renders = 0  # Number of times a live message was re-rendered
+        self.skipped = 0  # Number of due updates skipped because the content was unchanged
+
+        client.add_after_event("message", self.on_message)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.channels.values())
+
+    def add(self, message, reply_func, interval=5, max_messages=20, key=None, version_func=None):
+        """
+        Start updating a sent message every `interval` seconds with the output of `reply_func`.
+        See `live_reply` for the parameters.
+        Any live message with the same `key` is stopped.
+        """
+        if key is not None and key in self.keys:
+            self.stop(self.keys[key])
+
+        entry = _LiveMessage(message, reply_func, interval, max_messages, key, version_func)
+        self.channels.setdefault(message.channel.id, []).append(entry)
+        if key is not None:
+            self.keys[key] = entry
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return entry
+
+    def stop(self, entry):
+        """
+        Stop updating a live message.
+        """
+        if entry.stopped:
+            return
+        entry.stopped = True
+
+        channelid = entry.message.channel.id
+        entries = self.channels.get(channelid, [])
+        if entry in entries:
+            entries.remove(entry)
+            if not entries:
+                self.channels.pop(channelid)
+        if entry.key is not None and self.keys.get(entry.key, None) is entry:
+            self.keys.pop(entry.key)
+
+    async def on_message(self, client, message):
+        entries = self.channels.get(message.channel.id, None)
+        if entries is not None:
+            for entry in list(entries):
+                entry.count += 1
+                if entry.count >= entry.max_messages:
+                    self.stop(entry)
+
+    async def _run(self):
+        while self.channels:
+            now = time.monotonic()
+            for entries in list(self.channels.values()):
+                for entry in entries:
+                    if not entry.updating and now >= entry.next_update:
+                        entry.updating = True
+                        entry.next_update = now + entry.interval
+                        asyncio.ensure_future(self._update(entry))
+            await asyncio.sleep(self.tick)
+
+    async def _update(self, entry):
+        try:
+            # Skip rendering if the underlying content hasn't changed
+            if entry.version_func is not None:
+                version = entry.version_func()
+                if version == entry.last_version:
+                    self.skipped += 1
+                    return
+                entry.last_version = version
+
+            args = await entry.reply_func()
+            if entry.stopped:
+                return
+            if args is None:
+                self.stop(entry)
+                return
+
+            self.renders += 1
+            try:
+                await self.client.editor.edit(entry.message, **args)
+            except discord.NotFound:
+                self.stop(entry)
+            except discord.HTTPException:
+                pass
+        except Exception:
+            log("Caught the following exception while updating a live message.\n{}".format(traceback.format_exc()),
+                context="LIVE_REPLY",
+                level=logging.ERROR)
+            self.stop(entry)
+        finally:
+            entry.updating = False
@@ -0,0 +1,333 @@
+import os
+import time
+import bisect
+import asyncio
+import logging
+import functools
+import traceback
+
+from logger import log
+
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+
+class Histogram(object):
+    """
+    Histogram of durations, in fixed buckets so that it can be exported in the Prometheus format.
+
+    Parameters
+    ----------
+    bounds: Tuple[float]
+        Increasing upper bounds of the buckets, in seconds.
+        Longer durations fall into a final unbounded bucket.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        # The first bound at least the value, or the final unbounded bucket
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def percentile(self, pct):
+        """
+        Estimate the given percentile, interpolating within the bucket which holds it.
+        """
+        if not self.count:
+            return 0
+        target = pct / 100 * self.count
+        seen = 0
+        lower = 0
+        for bound, count in zip(self.bounds + (self.max,), self.counts):
+            if count and seen + count >= target:
+                return min(self.max, lower + (bound - lower) * (target - seen) / count)
+            seen += count
+            lower = bound
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+class _Timing(object):
+    """
+    Context manager recording the duration of its block in a histogram.
+    """
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class Metrics(object):
+    """
+    Collection of labelled duration histograms and gauges, for monitoring.
+
+    Durations are recorded with `observe`, or with the `timer` context manager and `timed` decorator.
+    Durations of coroutines are wall clock times, so they include time spent waiting on requests.
+    Gauges are read on demand from collector functions, e.g. the queue counters of the client.
+    Every histogram and gauge may be exported in the Prometheus text format with `prometheus`.
+    """
+    def __init__(self, prefix="pomobot"):
+        self.prefix = prefix
+        self.histograms = {}  # Map (name, labels) -> Histogram, where labels is a sorted tuple of pairs
+        self.descriptions = {}  # Map name -> help text
+        self.collectors = []  # Functions returning a list of (name, labels, value) gauge readings
+
+    def histogram(self, name, description=None, **labels):
+        """
+        Get or create the histogram with the given name and labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key, None)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        if description is not None:
+            self.descriptions[name] = description
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).record(value)
+
+    def timer(self, name, **labels):
+        """
+        Context manager recording the duration of its block.
+        """
+        return _Timing(self.histogram(name, **labels))
+
+    def timed(self, name, description=None, **labels):
+        """
+        Decorator recording the duration of every call of the decorated function or coroutine function.
+        """
+        def decorator(func):
+            histogram = self.histogram(name, description, **labels)
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        histogram.record(time.perf_counter() - start)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        histogram.record(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def add_collector(self, func):
+        self.collectors.append(func)
+
+    def collect(self):
+        """
+        Read the current gauge values from every collector.
+        Returns a list of `(name, labels, value)` readings.
+        """
+        readings = []
+        for collector in self.collectors:
+            try:
+                readings.extend(collector())
+            except Exception:
+                log("Exception encountered while collecting metrics.\n{}".format(traceback.format_exc()),
+                    context="METRICS",
+                    level=logging.ERROR)
+        return readings
+
+    def prometheus(self):
+        """
+        Render every histogram and gauge in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def label_str(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{{{}}}".format(",".join('{}="{}"'.format(key, value) for key, value in pairs))
+
+        by_name = {}
+        for (name, labels), histogram in self.histograms.items():
+            by_name.setdefault(name, []).append((labels, histogram))
+
+        for name in sorted(by_name):
+            full_name = "{}_{}".format(self.prefix, name)
+            if name in self.descriptions:
+                lines.append("# HELP {} {}".format(full_name, self.descriptions[name]))
+            lines.append("# TYPE {} histogram".format(full_name))
+            for labels, histogram in sorted(by_name[name]):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append("{}_bucket{} {}".format(full_name, label_str(labels, [('le', bound)]), cumulative))
+                lines.append("{}_bucket{} {}".format(full_name, label_str(labels, [('le', "+Inf")]), histogram.count))
+                lines.append("{}_sum{} {}".format(full_name, label_str(labels), histogram.total))
+                lines.append("{}_count{} {}".format(full_name, label_str(labels), histogram.count))
+
+        gauges = {}
+        for name, labels, value in self.collect():
+            gauges.setdefault(name, []).append((tuple(sorted(labels.items())), value))
+        for name in sorted(gauges):
+            full_name = "{}_{}".format(self.prefix, name)
+            lines.append("# TYPE {} gauge".format(full_name))
+            for labels, value in sorted(gauges[name]):
+                lines.append("{}{} {}".format(full_name, label_str(labels), value))
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Atomically write the Prometheus export to the given file, e.g. for the node exporter textfile collector.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+class LoopLagMonitor(object):
+    """
+    Measures event loop lag, as the delay between when a sleep should end and when the loop resumes it.
+    Optionally also writes the metrics file on the same loop.
+
+    Parameters
+    ----------
+    metrics: Metrics
+        Metrics to record the lag in, as the `event_loop_lag_seconds` histogram.
+    interval: float
+        Number of seconds between lag measurements.
+    metrics_file: str
+        Path of the Prometheus metrics file to write, if any.
+    write_interval: float
+        Number of seconds between writes of the metrics file.
+    """
+    def __init__(self, metrics, interval=0.5, metrics_file=None, write_interval=15):
+        self.metrics = metrics
+        self.interval = interval
+        self.metrics_file = metrics_file
+        self.write_interval = write_interval
+
+        self.histogram = metrics.histogram(
+            'event_loop_lag_seconds', "Delay of the event loop in resuming a sleeping task."
+        )
+        self._task = None
+
+    def start(self):
+        """
+        Start the monitor, if it isn't already running.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        last_write = loop.time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.histogram.record(max(0, now - expected))
+
+            if self.metrics_file and now - last_write >= self.write_interval:
+                last_write = now
+                try:
+                    self.metrics.write(self.metrics_file)
+                except Exception:
+                    log("Exception encountered while writing the metrics file.\n{}".format(traceback.format_exc()),
+                        context="METRICS",
+                        level=logging.ERROR)
+
+
+def instrument_commands(client):
+    """
+    Time the execution of every loaded command, in the `command_seconds` histogram.
+    """
+    for command in client.cmds:
+        command.func = metrics.timed('command_seconds', command=command.name)(command.func)
+
+
+def client_gauges(client):
+    """
+    Read the queue and cache counters of the client, as gauge readings for `Metrics.collect`.
+    """
+    readings = []
+    editor = client.editor
+    for key in ('depth', 'sent', 'coalesced', 'dropped', 'failed'):
+        readings.append(('edit_queue_{}'.format(key), {}, getattr(editor, key)))
+    readings.append(('edit_queue_staleness_seconds', {}, editor.staleness()))
+
+    interface = getattr(client, 'interface', None)
+    if interface is not None:
+        for key, value in interface.notifier.stats().items():
+            readings.append(('notifier_{}'.format(key), {}, value))
+        for key, value in interface.refresh_stats().items():
+            readings.append(('refresh_{}'.format(key), {}, value))
+        readings.append(('subscribers', {}, len(interface.subscribers)))
+        readings.append(('scheduled_timers', {}, len(interface.scheduler)))
+        readings.append(('journal_entries', {}, interface.journal.entries))
+        readings.append(('registry_pending_writes', {}, interface.registry.writer.pending))
+
+    config = client.config
+    readings.append(('config_pending_writes', {}, config.writer.pending))
+    for table in ('users', 'guilds'):
+        for key, value in getattr(config, table).cache_info().items():
+            readings.append(('config_cache_{}'.format(key), {'table': table}, value))
+
+    readings.append(('live_messages', {}, sum(map(len, client.live_messages.channels.values()))))
+    readings.append(('message_waiters', {}, sum(map(len, client.waiters.messages.values()))))
+    readings.append(('reaction_waiters', {}, sum(map(len, client.waiters.reactions.values()))))
+    return readings
+
+
+# Shared metrics of the process
+metrics = Metrics()
+metrics.descriptions.update({
+    'handler_seconds': "Duration of the gateway event handlers.",
+    'command_seconds': "Execution time of commands.",
+    'timer_stage_change_seconds': "Duration of timer stage changes, including the stage notifications.",
+    'timer_render_seconds': "Time taken to render a timer channel status.",
+    'timer_channel_update_seconds': "Duration of timer channel status message updates.",
+    'timer_refresh_seconds': "Duration of each status refresh round.",
+    'timer_save_seconds': "Time taken to snapshot the timer state.",
+    'registry_seconds': "Duration of session registry operations.",
+    'db_commit_seconds': "Duration of batched database commits, on the writer threads.",
+})
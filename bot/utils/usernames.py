@@ -0,0 +1,84 @@
+import time
+import asyncio
+
+import discord
+
+
+class UserNameCache(object):
+    """
+    Persistent cache of user names, for displaying users who aren't in the client cache,
+    such as members who have left the guild.
+
+    Names fetched from the API are stored in the `name_cache` user property of the client config,
+    as a `[name, fetched_at]` pair, and are refetched once they are older than `ttl` seconds.
+    Users which no longer exist are stored with a `None` name, and are retried after `negative_ttl` seconds.
+
+    Parameters
+    ----------
+    client: cmdClient
+        The client used to look up and fetch users, holding the config.
+    ttl: int
+        Number of seconds a fetched name is used for.
+    negative_ttl: int
+        Number of seconds a missing user is remembered for.
+    concurrency: int
+        Maximum number of concurrent user fetches.
+    """
+    prop = "name_cache"
+
+    def __init__(self, client, ttl=7 * 86400, negative_ttl=86400, concurrency=5):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+
+        self.fetched = 0  # Number of users fetched from the API
+
+        client.config.users.ensure_exists(self.prop)
+
+    async def resolve(self, userids):
+        """
+        Return a dictionary `userid -> name` for the given users.
+        Users which can't be resolved are named by their id.
+        """
+        names = {}
+        unknown = []
+        for userid in userids:
+            user = self.client.get_user(userid)
+            if user is not None:
+                names[userid] = user.name
+            else:
+                unknown.append(userid)
+        if not unknown:
+            return names
+
+        # Use the stored names which are still fresh
+        now = time.time()
+        to_fetch = []
+        stored = self.client.config.users.get_many(unknown, self.prop)
+        for userid in unknown:
+            name, fetched_at = stored.get(userid, (None, None))
+            if fetched_at is not None and now - fetched_at < (self.ttl if name is not None else self.negative_ttl):
+                names[userid] = name if name is not None else str(userid)
+            else:
+                to_fetch.append(userid)
+
+        # Fetch the remaining users concurrently
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _fetch(userid):
+            async with semaphore:
+                try:
+                    name = (await self.client.fetch_user(userid)).name
+                except discord.NotFound:
+                    name = None
+                except discord.HTTPException:
+                    # Try again next time
+                    names[userid] = str(userid)
+                    return
+            self.fetched += 1
+            self.client.config.users.set(userid, self.prop, [name, int(now)])
+            names[userid] = name if name is not None else str(userid)
+
+        await asyncio.gather(*(_fetch(userid) for userid in to_fetch))
+        return names
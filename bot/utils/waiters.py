@@ -0,0 +1,111 @@
+import asyncio
+
+
+class _Waiter(object):
+    __slots__ = ('future', 'check')
+
+    def __init__(self, future, check):
+        self.future = future
+        self.check = check
+
+
+class WaiterRegistry(object):
+    """
+    Keyed replacement for `client.wait_for`, used by the interactive utilities.
+
+    `client.wait_for` tests every incoming event against the check of every pending waiter,
+    so each event costs time proportional to the number of open selectors, prompts and pagers.
+    Here message waiters are keyed by `(channelid, authorid)` and reaction waiters by the reacted message id,
+    so an event is only checked against the waiters it could possibly satisfy.
+
+    Parameters
+    ----------
+    client: cmdClient
+        The client to listen for messages and reactions on.
+    """
+    def __init__(self, client):
+        self.client = client
+
+        self.messages = {}  # Map (channelid, authorid) -> list of message waiters
+        self.reactions = {}  # Map messageid -> list of reaction waiters
+
+        client.add_after_event("message", self.on_message)
+        client.add_after_event("reaction_add", self.on_reaction)
+
+    def __len__(self):
+        return sum(len(waiters) for waiters in self.messages.values()) + \
+            sum(len(waiters) for waiters in self.reactions.values())
+
+    async def wait_for_message(self, channelid, authorid, check=None, timeout=None):
+        """
+        Wait for a message sent by the given author in the given channel.
+
+        Parameters
+        ----------
+        channelid: int
+            Id of the channel to listen in.
+        authorid: int
+            Id of the user to listen to.
+        check: Function(message) -> bool
+            Optional further check the message must satisfy.
+        timeout: float
+            Number of seconds to wait before raising `asyncio.TimeoutError`.
+
+        Returns: discord.Message
+            The matching message.
+        """
+        return await self._wait(self.messages, (channelid, authorid), check, timeout)
+
+    async def wait_for_reaction(self, messageid, check=None, timeout=None):
+        """
+        Wait for a reaction to be added to the given message.
+
+        Parameters
+        ----------
+        messageid: int
+            Id of the message to listen for reactions on.
+        check: Function(reaction, user) -> bool
+            Optional further check the reaction must satisfy.
+        timeout: float
+            Number of seconds to wait before raising `asyncio.TimeoutError`.
+
+        Returns: Tuple(discord.Reaction, discord.User)
+            The matching reaction and the reacting user.
+        """
+        return await self._wait(self.reactions, messageid, check, timeout)
+
+    async def _wait(self, table, key, check, timeout):
+        waiter = _Waiter(asyncio.get_event_loop().create_future(), check)
+        table.setdefault(key, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        finally:
+            waiters = table.get(key, None)
+            if waiters is not None:
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    table.pop(key)
+
+    @staticmethod
+    def _resolve(waiters, result, *args):
+        for waiter in list(waiters):
+            if waiter.future.done():
+                continue
+            try:
+                matched = waiter.check is None or waiter.check(*args)
+            except Exception as e:
+                waiter.future.set_exception(e)
+            else:
+                if matched:
+                    waiter.future.set_result(result)
+
+    async def on_message(self, client, message):
+        waiters = self.messages.get((message.channel.id, message.author.id), None)
+        if waiters is not None:
+            self._resolve(waiters, message, message)
+
+    async def on_reaction(self, client, reaction, user):
+        waiters = self.reactions.get(reaction.message.id, None)
+        if waiters is not None:
+            self._resolve(waiters, (reaction, user), reaction, user)
@@ -0,0 +1,15 @@
+"""
+Deterministic offline load simulation of PomoBot.
+
+Runs the real `TimerInterface` and `Timer` code against stand-in Discord objects,
+on an event loop driven by a virtual clock, so that hours of activity across many guilds
+can be simulated in seconds without a gateway connection.
+The simulated activity is fully determined by the seed, although the timing of the
+database writer threads can shift individual requests between simulated seconds.
+Run from the top level directory, e.g.
+    python3 -m sim mixed --guilds 200 --groups 2 --members 20 --hours 2
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'bot'))
@@ -0,0 +1,106 @@
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+from . import __doc__ as description
+from .clock import VirtualClock, VirtualTimeLoop
+from .report import build_report, format_report, write_report
+from .scenarios import Simulation, SCENARIOS
+
+
+def memory_usage(traced):
+    """
+    Peak memory usage of the process, and of the Python heap when traced.
+    """
+    memory = {}
+    try:
+        import resource
+        # Reported in kilobytes on Linux
+        memory['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass
+    if traced:
+        memory['heap_current'], memory['heap_peak'] = tracemalloc.get_traced_memory()
+    return memory
+
+
+async def run(sim):
+    await sim.build()
+    processes = [asyncio.ensure_future(process(sim)) for process in SCENARIOS[sim.scenario]]
+    await asyncio.sleep(3600 * sim.args.hours)
+    for process in processes:
+        process.cancel()
+    await asyncio.gather(*processes, return_exceptions=True)
+
+
+def shutdown(loop):
+    """
+    Cancel the background tasks of the bot which are still running.
+    """
+    all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+    tasks = [task for task in all_tasks(loop) if not task.done()]
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m sim", description=description,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', choices=sorted(SCENARIOS), help="Activity scenario to simulate.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the simulated activity.")
+    parser.add_argument('--hours', type=float, default=2, help="Simulated duration, in hours.")
+    parser.add_argument('--guilds', type=int, default=100, help="Number of guilds.")
+    parser.add_argument('--groups', type=int, default=2, help="Number of study groups in each guild.")
+    parser.add_argument('--members', type=int, default=20, help="Number of members in each guild.")
+    parser.add_argument('--active', type=float, default=0.5, help="Fraction of members initially subscribed.")
+    parser.add_argument('--closed-dms', type=float, default=0.1, help="Fraction of members with closed DMs.")
+    parser.add_argument('--study-minutes', type=int, default=25, help="Length of the study stage.")
+    parser.add_argument('--break-minutes', type=int, default=5, help="Length of the break stage.")
+    parser.add_argument('--messages-per-hour', type=float, default=4, help="Messages posted by each member.")
+    parser.add_argument('--churn-per-hour', type=float, default=1, help="Group joins and leaves by each member.")
+    parser.add_argument('--storm-interval', type=float, default=600, help="Mean seconds between reaction storms.")
+    parser.add_argument('--storm-size', type=int, default=2000, help="Number of reactions in each storm.")
+    parser.add_argument('--storm-seconds', type=float, default=30, help="Duration of each reaction storm.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated API request latency, in seconds.")
+    parser.add_argument('--tracemalloc', action='store_true', help="Trace the Python heap usage (slow).")
+    parser.add_argument('--json', help="Also write the report to this file as JSON.")
+    parser.add_argument('--verbose', action='store_true', help="Show the bot log output.")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    random.seed(args.seed)
+    clock = VirtualClock()
+    loop = VirtualTimeLoop(clock)
+    asyncio.set_event_loop(loop)
+    clock.install()
+
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            sim = Simulation(args.scenario, args, clock, loop, random.Random(args.seed), data_dir)
+            start = time.perf_counter()
+            try:
+                loop.run_until_complete(run(sim))
+                report = build_report(sim, time.perf_counter() - start, memory_usage(args.tracemalloc))
+            finally:
+                shutdown(loop)
+                sim.close()
+    finally:
+        clock.uninstall()
+        loop.close()
+
+    print(format_report(report))
+    if args.json:
+        write_report(report, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import time
+import asyncio
+import selectors
+
+from Timer import Timer
+
+from .report import Histogram
+
+
+# The real clocks, before any virtual clock is installed
+_real_time = time.time
+_real_monotonic = time.monotonic
+
+
+class VirtualClock(object):
+    """
+    Simulated clock, which only moves forwards when the event loop would otherwise sleep.
+
+    Once installed, `Timer.now`, `time.time` and `time.monotonic` all read the virtual clock,
+    so rate limits, timeouts and stage deadlines in the bot code follow simulated time.
+
+    Parameters
+    ----------
+    start: float
+        The initial virtual timestamp. Defaults to the current `Timer.now()`.
+    """
+    def __init__(self, start=None):
+        self.start = start if start is not None else Timer.now()
+        self.elapsed = 0.0
+        self._mono_start = _real_monotonic()
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self._mono_start + self.elapsed
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self.elapsed += seconds
+
+    def install(self):
+        Timer.clock = self.time
+        time.time = self.time
+        time.monotonic = self.monotonic
+
+    def uninstall(self):
+        Timer.clock = None
+        time.time = _real_time
+        time.monotonic = _real_monotonic
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Selector which advances the virtual clock instead of sleeping.
+    Only blocks for real when nothing is scheduled, e.g. while waiting for a database writer thread.
+    """
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.blocked = 0  # Real seconds spent blocked in the current loop iteration
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            start = time.perf_counter()
+            events = super().select(None)
+            self.blocked += time.perf_counter() - start
+            return events
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop running on a `VirtualClock`.
+
+    Each iteration advances the clock by `step` seconds, so that code waiting for intervals
+    too small to move the clock, e.g. rounding errors in rate limit buckets, can't stall it.
+    Also measures the real time spent running the callbacks of each loop iteration,
+    which is the longest a ready callback could have been delayed, i.e. the event loop lag.
+    """
+    step = 1e-6
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.lag = Histogram()
+        super().__init__(selector=_VirtualSelector(clock))
+
+    def time(self):
+        return self.clock.monotonic()
+
+    def _run_once(self):
+        self._selector.blocked = 0
+        self.clock.advance(self.step)
+        start = time.perf_counter()
+        super()._run_once()
+        self.lag.record(time.perf_counter() - start - self._selector.blocked)
@@ -0,0 +1,349 @@
+"""
+Stand-ins for the Discord client and models used by the bot.
+
+Every model method which would make a Discord API request goes through `FakeAPI.request`,
+which records the call and models the request latency and the per-route and global rate limits.
+"""
+import time
+import asyncio
+import itertools
+from collections import defaultdict
+from types import SimpleNamespace
+
+import discord
+
+from utils.editqueue import TokenBucket
+
+
+def _error(cls, status, reason, text):
+    return cls(SimpleNamespace(status=status, reason=reason), text)
+
+
+class FakeAPI(object):
+    """
+    Recorder and rate limit model for the API requests made by the stand-in models.
+
+    Parameters
+    ----------
+    latency: float
+        Simulated round trip time of each request, in seconds.
+    global_limit: int
+        Number of requests allowed per second across all routes.
+    """
+    # Map method -> (requests, period in seconds) allowed per route, approximating Discord's limits
+    route_limits = {
+        'send_message': (5, 5),
+        'edit_message': (5, 5),
+        'delete_message': (5, 1),
+        'add_reaction': (1, 0.25),
+        'remove_reaction': (1, 0.25),
+        'clear_reactions': (1, 0.25),
+        'pin_message': (5, 5),
+        'unpin_message': (5, 5),
+        'fetch_message': (50, 1),
+        'edit_channel': (2, 600),
+        'add_role': (10, 10),
+        'remove_role': (10, 10),
+        'send_dm': (5, 5),
+        'fetch_member': (50, 1),
+        'query_members': (120, 60),
+    }
+
+    def __init__(self, latency=0.05, global_limit=50):
+        self.latency = latency
+        self.global_bucket = TokenBucket(global_limit, 1)
+        self.buckets = {}  # Map (method, route) -> TokenBucket
+
+        self.calls = defaultdict(int)  # Map method -> number of calls
+        self.per_second = defaultdict(int)  # Map virtual second -> number of calls
+        self.total_calls = 0
+        self.rate_limited = 0
+        self.rate_limit_wait = 0
+
+    def peak_rate(self):
+        return max(self.per_second.values()) if self.per_second else 0
+
+    async def request(self, method, route):
+        """
+        Record a request, and wait out its rate limits and latency.
+        """
+        self.calls[method] += 1
+        self.total_calls += 1
+
+        limit = self.route_limits.get(method, None)
+        if limit is not None:
+            bucket = self.buckets.get((method, route), None)
+            if bucket is None:
+                bucket = self.buckets[(method, route)] = TokenBucket(*limit)
+            await self._wait(bucket)
+        await self._wait(self.global_bucket)
+
+        # Count the request when it is actually sent
+        self.per_second[int(time.monotonic())] += 1
+        await asyncio.sleep(self.latency)
+
+    async def _wait(self, bucket):
+        wait = bucket.wait_time(time.monotonic())
+        if wait:
+            self.rate_limited += 1
+            self.rate_limit_wait += wait
+            while wait:
+                await asyncio.sleep(wait)
+                wait = bucket.wait_time(time.monotonic())
+        bucket.take()
+
+
+class FakeRole(object):
+    def __init__(self, roleid, name, guild):
+        self.id = roleid
+        self.name = name
+        self.guild = guild
+        self.mention = "<@&{}>".format(roleid)
+        self.position = 1
+
+    @property
+    def members(self):
+        return [member for member in self.guild.members.values() if self in member.roles]
+
+
+class FakeMember(object):
+    def __init__(self, userid, name, guild, api, bot=False, dms_open=True):
+        self.id = userid
+        self.name = name
+        self.display_name = name
+        self.discriminator = "0001"
+        self.mention = "<@{}>".format(userid)
+        self.guild = guild
+        self.bot = bot
+        self.roles = []
+        self.voice = None
+        self.dms_open = dms_open
+        self._api = api
+
+    def __str__(self):
+        return "{}#{}".format(self.name, self.discriminator)
+
+    async def add_roles(self, *roles):
+        for role in roles:
+            await self._api.request('add_role', self.guild.id)
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles):
+        for role in roles:
+            await self._api.request('remove_role', self.guild.id)
+            if role in self.roles:
+                self.roles.remove(role)
+
+    async def send(self, content=None, embed=None):
+        await self._api.request('send_dm', self.id)
+        if not self.dms_open:
+            raise _error(discord.Forbidden, 403, "Forbidden", "Cannot send messages to this user")
+        return FakeMessage(self.guild.client.next_id(), None, self.guild.client.user, content, embed, self._api)
+
+
+class FakeMessage(object):
+    def __init__(self, msgid, channel, author, content=None, embed=None, api=None):
+        self.id = msgid
+        self.channel = channel
+        self.guild = channel.guild if channel is not None else None
+        self.author = author
+        self.content = content or ""
+        self.embeds = [embed] if embed is not None else []
+        self.reactions = []
+        self.pinned = False
+        self.deleted = False
+        self._api = api
+
+    async def _request(self, method):
+        await self._api.request(method, self.channel.id if self.channel is not None else None)
+        if self.deleted:
+            raise _error(discord.NotFound, 404, "Not Found", "Unknown Message")
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self._request('edit_message')
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self):
+        await self._request('delete_message')
+        self.deleted = True
+        if self.channel is not None:
+            self.channel.messages.pop(self.id, None)
+
+    async def add_reaction(self, emoji):
+        await self._request('add_reaction')
+        self.reactions.append(emoji)
+
+    async def remove_reaction(self, emoji, member):
+        await self._request('remove_reaction')
+
+    async def clear_reactions(self):
+        await self._request('clear_reactions')
+        self.reactions = []
+
+    async def pin(self):
+        await self._request('pin_message')
+        self.pinned = True
+
+    async def unpin(self):
+        await self._request('unpin_message')
+        self.pinned = False
+
+
+class FakeChannel(object):
+    """
+    Text or voice channel stand-in, keeping the messages sent to it.
+    """
+    def __init__(self, channelid, name, guild, api, voice=False, keep_messages=50):
+        self.id = channelid
+        self.name = name
+        self.guild = guild
+        self.mention = "<#{}>".format(channelid)
+        self.type = discord.ChannelType.voice if voice else discord.ChannelType.text
+        self.keep_messages = keep_messages
+        self.messages = {}  # Map messageid -> recent messages in the channel
+        self._api = api
+
+    def _store(self, message):
+        self.messages[message.id] = message
+        if len(self.messages) > self.keep_messages:
+            self.messages.pop(next(iter(self.messages)))
+        return message
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await self._api.request('send_message', self.id)
+        return self._store(FakeMessage(self.guild.client.next_id(), self, self.guild.client.user, content, embed,
+                                       self._api))
+
+    async def fetch_message(self, msgid):
+        await self._api.request('fetch_message', self.id)
+        if msgid not in self.messages:
+            raise _error(discord.NotFound, 404, "Not Found", "Unknown Message")
+        return self.messages[msgid]
+
+    async def edit(self, name=None, **kwargs):
+        await self._api.request('edit_channel', self.id)
+        if name is not None:
+            self.name = name
+
+    def post(self, author, content):
+        """
+        Create a message from a member, without a request, as if received over the gateway.
+        """
+        return self._store(FakeMessage(self.guild.client.next_id(), self, author, content, api=self._api))
+
+
+class FakeGuild(object):
+    def __init__(self, guildid, name, client):
+        self.id = guildid
+        self.name = name
+        self.client = client
+        self.members = {}
+        self.roles = {}
+        self.channels = {}
+        self.timers = []  # Timers created for the guild by the simulation
+
+    def get_member(self, userid):
+        return self.members.get(userid, None)
+
+    def get_role(self, roleid):
+        return self.roles.get(roleid, None)
+
+    def get_channel(self, channelid):
+        return self.channels.get(channelid, None)
+
+    async def query_members(self, user_ids=None, limit=5):
+        await self.client.api.request('query_members', self.id)
+        return [self.members[userid] for userid in (user_ids or [])[:limit] if userid in self.members]
+
+    async def fetch_member(self, userid):
+        await self.client.api.request('fetch_member', self.id)
+        if userid not in self.members:
+            raise _error(discord.NotFound, 404, "Not Found", "Unknown Member")
+        return self.members[userid]
+
+    def add_member(self, name, dms_open=True):
+        member = FakeMember(self.client.next_id(), name, self, self.client.api, dms_open=dms_open)
+        self.members[member.id] = member
+        return member
+
+    def add_role(self, name):
+        role = FakeRole(self.client.next_id(), name, self)
+        self.roles[role.id] = role
+        return role
+
+    def add_channel(self, name, voice=False):
+        channel = FakeChannel(self.client.next_id(), name, self, self.client.api, voice=voice)
+        self.channels[channel.id] = channel
+        return channel
+
+
+class FakeClient(object):
+    """
+    Stand-in for the `cmdClient`, dispatching simulated gateway events to the registered handlers.
+
+    Parameters
+    ----------
+    config: BotData
+        The client configuration store.
+    editor: EditQueue
+        The message edit queue.
+    api: FakeAPI
+        The API request model shared by the models of the client.
+    """
+    def __init__(self, config, editor, api):
+        self.config = config
+        self.editor = editor
+        self.api = api
+        self.objects = {}
+
+        self.handlers = defaultdict(list)  # Map event -> list of after event handlers
+        self.events = defaultdict(int)  # Map event -> number of dispatched events
+        self._guilds = {}
+        self._ids = itertools.count(1)
+
+        self.user = SimpleNamespace(id=self.next_id(), name="PomoBot", bot=True, mention="<@0>")
+
+    @property
+    def loop(self):
+        return asyncio.get_event_loop()
+
+    @property
+    def guilds(self):
+        return list(self._guilds.values())
+
+    def next_id(self):
+        """
+        Generate a snowflake from the virtual time, unique within the simulation.
+        """
+        return (int(time.time() * 1000 - 1420070400000) << 22) | (next(self._ids) & 0x3FFFFF)
+
+    def add_guild(self, name):
+        guild = FakeGuild(self.next_id(), name, self)
+        self._guilds[guild.id] = guild
+        return guild
+
+    def get_guild(self, guildid):
+        return self._guilds.get(guildid, None)
+
+    def get_channel(self, channelid):
+        for guild in self._guilds.values():
+            if channelid in guild.channels:
+                return guild.channels[channelid]
+
+    def add_after_event(self, event, func, priority=0):
+        self.handlers[event].append(func)
+
+    def dispatch(self, event, *args):
+        """
+        Run the handlers of an event in the background, as the gateway would.
+        """
+        self.events[event] += 1
+        for handler in self.handlers[event]:
+            asyncio.ensure_future(handler(self, *args))
+
+    async def wait_until_ready(self):
+        pass
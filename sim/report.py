@@ -0,0 +1,144 @@
+import math
+import json
+
+
+class Histogram(object):
+    """
+    Histogram of durations in logarithmic buckets, from one microsecond up.
+    Each bucket covers a factor of `2 ** (1 / resolution)`, so percentiles are within that factor.
+    """
+    def __init__(self, resolution=4):
+        self.resolution = resolution
+        self.buckets = {}  # Map bucket index -> count
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        index = max(0, math.ceil(self.resolution * math.log2(value * 1e6))) if value > 1e-6 else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the given percentile.
+        """
+        if not self.count:
+            return 0
+        target = pct / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self.max, 2 ** (index / self.resolution) / 1e6)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max
+        }
+
+
+def build_report(sim, real_seconds, memory):
+    """
+    Collect the results of a finished simulation into a dictionary.
+    """
+    virtual_seconds = sim.clock.elapsed
+    api = sim.client.api
+    interface = sim.client.interface
+    return {
+        'scenario': sim.scenario,
+        'seed': sim.args.seed,
+        'world': {
+            'guilds': len(sim.guilds),
+            'groups': sum(len(guild.timers) for guild in sim.guilds),
+            'members': sum(len(guild.members) for guild in sim.guilds),
+            'subscribers': len(interface.subscribers),
+        },
+        'time': {
+            'virtual_seconds': virtual_seconds,
+            'real_seconds': real_seconds,
+            'speedup': virtual_seconds / real_seconds if real_seconds else 0,
+        },
+        'event_loop_lag': sim.loop.lag.summary(),
+        'events': dict(sim.client.events),
+        'api': {
+            'calls': api.total_calls,
+            'calls_per_second': api.total_calls / virtual_seconds if virtual_seconds else 0,
+            'peak_calls_per_second': api.peak_rate(),
+            'rate_limited': api.rate_limited,
+            'rate_limit_wait': api.rate_limit_wait,
+            'methods': dict(api.calls),
+        },
+        'timers': {
+            'refresh': interface.refresh_stats(),
+            'edit_queue': {
+                'sent': sim.client.editor.sent,
+                'coalesced': sim.client.editor.coalesced,
+                'dropped': sim.client.editor.dropped,
+                'depth': sim.client.editor.depth,
+            },
+            'notifier': interface.notifier.stats(),
+            'scheduler_wakeups': interface.scheduler.wakeups,
+        },
+        'memory': memory,
+    }
+
+
+def format_report(report):
+    """
+    Format a simulation report as human readable text.
+    """
+    lines = []
+    world = report['world']
+    times = report['time']
+    lag = report['event_loop_lag']
+    api = report['api']
+
+    lines.append("Scenario {} (seed {}): {} guilds, {} groups, {} members, {} subscribed at the end".format(
+        report['scenario'], report['seed'], world['guilds'], world['groups'], world['members'], world['subscribers']
+    ))
+    lines.append("Simulated {:.0f}s in {:.1f}s of real time ({:.0f}x)".format(
+        times['virtual_seconds'], times['real_seconds'], times['speedup']
+    ))
+    lines.append("")
+    lines.append("Event loop lag over {} iterations (real time)".format(lag['count']))
+    lines.append("    mean {:.3f}ms, p50 {:.3f}ms, p99 {:.3f}ms, p99.9 {:.3f}ms, max {:.3f}ms".format(
+        *(1000 * lag[key] for key in ('mean', 'p50', 'p99', 'p999', 'max'))
+    ))
+    lines.append("")
+    lines.append("API calls: {} total, {:.2f}/s average, {}/s peak".format(
+        api['calls'], api['calls_per_second'], api['peak_calls_per_second']
+    ))
+    lines.append("    {} calls rate limited, waiting {:.1f}s in total".format(
+        api['rate_limited'], api['rate_limit_wait']
+    ))
+    for method, count in sorted(api['methods'].items(), key=lambda item: -item[1]):
+        lines.append("    {:<20} {:>10} {:>10.3f}/s".format(
+            method, count, count / times['virtual_seconds'] if times['virtual_seconds'] else 0
+        ))
+    lines.append("")
+    lines.append("Gateway events: {}".format(
+        ", ".join("{} {}".format(event, count) for event, count in sorted(report['events'].items()))
+    ))
+    lines.append("Status refresh: {}".format(report['timers']['refresh']))
+    lines.append("Edit queue: {}".format(report['timers']['edit_queue']))
+    lines.append("Notifications: {}".format(report['timers']['notifier']))
+    lines.append("")
+    lines.append("Memory: {}".format(", ".join(
+        "{} {:.1f} MiB".format(key, value / 2**20) for key, value in report['memory'].items()
+    )))
+    return "\n".join(lines)
+
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,198 @@
+"""
+Simulated world setup and the activity processes making up each scenario.
+
+Activity is generated by a few processes, each drawing events for the whole world
+from a seeded random generator with exponential inter-arrival times.
+"""
+import os
+import asyncio
+import logging
+import traceback
+from types import SimpleNamespace
+
+from BotData import BotData
+from Timer import TimerInterface, TimerStage
+from utils.editqueue import EditQueue
+
+from logger import log
+
+from .fakes import FakeAPI, FakeClient
+
+
+class Simulation(object):
+    """
+    A simulated deployment: the client, the timer interface, and the simulated guilds.
+
+    Parameters
+    ----------
+    scenario: str
+        Name of the scenario being run.
+    args: argparse.Namespace
+        The simulation settings, see `sim.__main__`.
+    clock: VirtualClock
+        The installed virtual clock.
+    loop: VirtualTimeLoop
+        The event loop running the simulation.
+    rng: random.Random
+        Seeded source of randomness for the simulated activity.
+    data_dir: str
+        Directory for the simulated bot data files.
+    """
+    def __init__(self, scenario, args, clock, loop, rng, data_dir):
+        self.scenario = scenario
+        self.args = args
+        self.clock = clock
+        self.loop = loop
+        self.rng = rng
+
+        TimerInterface.save_fp = os.path.join(data_dir, "timerstatus.json")
+        self.config = BotData(app="pomo", data_file=os.path.join(data_dir, "config_data.db"))
+        self.client = FakeClient(self.config, EditQueue(), FakeAPI(latency=args.latency))
+        self.interface = TimerInterface(self.client, os.path.join(data_dir, "sessions.db"))
+        self.guilds = []
+
+    def close(self):
+        self.interface.journal.close()
+        self.interface.registry.close()
+        self.config.close()
+
+    async def build(self):
+        """
+        Create the guilds, groups and members, start the group timers,
+        and subscribe the initially active members through their clock channels.
+        """
+        args = self.args
+        stages = [TimerStage("Study", args.study_minutes), TimerStage("Break", args.break_minutes)]
+
+        self.client.dispatch("ready")
+        await self.interface.wait_until_ready()
+
+        for i in range(args.guilds):
+            guild = self.client.add_guild("Guild {}".format(i))
+            for j in range(args.members):
+                guild.add_member("Member {}-{}".format(i, j), dms_open=self.rng.random() >= args.closed_dms)
+            for j in range(args.groups):
+                channel = guild.add_channel("study-{}".format(j))
+                clock_channel = guild.add_channel("Group {}".format(j), voice=True)
+                role = guild.add_role("Group {}".format(j))
+                timer = self.interface.create_timer("Group {}".format(j), role, channel, clock_channel)
+                timer.setup(stages)
+                guild.timers.append(timer)
+            self.guilds.append(guild)
+
+        # Stagger the timer starts over the first stage
+        for guild in self.guilds:
+            for timer in guild.timers:
+                asyncio.ensure_future(self._start_later(timer, self.rng.uniform(0, 60 * args.study_minutes)))
+
+        for guild in self.guilds:
+            for member in guild.members.values():
+                if self.rng.random() < args.active:
+                    self.join_voice(member, self.rng.choice(guild.timers))
+        await asyncio.sleep(0)
+
+    async def _start_later(self, timer, delay):
+        await asyncio.sleep(delay)
+        await timer.start()
+
+    def join_voice(self, member, timer):
+        """
+        Move a member into the clock channel of a timer, which subscribes them.
+        """
+        before = SimpleNamespace(channel=member.voice)
+        member.voice = timer.clock_channel
+        self.client.dispatch("voice_state_update", member, before, SimpleNamespace(channel=member.voice))
+
+    async def leave(self, member):
+        """
+        Leave the voice channel and unsubscribe, as with the `leave` command.
+        """
+        before = SimpleNamespace(channel=member.voice)
+        member.voice = None
+        self.client.dispatch("voice_state_update", member, before, SimpleNamespace(channel=None))
+        await self.interface.unsub(member.guild.id, member.id)
+
+    def random_member(self):
+        guild = self.rng.choice(self.guilds)
+        return guild, guild.members[self.rng.choice(list(guild.members))]
+
+    async def process(self, name, rate, action):
+        """
+        Run `action` at random times, at an average of `rate` events per second, until cancelled.
+        """
+        if rate <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.rng.expovariate(rate))
+            try:
+                await action()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log("Exception in simulated {} activity.\n{}".format(name, traceback.format_exc()),
+                    context="SIMULATION",
+                    level=logging.ERROR)
+
+
+async def chatter(sim):
+    """
+    Members post messages in the channel of their group, which counts as activity.
+    """
+    async def _message():
+        guild, member = sim.random_member()
+        subber = sim.interface.subscribers.get((guild.id, member.id), None)
+        channel = subber.timer.channel if subber is not None else sim.rng.choice(guild.timers).channel
+        sim.client.dispatch("message", channel.post(member, "Working on chapter {}".format(sim.rng.randrange(10))))
+
+    rate = sim.args.messages_per_hour * sim.args.guilds * sim.args.members / 3600
+    await sim.process("chatter", rate, _message)
+
+
+async def churn(sim):
+    """
+    Members join groups through the clock channels, switch between groups, and leave.
+    """
+    async def _change():
+        guild, member = sim.random_member()
+        if (guild.id, member.id) in sim.interface.subscribers and sim.rng.random() < 0.5:
+            await sim.leave(member)
+        else:
+            sim.join_voice(member, sim.rng.choice(guild.timers))
+
+    rate = sim.args.churn_per_hour * sim.args.guilds * sim.args.members / 3600
+    await sim.process("churn", rate, _change)
+
+
+async def reaction_storm(sim):
+    """
+    Bursts of reactions in the timer channels, mostly on recent timer messages,
+    which subscribe the reacting members or count as their activity.
+    """
+    args = sim.args
+
+    def _react():
+        guild, member = sim.random_member()
+        timer = sim.rng.choice(guild.timers)
+        messages = timer.timer_messages or [sim.client.next_id()]
+        sim.client.dispatch("raw_reaction_add", SimpleNamespace(
+            guild_id=guild.id,
+            channel_id=timer.channel.id,
+            message_id=sim.rng.choice(messages),
+            user_id=member.id,
+            emoji=sim.rng.choice(["✅", "✅", "👍"])
+        ))
+
+    while True:
+        await asyncio.sleep(sim.rng.expovariate(1 / args.storm_interval))
+        for _ in range(int(args.storm_size)):
+            _react()
+            await asyncio.sleep(sim.rng.expovariate(args.storm_size / args.storm_seconds))
+
+
+# Map scenario name -> activity processes
+SCENARIOS = {
+    'steady': (chatter,),
+    'churn': (chatter, churn),
+    'reaction_storm': (chatter, reaction_storm),
+    'mixed': (chatter, churn, reaction_storm),
+}